@@ -0,0 +1,125 @@
+import time
+import asyncio
+import resource
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.stubs import FaultModel, LatencyModel, StubKendraClient, StubOpenAIClient, install_stubs, remove_stubs
+from src.api import app
+from src.utils.cache import consensus_cache, response_cache
+from src.utils.circuit_breaker import kendra_breaker, openai_breaker
+from src.utils.hedging import kendra_hedger, openai_hedger
+from src.utils.metrics import DEGRADED_RESPONSES, HEDGES
+from src.utils.semantic_cache import semantic_cache
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def max_rss_mb() -> float:
+    """Process memory high-water mark in MB (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _drive(path: str, requests: int, concurrency: int, unique_queries: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(requests))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            for index in counter:
+                # Distinct queries so the caches and single-flight don't short-circuit the pipeline
+                query = f"How do I configure the index, variant {index}?" if unique_queries else "How do I configure the index?"
+                start = time.perf_counter()
+                response = await client.post(path, json={"query": query})
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+def run_load(requests: int = 500, concurrency: int = 32, kendra_ms: float = 120.0, openai_ms: float = 800.0,
+             path: str = "/chatbot", unique_queries: bool = True, seed: int = 0,
+             kendra_error_rate: float = 0.0, openai_error_rate: float = 0.0, hedging: bool = False) -> Dict[str, Any]:
+    """
+    Drives the FastAPI app in-process at a fixed concurrency against stubbed upstreams.
+
+    Args:
+        requests (int): Total requests to send.
+        concurrency (int): Number of concurrent clients.
+        kendra_ms (float): Median stubbed Kendra latency (p99 is 3x).
+        openai_ms (float): Median stubbed OpenAI latency (p99 is 3x).
+        path (str): Endpoint to exercise.
+        unique_queries (bool): Send a distinct query per request.
+        seed (int): Seed for the latency and fault models.
+        kendra_error_rate (float): Share of stubbed Kendra calls that fail.
+        openai_error_rate (float): Share of stubbed OpenAI calls that fail.
+        hedging (bool): Hedge slow upstream calls during the run.
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles, status counts, memory high-water mark,
+            upstream calls and failures, the number of degraded (excerpt-only) answers and,
+            when hedging, the hedge counters per upstream.
+    """
+    kendra = StubKendraClient(
+        latency=LatencyModel(kendra_ms, kendra_ms * 3, seed), faults=FaultModel(kendra_error_rate, seed=seed)
+    )
+    openai_faults = FaultModel(openai_error_rate, seed=seed + 1)
+    openai = StubOpenAIClient(latency=LatencyModel(openai_ms, openai_ms * 3, seed + 1), faults=openai_faults)
+    async_openai = StubOpenAIClient(
+        latency=LatencyModel(openai_ms, openai_ms * 3, seed + 2), is_async=True, faults=openai_faults
+    )
+    install_stubs(kendra, openai, async_openai)
+
+    limiter_enabled = app.state.limiter.enabled
+    app.state.limiter.enabled = False
+    for cache in (response_cache, consensus_cache, semantic_cache):
+        cache.clear()
+    for breaker in (kendra_breaker, openai_breaker):
+        breaker.reset()
+    degraded = DEGRADED_RESPONSES.get("openai")
+    hedgers = (kendra_hedger, openai_hedger)
+    hedging_enabled = [hedger.enabled for hedger in hedgers]
+    hedge_events = ("calls", "hedged", "hedge_won", "budget_denied")
+    hedges = {hedger.name: {event: HEDGES.get(hedger.name, event) for event in hedge_events} for hedger in hedgers}
+    for hedger in hedgers:
+        hedger.enabled = hedging
+    try:
+        result = asyncio.run(_drive(path, requests, concurrency, unique_queries))
+    finally:
+        for hedger, enabled in zip(hedgers, hedging_enabled):
+            hedger.enabled = enabled
+        app.state.limiter.enabled = limiter_enabled
+        remove_stubs()
+    result["upstream_calls"] = {"kendra": kendra.calls, "openai": openai.calls + async_openai.calls}
+    result["upstream_failures"] = {"kendra": kendra.faults.failures, "openai": openai_faults.failures}
+    result["degraded_responses"] = int(DEGRADED_RESPONSES.get("openai") - degraded)
+    if hedging:
+        result["hedges"] = {
+            name: {event: int(HEDGES.get(name, event) - before) for event, before in events.items()}
+            for name, events in hedges.items()
+        }
+    return result
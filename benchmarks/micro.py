@@ -0,0 +1,126 @@
+import os
+import time
+import tempfile
+from typing import Any, Callable, Dict
+
+from limits import RateLimitItemPerSecond
+from limits.storage import storage_from_string
+
+from benchmarks.stubs import CANNED_ITEMS, CANNED_STATEMENT, make_result_items
+from src.services.aws_kendra import AWSKendra
+from src.services.openai import OpenAI
+from src.utils.logger import CsvLogger
+from src.utils.rate_limit import GCRARateLimiter
+from src.utils.selection import AnswerSelector
+
+
+def measure(fn: Callable[[], Any], iterations: int, repeat: int = 5) -> Dict[str, float]:
+    """
+    Times `fn` and reports the best and median per-call cost over `repeat` runs.
+
+    Args:
+        fn (Callable[[], Any]): The operation to time.
+        iterations (int): Calls per run.
+        repeat (int): Number of runs.
+
+    Returns:
+        Dict[str, float]: Per-call microseconds ("best_us", "median_us") and "ops_per_sec".
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        runs.append((time.perf_counter() - start) / iterations)
+    runs.sort()
+    best, median = runs[0], runs[len(runs) // 2]
+    return {"best_us": best * 1e6, "median_us": median * 1e6, "ops_per_sec": 1 / median if median else 0.0}
+
+
+def bench_extract(iterations: int) -> Dict[str, float]:
+    """`AWSKendra.get_answers_from_query_results` on a 10-item, 6-line-excerpt payload."""
+    kendra = AWSKendra.get_instance()
+    items = make_result_items()
+    return measure(lambda: kendra.get_answers_from_query_results(items), iterations)
+
+
+def bench_consensus_parse(iterations: int) -> Dict[str, float]:
+    """Consensus JSON parsing and scoring for both `items` and `statement` answers."""
+    openai = OpenAI.get_instance()
+    weights = [10, 8, 5]
+
+    def parse():
+        openai.parse_consensus(CANNED_ITEMS, weights)
+        openai.parse_consensus(CANNED_STATEMENT, weights)
+
+    return measure(parse, iterations)
+
+
+def bench_select(iterations: int) -> Dict[str, float]:
+    """`AnswerSelector.select` (rank, MinHash dedup, token packing) on the extracted 10-answer payload."""
+    answers = AWSKendra.get_instance().get_answers_from_query_results(make_result_items())
+    selector = AnswerSelector()
+    selector.enabled = True
+    return measure(lambda: selector.select("How do I configure the index?", answers), iterations)
+
+
+def bench_logger(iterations: int) -> Dict[str, float]:
+    """Caller-side cost of `CsvLogger.log` (the write happens on the writer thread)."""
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = CsvLogger()
+        logger.log_dir = log_dir
+        result = measure(lambda: logger.log("INFO", "Processing query: %s", "benchmark"), iterations)
+        logger.close()
+        result["bytes_written"] = sum(
+            os.path.getsize(os.path.join(log_dir, name)) for name in os.listdir(log_dir)
+        )
+    return result
+
+
+def bench_logger_levels(iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Caller-side cost of `CsvLogger.log` per outcome: a record below LOG_LEVEL,
+    an INFO record sampled out (LOG_SAMPLE_RATE=0.01) and a JSON-lines record.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, attributes in (
+            ("logger_filtered", {"min_level": CsvLogger.LEVELS["WARNING"]}),
+            ("logger_sampled", {"sample_rate": 0.01}),
+            ("logger_json", {"format": "json"}),
+        ):
+            logger = CsvLogger()
+            logger.log_dir = log_dir
+            for attribute, value in attributes.items():
+                setattr(logger, attribute, value)
+            results[name] = measure(lambda: logger.log("INFO", "Processing query: %s", "benchmark"), iterations)
+            logger.close()
+    return results
+
+
+def bench_rate_limit(iterations: int) -> Dict[str, float]:
+    """One GCRA rate-limit decision against the SQLite storage shared by local workers."""
+    with tempfile.TemporaryDirectory() as state_dir:
+        limiter = GCRARateLimiter(storage_from_string(f"sqlite:///{state_dir}/limits.sqlite3"))
+        item = RateLimitItemPerSecond(1_000_000)
+        return measure(lambda: limiter.hit(item, "ip:203.0.113.7", "chatbot"), iterations)
+
+
+def run_micro(iterations: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every micro-benchmark.
+
+    Args:
+        iterations (int): Calls per timing run.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Results keyed by benchmark name.
+    """
+    return {
+        "extract": bench_extract(iterations),
+        "consensus_parse": bench_consensus_parse(iterations),
+        "select": bench_select(iterations),
+        "logger": bench_logger(iterations),
+        **bench_logger_levels(iterations),
+        "rate_limit": bench_rate_limit(iterations),
+    }
@@ -0,0 +1,114 @@
+"""
+Offline benchmark runner.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --max-regression 0.15
+    python -m benchmarks.run --skip-load --baseline results.json --max-startup-regression 0.25
+"""
+import sys
+import json
+import argparse
+import platform
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.load import run_load
+from benchmarks.micro import run_micro
+from benchmarks.startup import run_startup
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+            max_startup_regression: Optional[float] = None) -> List[str]:
+    """
+    Compares a run against a baseline.
+
+    Args:
+        current (Dict[str, Any]): Results of this run.
+        baseline (Dict[str, Any]): Results of the reference run.
+        max_regression (float): Allowed relative slowdown, e.g. 0.15 for 15%.
+        max_startup_regression (Optional[float]): Allowed relative slowdown of the app import;
+            `max_regression` when omitted.
+
+    Returns:
+        List[str]: One message per metric that regressed beyond the threshold.
+    """
+    regressions = []
+    checks = [("micro", name, "median_us", True) for name in current.get("micro", {})]
+    checks += [("load", None, key, True) for key in ("p50_ms", "p95_ms", "p99_ms")]
+    checks += [("load", None, "rps", False)]
+    checks += [("startup", None, "import_ms", True)]
+    for section, name, key, lower_is_better in checks:
+        now = current.get(section, {})
+        then = baseline.get(section, {})
+        if name is not None:
+            now, then = now.get(name, {}), then.get(name, {})
+        if key not in now or not then.get(key):
+            continue
+        change = (now[key] - then[key]) / then[key]
+        if not lower_is_better:
+            change = -change
+        threshold = max_regression
+        if section == "startup" and max_startup_regression is not None:
+            threshold = max_startup_regression
+        if change > threshold:
+            label = f"{section}.{name}.{key}" if name else f"{section}.{key}"
+            regressions.append(f"{label}: {then[key]:.2f} -> {now[key]:.2f} ({change:+.1%})")
+
+    loaded = set(current.get("startup", {}).get("deferred_loaded", []))
+    loaded -= set(baseline.get("startup", {}).get("deferred_loaded", []))
+    if loaded:
+        regressions.append(f"startup.deferred_loaded: importing the app now loads {', '.join(sorted(loaded))}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the DocuChatAI offline benchmarks.")
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per micro-benchmark run")
+    parser.add_argument("--requests", type=int, default=500, help="total load-test requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent load-test clients")
+    parser.add_argument("--kendra-ms", type=float, default=120.0, help="median stubbed Kendra latency")
+    parser.add_argument("--openai-ms", type=float, default=800.0, help="median stubbed OpenAI latency")
+    parser.add_argument("--kendra-error-rate", type=float, default=0.0, help="share of stubbed Kendra calls failing")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="share of stubbed OpenAI calls failing")
+    parser.add_argument("--hedging", action="store_true", help="hedge slow upstream calls during the load test")
+    parser.add_argument("--skip-load", action="store_true", help="skip the load test")
+    parser.add_argument("--skip-startup", action="store_true", help="skip the import-time benchmark")
+    parser.add_argument("--startup-repeat", type=int, default=5, help="interpreters started to time the import")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--max-startup-regression", type=float, default=0.25,
+                        help="allowed relative slowdown of the app import (noisier than the rest)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "micro": run_micro(args.iterations),
+    }
+    if not args.skip_startup:
+        results["startup"] = run_startup(repeat=args.startup_repeat)
+    if not args.skip_load:
+        results["load"] = run_load(
+            args.requests, args.concurrency, args.kendra_ms, args.openai_ms,
+            kendra_error_rate=args.kendra_error_rate, openai_error_rate=args.openai_error_rate,
+            hedging=args.hedging,
+        )
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression, args.max_startup_regression)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
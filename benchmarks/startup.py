@@ -0,0 +1,98 @@
+import sys
+import json
+import subprocess
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Upstream SDKs the app defers until first use; importing the app must not load them
+DEFERRED_MODULES = ("openai", "boto3", "botocore", "httpx")
+
+
+def parse_importtime(output: str) -> List[Tuple[int, str, int]]:
+    """
+    Parses `python -X importtime` output.
+
+    Args:
+        output (str): The interpreter's stderr.
+
+    Returns:
+        List[Tuple[int, str, int]]: (nesting depth, module, cumulative microseconds) per import,
+            in output order, i.e. every module after the modules it imported.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, module, int(cumulative)))
+    return imports
+
+
+def direct_imports(imports: List[Tuple[int, str, int]], module: str) -> Dict[str, int]:
+    """
+    Returns the modules first imported directly by a top-level `module`, with their cumulative time.
+    """
+    children: Dict[str, int] = {}
+    for depth, name, cumulative in imports:
+        if depth == 0:
+            if name == module:
+                return children
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative
+    return {}
+
+
+def import_once(module: str, deferred: Iterable[str] = DEFERRED_MODULES) -> Dict[str, Any]:
+    """
+    Imports `module` in a fresh interpreter under `-X importtime`.
+
+    Args:
+        module (str): Module to import, e.g. "src.api".
+        deferred (Iterable[str]): Modules that are expected not to be loaded.
+
+    Returns:
+        Dict[str, Any]: "imports" (see `parse_importtime`) and "loaded" (the deferred
+            modules the import pulled in anyway).
+    """
+    code = (
+        f"import sys, json, {module}; "
+        f"print(json.dumps([name for name in {list(deferred)!r} if name in sys.modules]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    return {"imports": parse_importtime(completed.stderr), "loaded": json.loads(completed.stdout)}
+
+
+def run_startup(module: str = "src.api", repeat: int = 5, top: int = 10) -> Dict[str, Any]:
+    """
+    Measures how long importing the app takes, the median over `repeat` fresh interpreters.
+
+    Args:
+        module (str): Module to import.
+        repeat (int): Number of interpreters started.
+        top (int): Number of slowest top-level imports reported.
+
+    Returns:
+        Dict[str, Any]: "import_ms" (median), "best_ms", the slowest direct imports of the app
+            ("top_imports_ms", from the median run) and the deferred modules that got loaded.
+    """
+    runs = []
+    for _ in range(repeat):
+        run = import_once(module)
+        run["total_us"] = next((us for depth, name, us in run["imports"] if depth == 0 and name == module), 0)
+        runs.append(run)
+    runs.sort(key=lambda run: run["total_us"])
+    median = runs[len(runs) // 2]
+
+    slowest = sorted(direct_imports(median["imports"], module).items(), key=lambda item: item[1], reverse=True)
+    return {
+        "import_ms": median["total_us"] / 1000,
+        "best_ms": runs[0]["total_us"] / 1000,
+        "top_imports_ms": {name: us / 1000 for name, us in slowest[:top]},
+        "deferred_loaded": sorted(set().union(*(run["loaded"] for run in runs))),
+    }
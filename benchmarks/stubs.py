@@ -0,0 +1,224 @@
+import json
+import math
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from src.services.clients import ClientFactory
+
+
+class LatencyModel:
+    """
+    Log-normal latency distribution described by its median and p99, in milliseconds.
+    """
+
+    # z-score of the 99th percentile of a standard normal distribution
+    Z_99 = 2.326
+
+    def __init__(self, median_ms: float = 0.0, p99_ms: Optional[float] = None, seed: int = 0):
+        self.median_ms = median_ms
+        p99_ms = p99_ms if p99_ms is not None else median_ms
+        self.sigma = math.log(p99_ms / median_ms) / self.Z_99 if median_ms > 0 and p99_ms > median_ms else 0.0
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """Returns one latency sample in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(self.sigma * self._random.gauss(0, 1)) / 1000
+
+
+class UpstreamFault(ConnectionError):
+    """
+    Error raised by the stubs to simulate a failing upstream call.
+    """
+
+
+class FaultModel:
+    """
+    Injects upstream failures: each call fails with probability `error_rate`, and every
+    call fails while `down` is set (an outage). A failing call first hangs for `hang_ms`,
+    like a request that runs into its timeout.
+    """
+
+    def __init__(self, error_rate: float = 0.0, hang_ms: float = 0.0, seed: int = 0):
+        self.error_rate = error_rate
+        self.hang = hang_ms / 1000
+        self.down = False
+        self.failures = 0
+        self._random = random.Random(seed)
+
+    def should_fail(self) -> bool:
+        """Decides whether the current call fails, counting the failures."""
+        failed = self.down or (self.error_rate > 0 and self._random.random() < self.error_rate)
+        self.failures += failed
+        return failed
+
+
+def make_result_items(answers: int = 3, documents: int = 7, excerpt_lines: int = 6, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Builds a Kendra `ResultItems` payload with the shape returned by `client.query`.
+
+    Args:
+        answers (int): Number of ANSWER items.
+        documents (int): Number of DOCUMENT items.
+        excerpt_lines (int): Lines per excerpt (joined with newlines and NBSPs).
+        seed (int): Seed for confidence levels.
+
+    Returns:
+        List[Dict[str, Any]]: The result items.
+    """
+    rng = random.Random(seed)
+    confidences = ["VERY HIGH", "HIGH", "MEDIUM", "LOW"]
+    items = []
+    for index in range(answers + documents):
+        item_type = "ANSWER" if index < answers else "DOCUMENT"
+        lines = [
+            f"  Line {line} of excerpt {index}: configure\xa0the index and sync the data source.  "
+            for line in range(excerpt_lines)
+        ]
+        items.append({
+            "Id": f"item-{index}",
+            "Type": item_type,
+            "DocumentId": f"doc-{index % 5}",
+            "DocumentURI": f"https://docs.example.com/page-{index % 5}",
+            "ScoreAttributes": {"ScoreConfidence": rng.choice(confidences)},
+            "DocumentExcerpt": {"Text": "\n".join(lines)},
+        })
+    return items
+
+
+CANNED_ITEMS = json.dumps({
+    "type": "items",
+    "data": [
+        {"id": 0, "items": ["Create an index", "Add a data source"]},
+        {"id": 1, "items": ["Create an index", "Sync the data source"]},
+        {"id": 2, "items": ["Sync the data source"]},
+    ],
+})
+
+CANNED_STATEMENT = json.dumps({
+    "type": "statement",
+    "text": "Create a Kendra index, attach a data source and run a sync before querying.",
+})
+
+
+class StubKendraClient:
+    """
+    Stand-in for the boto3 Kendra client. `query` sleeps for a sampled latency
+    and returns a configurable `ResultItems` payload, or fails as `faults` decides.
+    """
+
+    def __init__(self, result_items: Optional[List[Dict[str, Any]]] = None, latency: Optional[LatencyModel] = None,
+                 faults: Optional[FaultModel] = None):
+        self.result_items = result_items if result_items is not None else make_result_items()
+        self.latency = latency or LatencyModel()
+        self.faults = faults or FaultModel()
+        self.calls = 0
+
+    def query(self, QueryText: str, IndexId: str, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        if self.faults.should_fail():
+            time.sleep(self.faults.hang)
+            raise UpstreamFault("stubbed Kendra failure")
+        delay = self.latency.sample()
+        if delay:
+            time.sleep(delay)
+        return {"QueryId": f"stub-{self.calls}", "ResultItems": self.result_items}
+
+    def describe_index(self, Id: str) -> Dict[str, Any]:
+        return {"Id": Id, "Status": "ACTIVE"}
+
+
+def _completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=len(content) // 4 + 400, completion_tokens=len(content) // 4),
+    )
+
+
+def _chunks(content: str, size: int = 16) -> List[SimpleNamespace]:
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))], usage=None)
+        for i in range(0, len(content), size)
+    ]
+    chunks.append(SimpleNamespace(choices=[], usage=_completion(content).usage))
+    return chunks
+
+
+class _StubCompletions:
+    def __init__(self, owner: "StubOpenAIClient"):
+        self.owner = owner
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        self.owner.calls += 1
+        if self.owner.faults.should_fail():
+            time.sleep(self.owner.faults.hang)
+            raise UpstreamFault("stubbed OpenAI failure")
+        delay = self.owner.latency.sample()
+        if delay:
+            time.sleep(delay)
+        return _completion(self.owner.content)
+
+
+class _AsyncStubCompletions:
+    def __init__(self, owner: "StubOpenAIClient"):
+        self.owner = owner
+
+    async def create(self, stream: bool = False, **kwargs) -> Any:
+        self.owner.calls += 1
+        if self.owner.faults.should_fail():
+            await asyncio.sleep(self.owner.faults.hang)
+            raise UpstreamFault("stubbed OpenAI failure")
+        delay = self.owner.latency.sample()
+        if not stream:
+            if delay:
+                await asyncio.sleep(delay)
+            return _completion(self.owner.content)
+
+        chunks = _chunks(self.owner.content)
+
+        async def iterate():
+            for chunk in chunks:
+                if delay:
+                    await asyncio.sleep(delay / len(chunks))
+                yield chunk
+
+        return iterate()
+
+
+class StubOpenAIClient:
+    """
+    Stand-in for the OpenAI SDK client returning canned `items` / `statement`
+    consensus JSON after a sampled latency, or fails as `faults` decides.
+    Set `is_async` for the async client.
+    """
+
+    def __init__(self, content: str = CANNED_ITEMS, latency: Optional[LatencyModel] = None, is_async: bool = False,
+                 faults: Optional[FaultModel] = None):
+        self.content = content
+        self.latency = latency or LatencyModel()
+        self.faults = faults or FaultModel()
+        self.calls = 0
+        completions = _AsyncStubCompletions(self) if is_async else _StubCompletions(self)
+        self.chat = SimpleNamespace(completions=completions)
+        self.models = SimpleNamespace(list=(self._alist if is_async else lambda: []))
+
+    async def _alist(self) -> List[Any]:
+        return []
+
+
+def install_stubs(kendra: StubKendraClient, openai: StubOpenAIClient, async_openai: StubOpenAIClient) -> None:
+    """
+    Makes the client factory hand out the stubs instead of real SDK clients.
+    """
+    ClientFactory.get_instance().override(kendra=kendra, openai=openai, async_openai=async_openai)
+
+
+def remove_stubs() -> None:
+    """
+    Drops the stubs so real clients are built on next use.
+    """
+    ClientFactory.get_instance().reset()
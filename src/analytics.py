@@ -0,0 +1,205 @@
+"""
+Reports over the interaction store (see `src.utils.interaction_store`).
+
+    python -m src.analytics top --since 2026-10-01 --limit 20
+    python -m src.analytics top --unanswered
+    python -m src.analytics slowest --since 2026-10-01 --until 2026-10-07
+    python -m src.analytics latency --source stream
+    python -m src.analytics no-answer --json
+
+Dates are local calendar days, both ends inclusive. Reports read only the
+requested range through the indexes on `ts`.
+"""
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.interaction_store import InteractionStore
+
+# Stage columns reported by `latency_percentiles`
+STAGES = ("total_ms", "cache_ms", "kendra_ms", "consensus_ms")
+QUANTILES = (50, 90, 95, 99)
+
+# A row without an error that produced no answer
+_NO_ANSWER = "(answer_count = 0 AND error IS NULL)"
+
+
+def day_range(since: Optional[str], until: Optional[str]) -> Tuple[float, float]:
+    """
+    Converts inclusive YYYY-MM-DD bounds into an epoch range.
+
+    Args:
+        since (Optional[str]): First day; the beginning of time when omitted.
+        until (Optional[str]): Last day; the end of time when omitted.
+
+    Returns:
+        Tuple[float, float]: `ts` bounds, lower inclusive and upper exclusive.
+    """
+    start = datetime.strptime(since, "%Y-%m-%d").timestamp() if since else 0.0
+    end = (datetime.strptime(until, "%Y-%m-%d") + timedelta(days=1)).timestamp() if until else float("inf")
+    return start, end
+
+
+def _where(start: float, end: float, source: Optional[str], extra: str = "") -> Tuple[str, List[Any]]:
+    clause, params = "ts >= ? AND ts < ?", [start, end]
+    if source:
+        clause += " AND source = ?"
+        params.append(source)
+    if extra:
+        clause += f" AND {extra}"
+    return clause, params
+
+
+def top_queries(conn: sqlite3.Connection, start: float, end: float, limit: int = 10,
+                source: Optional[str] = None, unanswered: bool = False) -> List[Dict[str, Any]]:
+    """
+    Returns the most frequent normalized queries.
+
+    Args:
+        conn (sqlite3.Connection): Interaction store connection.
+        start (float): Lower `ts` bound (inclusive).
+        end (float): Upper `ts` bound (exclusive).
+        limit (int): Number of queries.
+        source (Optional[str]): Only count this entry point ("chatbot", "stream", "batch", "warmup").
+        unanswered (bool): Only count interactions without an answer.
+
+    Returns:
+        List[Dict[str, Any]]: query, count, cache hits, unanswered count and mean latency, most frequent first.
+    """
+    where, params = _where(start, end, source, _NO_ANSWER if unanswered else "")
+    rows = conn.execute(
+        f"SELECT MIN(query), COUNT(*), SUM(cache_hit), SUM{_NO_ANSWER}, AVG(total_ms) FROM interactions "
+        f"WHERE {where} GROUP BY query_hash ORDER BY COUNT(*) DESC, MIN(query) LIMIT ?",
+        params + [limit],
+    ).fetchall()
+    return [
+        {"query": query, "count": count, "cache_hits": hits, "unanswered": none, "avg_ms": round(avg_ms, 1)}
+        for query, count, hits, none, avg_ms in rows
+    ]
+
+
+def slowest_queries(conn: sqlite3.Connection, start: float, end: float, limit: int = 10,
+                    source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns the normalized queries with the highest mean latency, ignoring cache hits.
+
+    Returns:
+        List[Dict[str, Any]]: query, count, mean and max latency and mean Kendra/consensus time, slowest first.
+    """
+    where, params = _where(start, end, source, "cache_hit = 0")
+    rows = conn.execute(
+        f"SELECT MIN(query), COUNT(*), AVG(total_ms), MAX(total_ms), AVG(kendra_ms), AVG(consensus_ms) "
+        f"FROM interactions WHERE {where} GROUP BY query_hash ORDER BY AVG(total_ms) DESC LIMIT ?",
+        params + [limit],
+    ).fetchall()
+    return [
+        {
+            "query": query, "count": count, "avg_ms": round(avg_ms, 1), "max_ms": round(max_ms, 1),
+            "kendra_ms": round(kendra_ms or 0.0, 1), "consensus_ms": round(consensus_ms or 0.0, 1),
+        }
+        for query, count, avg_ms, max_ms, kendra_ms, consensus_ms in rows
+    ]
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    # Nearest rank on an ascending sequence
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def latency_percentiles(conn: sqlite3.Connection, start: float, end: float,
+                        source: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Returns latency percentiles of the whole request and of each recorded stage.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per column in `STAGES`: count and p50/p90/p95/p99 in milliseconds.
+    """
+    report: Dict[str, Dict[str, float]] = {}
+    for column in STAGES:
+        where, params = _where(start, end, source, f"{column} IS NOT NULL")
+        ordered = [value for (value,) in conn.execute(
+            f"SELECT {column} FROM interactions WHERE {where} ORDER BY {column}", params
+        )]
+        stats: Dict[str, float] = {"count": len(ordered)}
+        if ordered:
+            stats.update({f"p{q}": round(_percentile(ordered, q), 1) for q in QUANTILES})
+        report[column] = stats
+    return report
+
+
+def no_answer_rates(conn: sqlite3.Connection, start: float, end: float,
+                    source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns per-day totals and the share of interactions without an answer.
+
+    Returns:
+        List[Dict[str, Any]]: day, total, unanswered, errors, degraded and no_answer_rate, oldest day first.
+    """
+    where, params = _where(start, end, source)
+    rows = conn.execute(
+        f"SELECT date(ts, 'unixepoch', 'localtime') AS day, COUNT(*), SUM{_NO_ANSWER}, "
+        f"SUM(error IS NOT NULL), SUM(degraded) FROM interactions WHERE {where} GROUP BY day ORDER BY day",
+        params,
+    ).fetchall()
+    return [
+        {
+            "day": day, "total": total, "unanswered": none, "errors": errors, "degraded": degraded,
+            "no_answer_rate": round(none / total, 4),
+        }
+        for day, total, none, errors, degraded in rows
+    ]
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """Renders report rows as a plain-text table."""
+    if not rows:
+        return "(no interactions)"
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    cells = [[str(row.get(column, "")) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines += ["  ".join(cell.ljust(width) for cell, width in zip(line, widths)) for line in cells]
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query and latency reports from the DocuChatAI interaction store.")
+    parser.add_argument("report", choices=("top", "slowest", "latency", "no-answer"))
+    parser.add_argument("--db", help="interaction store file (default: INTERACTION_STORE_PATH)")
+    parser.add_argument("--since", help="first day, YYYY-MM-DD")
+    parser.add_argument("--until", help="last day, YYYY-MM-DD")
+    parser.add_argument("--source", choices=("chatbot", "stream", "batch", "warmup"), help="only this entry point")
+    parser.add_argument("--limit", type=int, default=10, help="rows of top/slowest")
+    parser.add_argument("--unanswered", action="store_true", help="top: only interactions without an answer")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    start, end = day_range(args.since, args.until)
+    conn = InteractionStore(path=args.db).connect()
+    try:
+        if args.report == "top":
+            report: Any = top_queries(conn, start, end, args.limit, args.source, args.unanswered)
+        elif args.report == "slowest":
+            report = slowest_queries(conn, start, end, args.limit, args.source)
+        elif args.report == "latency":
+            report = latency_percentiles(conn, start, end, args.source)
+        else:
+            report = no_answer_rates(conn, start, end, args.source)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif isinstance(report, dict):
+        print(format_table([{"stage": stage, **stats} for stage, stats in report.items()]))
+    else:
+        print(format_table(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
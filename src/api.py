@@ -1,32 +1,185 @@
-from typing import List
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, List
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from src.main import get_response_from_bot
+from src.main import (
+    get_response_from_bot_async,
+    get_responses_from_bot_async,
+    get_responses_from_bot_stream,
+    stream_response_from_bot,
+)
 from src.models.chatbot_request import ChatbotRequest
 from src.models.chatbot_response import ChatbotResponse
-from src.utils.logger import csv_logger
+from src.models.chatbot_batch_request import ChatbotBatchRequest
+from src.models.chatbot_batch_response import ChatbotBatchResponse
+from src.utils.logger import csv_logger, set_request_id
+from src.utils.interaction_store import interaction_store
+from src.utils.tracing import tracer
+from src.warmup import cache_warmer
+from src.utils.rate_limit import rate_limit_policy  # also registers the gcra strategy and sqlite:// storage
+from src.utils.semantic_cache import semantic_cache
+from src.services.clients import ClientFactory
+from src.utils.cache import consensus_cache, response_cache
+from src.utils.single_flight import response_flight
+from src.utils.concurrency_limit import Overloaded, kendra_limiter, openai_limiter
+from src.utils.circuit_breaker import kendra_breaker, openai_breaker
+from src.utils.metrics import (
+    HTTP_DURATION,
+    HTTP_REQUESTS,
+    format_server_timing,
+    metrics,
+    start_request_timings,
+)
 from src.configs.settings import settings
 
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="DocuChatAI API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan hook. Warms up upstream connections, opens the local
+    retriever index (when selected), restores the semantic cache snapshot, starts
+    metric snapshots for multi-worker aggregation and starts the cache warm-up
+    (reported by `GET /ready`) on startup; saves them and flushes buffered log
+    records, interactions and traces on shutdown.
+    """
+    if settings.get_client_warmup_enabled():
+        factory = ClientFactory.get_instance()
+        await asyncio.gather(asyncio.to_thread(factory.warm_up), factory.warm_up_async())
+    if settings.get_retriever_backend() == "local":
+        # Memory-maps the current index, or builds it if there is none yet
+        from src.services.local_retriever import LocalRetriever
+        await asyncio.to_thread(LocalRetriever.get_instance().get_index)
+    snapshot_path = settings.get_semantic_cache_snapshot_path()
+    if semantic_cache.enabled and snapshot_path:
+        semantic_cache.restore(snapshot_path)
+    metrics_dir = settings.get_metrics_multiproc_dir()
+    if metrics_dir:
+        metrics.start_snapshots(metrics_dir, settings.get_metrics_snapshot_interval())
+    warmup_task = asyncio.create_task(cache_warmer.run())
+    yield
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    if metrics_dir:
+        metrics.stop_snapshots(metrics_dir)
+    if semantic_cache.enabled and snapshot_path:
+        semantic_cache.snapshot(snapshot_path)
+    interaction_store.close()
+    tracer.shutdown()
+    csv_logger.close()
+
+# Buckets live in RATE_LIMIT_STORAGE_URI so every worker (and replica, with redis://) enforces the same limit
+limiter = Limiter(
+    key_func=rate_limit_policy.identify,
+    storage_uri=settings.get_rate_limit_storage_uri(),
+    strategy=settings.get_rate_limit_strategy(),
+)
+app = FastAPI(title="DocuChatAI API", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+metrics.register_callback(
+    "docuchat_cache_lookups_total", "Cache lookups by cache and outcome", "counter", ("cache", "outcome"),
+    lambda: {
+        (name, outcome): stats[outcome]
+        for name, stats in (
+            ("response", response_cache.get_stats()),
+            ("consensus", consensus_cache.get_stats()),
+            ("semantic", semantic_cache.get_stats()),
+        )
+        for outcome in ("hits", "misses")
+    },
+)
+metrics.register_callback(
+    "docuchat_single_flight_total", "Upstream computations and coalesced requests", "counter", ("kind",),
+    lambda: {(kind,): value for kind, value in response_flight.get_stats().items() if kind != "in_flight"},
+)
+
+metrics.register_callback(
+    "docuchat_concurrency_limit", "Current adaptive concurrency limit per upstream", "gauge", ("upstream", "state"),
+    lambda: {
+        (limiter.name, state): limiter.get_stats()[state]
+        for limiter in (kendra_limiter, openai_limiter)
+        for state in ("limit", "in_flight", "queued")
+    },
+)
+
+metrics.register_callback(
+    "docuchat_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)", "gauge",
+    ("upstream",),
+    lambda: {(breaker.name,): breaker.get_stats()["state"] for breaker in (kendra_breaker, openai_breaker)},
+)
+
+# Longest caller-supplied X-Request-ID kept
+REQUEST_ID_MAX_LENGTH = 128
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """
+    Records request latency and adds a per-stage `Server-Timing` header. Log
+    records of the request carry its `X-Request-ID` (taken from the caller or
+    generated), which is echoed in the response. Sampled requests are traced,
+    continuing the caller's `traceparent`, which is returned for the root span.
+    """
+    request_id = request.headers.get("X-Request-ID", "")[:REQUEST_ID_MAX_LENGTH] or uuid.uuid4().hex
+    set_request_id(request_id)
+    with tracer.start_trace(f"{request.method} {request.url.path}", request.headers.get("traceparent")) as span:
+        timings = start_request_timings()
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_DURATION.observe(elapsed, path)
+        HTTP_REQUESTS.inc(path, str(response.status_code))
+        response.headers["Server-Timing"] = format_server_timing(timings, elapsed * 1000)
+        response.headers["X-Request-ID"] = request_id
+        if span is not None:
+            # Streamed bodies are still being sent; their spans are exported when they end
+            span.name = f"{request.method} {path}"
+            span.set_attributes({
+                "http.request.method": request.method,
+                "http.route": path,
+                "http.response.status_code": response.status_code,
+                "http.request.body.size": int(request.headers.get("content-length") or 0),
+                "request.id": request_id,
+            })
+            response.headers["traceparent"] = span.traceparent
+    return response
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """
     Global exception handler to catch unhandled errors.
     """
-    csv_logger.log("ERROR", f"Unhandled exception for request {request.url}", exception=exc)
+    csv_logger.log("ERROR", "Unhandled exception for request %s", request.url, exception=exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error"},
     )
 
+@app.exception_handler(Overloaded)
+async def overloaded_exception_handler(request: Request, exc: Overloaded):
+    """
+    Sheds load: an upstream is at its concurrency limit or its circuit breaker is
+    open, so fail fast with 503 and tell the client when to retry instead of
+    queueing the request.
+    """
+    csv_logger.log("WARNING", "HTTP 503 at %s: %s", request.url, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """
@@ -34,18 +187,48 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     """
     # Log 500s as errors, others as warnings
     if exc.status_code >= 500:
-        csv_logger.log("ERROR", f"HTTP {exc.status_code} at {request.url}: {exc.detail}")
+        csv_logger.log("ERROR", "HTTP %d at %s: %s", exc.status_code, request.url, exc.detail)
     else:
-        csv_logger.log("WARNING", f"HTTP {exc.status_code} at {request.url}: {exc.detail}")
+        csv_logger.log("WARNING", "HTTP %d at %s: %s", exc.status_code, request.url, exc.detail)
         
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
 
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """
+    Keeps the documented 400 "Empty query." for an empty `query`; any other
+    invalid body gets FastAPI's default 422.
+    """
+    errors = exc.errors()
+    if errors and all(error["type"] == "string_too_short" and tuple(error["loc"]) == ("body", "query")
+                      for error in errors):
+        return await http_exception_handler(request, HTTPException(status_code=400, detail="Empty query."))
+    return await request_validation_exception_handler(request, exc)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Expose metrics in the Prometheus text format, aggregated across workers when
+    METRICS_MULTIPROC_DIR is set.
+    """
+    body = metrics.render(settings.get_metrics_multiproc_dir() or None)
+    return PlainTextResponse(body, media_type=metrics.CONTENT_TYPE)
+
+@app.get("/ready", include_in_schema=False)
+async def readiness_endpoint():
+    """
+    Readiness probe: 503 while the cache warms up, 200 once the worker should
+    receive traffic. The body reports warm-up progress.
+    """
+    status_code = 200 if cache_warmer.is_ready() else 503
+    return JSONResponse(status_code=status_code, content=cache_warmer.get_status())
+
 @app.post("/chatbot", response_model=List[ChatbotResponse])
-@limiter.limit(settings.get_api_rate_limit())
-def chatbot_endpoint(request: Request, chatbot_data: ChatbotRequest):
+@limiter.limit(rate_limit_policy.limit_for("chatbot", settings.get_api_rate_limit()))
+async def chatbot_endpoint(request: Request, chatbot_data: ChatbotRequest):
     """
     Process a chatbot query and return the response.
 
@@ -62,15 +245,114 @@ def chatbot_endpoint(request: Request, chatbot_data: ChatbotRequest):
             - 500 if an internal server error occurs during processing.
             - 404 if no answer is found.
             - 429 if rate limit is exceeded.
+            - 503 (with Retry-After) if Kendra or OpenAI is at its concurrency limit or its
+              circuit breaker is open (while only OpenAI's is open, Kendra excerpts are
+              returned with `degraded` set instead).
     """
     if not chatbot_data.query:
         raise HTTPException(status_code=400, detail="Empty query.")
     
-    csv_logger.log("INFO", f"Processing query: {chatbot_data.query}")
-    response = get_response_from_bot(chatbot_data.query)
+    csv_logger.log("INFO", "Processing query: %s", chatbot_data.query)
+    response = await get_response_from_bot_async(chatbot_data.query)
     
     if not response:
         raise HTTPException(status_code=404, detail="No answer found for your query.")
         
-    csv_logger.log("INFO", f"Successfully processed query: {chatbot_data.query}")
+    csv_logger.log("INFO", "Successfully processed query: %s", chatbot_data.query)
     return response
+
+@app.post("/chatbot/batch", response_model=List[ChatbotBatchResponse])
+@limiter.limit(rate_limit_policy.limit_for("batch", settings.get_api_batch_rate_limit()))
+async def chatbot_batch_endpoint(request: Request, batch_data: ChatbotBatchRequest):
+    """
+    Process many chatbot queries with bounded parallel fan-out.
+
+    Args:
+        request (Request): The raw HTTP request (required for rate limiting).
+        batch_data (ChatbotBatchRequest): The request body containing the queries.
+
+    Returns:
+        List[ChatbotBatchResponse]: One result per query in input order, or an NDJSON
+        stream of results in completion order when `stream` is set.
+
+    Raises:
+        HTTPException:
+            - 400 if the batch exceeds the configured maximum size.
+            - 429 if rate limit is exceeded.
+    """
+    if len(batch_data.queries) > settings.get_batch_max_queries():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds the maximum of {settings.get_batch_max_queries()} queries.",
+        )
+
+    csv_logger.log("INFO", "Processing batch of %d queries", len(batch_data.queries))
+
+    if batch_data.stream:
+        async def ndjson_lines():
+            async for item in get_responses_from_bot_stream(batch_data.queries):
+                yield item.model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    return await get_responses_from_bot_async(batch_data.queries)
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Formats one Server-Sent Event.
+
+    Args:
+        event (str): The event name.
+        data (Any): JSON-serializable payload (pydantic models are dumped).
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    if isinstance(data, list):
+        data = [item.model_dump() if hasattr(item, "model_dump") else item for item in data]
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chatbot/stream")
+@limiter.limit(rate_limit_policy.limit_for("stream", settings.get_api_stream_rate_limit()))
+async def chatbot_stream_endpoint(request: Request, chatbot_data: ChatbotRequest):
+    """
+    Process a chatbot query and stream the answer as Server-Sent Events.
+
+    Args:
+        request (Request): The raw HTTP request (required for rate limiting).
+        chatbot_data (ChatbotRequest): The request body containing the user's query.
+
+    Returns:
+        StreamingResponse: `sources` (query ID and URLs) is sent as soon as Kendra
+        answers, then `token` and `partial` events while the model generates, and
+        a final `result` event with the `ChatbotResponse` list (or `error`).
+
+    Raises:
+        HTTPException:
+            - 400 if the query is empty.
+            - 429 if rate limit is exceeded.
+    """
+    if not chatbot_data.query:
+        raise HTTPException(status_code=400, detail="Empty query.")
+
+    csv_logger.log("INFO", "Streaming query: %s", chatbot_data.query)
+
+    async def events():
+        try:
+            async for event, data in stream_response_from_bot(chatbot_data.query):
+                if event == "result" and not data:
+                    yield format_sse("error", {"detail": "No answer found for your query."})
+                    continue
+                yield format_sse(event, data)
+        except Overloaded as ex:
+            csv_logger.log("WARNING", "Shed streaming query (%s): %s", ex, chatbot_data.query)
+            yield format_sse("error", {"detail": ex.detail, "retryAfter": ex.retry_after})
+        except Exception as ex:
+            csv_logger.log("ERROR", "Exception while streaming query: %s", chatbot_data.query, exception=ex)
+            yield format_sse("error", {"detail": "Internal Server Error"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
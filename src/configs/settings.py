@@ -1,62 +1,557 @@
 import os
+import json
+import functools
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Union
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from typing import Optional
+
+def _memoized(getter: Callable[["Settings"], Any]) -> Callable[["Settings"], Any]:
+    """Parses a setting on first access and returns the stored value afterwards."""
+    name = getter.__name__
+
+    @functools.wraps(getter)
+    def wrapper(self: "Settings") -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = getter(self)
+            return value
+    return wrapper
 
 
 class Settings:
     """
     Configuration settings for the application.
     Loads environment variables from .env file.
+
+    The environment is read once into a read-only snapshot and every getter
+    parses its value once, so getters on the request path are a dict lookup.
+    Call `reload()` after changing the environment.
     """
 
+    def __init__(self, environ: Optional[Mapping[str, str]] = None):
+        """
+        Args:
+            environ (Optional[Mapping[str, str]]): Variables to read; `os.environ` when omitted.
+        """
+        self.reload(environ)
+
+    def reload(self, environ: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Takes a new snapshot of the environment and drops every parsed value.
+
+        Args:
+            environ (Optional[Mapping[str, str]]): Variables to read; `os.environ` when omitted.
+        """
+        self._env: Mapping[str, str] = MappingProxyType(dict(os.environ if environ is None else environ))
+        self._values: dict = {}
+
     def get_aws_access_key(self) -> Optional[str]:
         """Returns the AWS Access Key ID."""
-        return os.getenv("AWS_ACCESS_KEY_ID", "")
+        return self._env.get("AWS_ACCESS_KEY_ID", "")
 
     def get_aws_secret_key(self) -> Optional[str]:
         """Returns the AWS Secret Access Key."""
-        return os.getenv("AWS_SECRET_ACCESS_KEY", "")
+        return self._env.get("AWS_SECRET_ACCESS_KEY", "")
 
     def get_aws_kendra_index_id(self) -> str:
         """Returns the Kendra Index ID."""
-        return os.getenv("AWS_KENDRA_INDEX_ID", "")
+        return self._env.get("AWS_KENDRA_INDEX_ID", "")
 
     def get_openai_secret_key(self) -> Optional[str]:
         """Returns the OpenAI API Key."""
-        return os.getenv("OPENAI_API_KEY", "")
+        return self._env.get("OPENAI_API_KEY", "")
 
     def get_aws_region(self) -> str:
         """Returns the AWS Region. Defaults to 'us-east-2'."""
-        return os.getenv("AWS_REGION", "us-east-2")
+        return self._env.get("AWS_REGION", "us-east-2")
 
     def get_log_dir(self) -> str:
         """Returns the directory for log files. Defaults to 'logs'."""
-        return os.getenv("LOG_DIR", "logs")
+        return self._env.get("LOG_DIR", "logs")
 
     def get_log_filename_suffix(self) -> str:
-        """Returns the suffix for log files. Defaults to 'app_log.csv'."""
-        return os.getenv("LOG_FILENAME_SUFFIX", "app_log.csv")
+        """Returns the suffix for log files. Defaults to 'app_log.csv' ('app_log.jsonl' with LOG_FORMAT=json)."""
+        return self._env.get("LOG_FILENAME_SUFFIX") or (
+            "app_log.jsonl" if self.get_log_format() == "json" else "app_log.csv"
+        )
+
+    def get_log_format(self) -> str:
+        """Returns the log file format ('csv' or 'json' for newline-delimited JSON). Defaults to 'csv'."""
+        return self._env.get("LOG_FORMAT", "csv").lower()
+
+    def get_log_level(self) -> str:
+        """Returns the minimum level written to the log (DEBUG, INFO, WARNING, ERROR). Defaults to 'INFO'."""
+        return self._env.get("LOG_LEVEL", "INFO").upper()
+
+    def get_log_sample_rate(self) -> float:
+        """Returns the fraction of INFO and DEBUG records kept (WARNING and above are always kept). Defaults to 1.0."""
+        return float(self._env.get("LOG_SAMPLE_RATE", 1.0))
+
+    def get_log_max_bytes(self) -> int:
+        """Returns the size at which a day's log continues in a new numbered file (0 disables). Defaults to 104857600."""
+        return int(self._env.get("LOG_MAX_BYTES", 104857600))
+
+    def get_log_batch_size(self) -> int:
+        """Returns the max number of log records written per batch. Defaults to 100."""
+        return int(self._env.get("LOG_BATCH_SIZE", 100))
+
+    def get_log_flush_interval(self) -> float:
+        """Returns the max seconds a log record waits before being flushed. Defaults to 1.0."""
+        return float(self._env.get("LOG_FLUSH_INTERVAL", 1.0))
+
+    def get_tracing_enabled(self) -> bool:
+        """Returns whether sampled requests are traced. Defaults to False."""
+        return self._env.get("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    def get_tracing_sample_rate(self) -> float:
+        """Returns the fraction of requests traced (a caller's sampled traceparent is always followed). Defaults to 0.01."""
+        return float(self._env.get("TRACING_SAMPLE_RATE", 0.01))
+
+    def get_tracing_exporter(self) -> str:
+        """Returns where finished traces go ('otlp-file', 'stdout', 'memory' or 'none'). Defaults to 'otlp-file'."""
+        return self._env.get("TRACING_EXPORTER", "otlp-file").lower()
+
+    def get_tracing_otlp_path(self) -> str:
+        """Returns the OTLP/JSON lines file of the otlp-file exporter. Defaults to '<LOG_DIR>/traces.jsonl'."""
+        return self._env.get("TRACING_OTLP_PATH") or os.path.join(self.get_log_dir(), "traces.jsonl")
+
+    def get_tracing_service_name(self) -> str:
+        """Returns the service.name resource attribute of exported spans. Defaults to 'docuchat-api'."""
+        return self._env.get("TRACING_SERVICE_NAME", "docuchat-api")
+
+    def get_interaction_store_enabled(self) -> bool:
+        """Returns whether every answered query is recorded in the interaction store. Defaults to True."""
+        return self._env.get("INTERACTION_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_interaction_store_path(self) -> str:
+        """Returns the SQLite file of the interaction store. Defaults to '<LOG_DIR>/interactions.sqlite3'."""
+        return self._env.get("INTERACTION_STORE_PATH") or os.path.join(self.get_log_dir(), "interactions.sqlite3")
+
+    def get_interaction_store_batch_size(self) -> int:
+        """Returns the max number of interactions inserted per transaction. Defaults to 200."""
+        return int(self._env.get("INTERACTION_STORE_BATCH_SIZE", 200))
+
+    def get_interaction_store_flush_interval(self) -> float:
+        """Returns the max seconds an interaction waits before being written. Defaults to 1.0."""
+        return float(self._env.get("INTERACTION_STORE_FLUSH_INTERVAL", 1.0))
 
     def get_open_ai_model(self) -> str:
         """Returns the OpenAI model. Defaults to 'gpt-3.5-turbo'."""
-        return os.getenv("OPEN_AI_MODEL", "gpt-3.5-turbo")
+        return self._env.get("OPEN_AI_MODEL", "gpt-3.5-turbo")
 
     def get_max_urls_to_process(self) -> int:
         """Returns the maximum number of URLs to process. Defaults to 3."""
-        return int(os.getenv("MAX_URLS_TO_PROCESS", 3))
+        return int(self._env.get("MAX_URLS_TO_PROCESS", 3))
 
     def get_api_rate_limit(self) -> str:
         """Returns the API rate limit. Defaults to 10/minute."""
-        return str(os.getenv("API_RATE_LIMIT", "10/minute"))
+        return str(self._env.get("API_RATE_LIMIT", "10/minute"))
+
+    def get_rate_limit_storage_uri(self) -> str:
+        """Returns where rate-limit counters live (memory://, sqlite://<path>, redis://...). Defaults to 'memory://'."""
+        return self._env.get("RATE_LIMIT_STORAGE_URI", "memory://")
+
+    def get_api_batch_rate_limit(self) -> str:
+        """Returns the batch API rate limit. Defaults to 5/minute."""
+        return str(self._env.get("API_BATCH_RATE_LIMIT", "5/minute"))
+
+    def get_api_stream_rate_limit(self) -> str:
+        """Returns the streaming API rate limit. Defaults to API_RATE_LIMIT."""
+        return str(self._env.get("API_STREAM_RATE_LIMIT", self.get_api_rate_limit()))
+
+    def get_rate_limit_strategy(self) -> str:
+        """Returns the rate-limit algorithm (gcra, fixed-window, moving-window, sliding-window-counter). Defaults to 'gcra'."""
+        return self._env.get("RATE_LIMIT_STRATEGY", "gcra")
+
+    def get_rate_limit_api_key_header(self) -> str:
+        """Returns the header carrying a tenant's API key. Defaults to 'X-API-Key'."""
+        return self._env.get("RATE_LIMIT_API_KEY_HEADER", "X-API-Key")
+
+    def get_rate_limit_trusted_proxy_hops(self) -> int:
+        """Returns how many proxies in front of the API append to X-Forwarded-For. Defaults to 0 (header ignored)."""
+        return int(self._env.get("RATE_LIMIT_TRUSTED_PROXY_HOPS", 0))
+
+    def get_rate_limit_tenants(self) -> Dict[str, Union[str, Dict[str, str]]]:
+        """
+        Returns per-tenant quotas as JSON keyed by API key; a value is one limit for every
+        endpoint or a {"chatbot"|"batch"|"stream": limit} object. Defaults to none.
+        """
+        return json.loads(self._env.get("RATE_LIMIT_TENANTS") or "{}")
+
+    def get_batch_max_queries(self) -> int:
+        """Returns the maximum number of queries in one batch request. Defaults to 1000."""
+        return int(self._env.get("BATCH_MAX_QUERIES", 1000))
+
+    def get_batch_kendra_concurrency(self) -> int:
+        """Returns the number of concurrent Kendra calls per batch. Defaults to 8."""
+        return int(self._env.get("BATCH_KENDRA_CONCURRENCY", 8))
+
+    def get_batch_openai_concurrency(self) -> int:
+        """Returns the number of concurrent OpenAI calls per batch. Defaults to 4."""
+        return int(self._env.get("BATCH_OPENAI_CONCURRENCY", 4))
 
     def get_max_tokens(self) -> int:
         """Returns the max tokens. Defaults to 1000."""
-        return int(os.getenv("MAX_TOKENS", 1000))
+        return int(self._env.get("MAX_TOKENS", 1000))
+
+    def get_kendra_max_workers(self) -> int:
+        """Returns the size of the thread pool used for async Kendra calls. Defaults to 32."""
+        return int(self._env.get("KENDRA_MAX_WORKERS", 32))
+
+    def get_kendra_page_count(self) -> int:
+        """Returns how many Kendra result pages are fetched per query. Defaults to 1."""
+        return max(1, int(self._env.get("KENDRA_PAGE_COUNT", 1)))
+
+    def get_kendra_page_size(self) -> int:
+        """Returns the Kendra results per page (Kendra allows up to 100). Defaults to 10."""
+        return min(100, max(1, int(self._env.get("KENDRA_PAGE_SIZE", 10))))
+
+    def get_kendra_page_workers(self) -> int:
+        """Returns the size of the thread pool fetching extra Kendra pages. Defaults to 16."""
+        return int(self._env.get("KENDRA_PAGE_WORKERS", 16))
+
+    def get_kendra_high_confidence_target(self) -> int:
+        """Returns the VERY HIGH/HIGH answers after which later pages are skipped (0 = never). Defaults to 3."""
+        return int(self._env.get("KENDRA_HIGH_CONFIDENCE_TARGET", 3))
+
+    def get_openai_max_connections(self) -> int:
+        """Returns the OpenAI HTTP pool size. Defaults to 100."""
+        return int(self._env.get("OPENAI_MAX_CONNECTIONS", 100))
+
+    def get_openai_max_keepalive_connections(self) -> int:
+        """Returns the idle OpenAI connections kept alive. Defaults to 20."""
+        return int(self._env.get("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+
+    def get_openai_keepalive_expiry(self) -> float:
+        """Returns the seconds an idle OpenAI connection is kept. Defaults to 30."""
+        return float(self._env.get("OPENAI_KEEPALIVE_EXPIRY", 30))
+
+    def get_openai_connect_timeout(self) -> float:
+        """Returns the OpenAI connect timeout in seconds. Defaults to 5."""
+        return float(self._env.get("OPENAI_CONNECT_TIMEOUT", 5))
+
+    def get_openai_read_timeout(self) -> float:
+        """Returns the OpenAI read timeout in seconds. Defaults to 60."""
+        return float(self._env.get("OPENAI_READ_TIMEOUT", 60))
+
+    def get_openai_write_timeout(self) -> float:
+        """Returns the OpenAI write timeout in seconds. Defaults to 10."""
+        return float(self._env.get("OPENAI_WRITE_TIMEOUT", 10))
+
+    def get_openai_pool_timeout(self) -> float:
+        """Returns the seconds to wait for a free OpenAI connection. Defaults to 5."""
+        return float(self._env.get("OPENAI_POOL_TIMEOUT", 5))
+
+    def get_openai_max_retries(self) -> int:
+        """Returns the OpenAI SDK retry count. Defaults to 2."""
+        return int(self._env.get("OPENAI_MAX_RETRIES", 2))
+
+    def get_kendra_max_pool_connections(self) -> int:
+        """Returns the botocore connection pool size for Kendra. Defaults to 50."""
+        return int(self._env.get("KENDRA_MAX_POOL_CONNECTIONS", 50))
+
+    def get_kendra_connect_timeout(self) -> float:
+        """Returns the Kendra connect timeout in seconds. Defaults to 5."""
+        return float(self._env.get("KENDRA_CONNECT_TIMEOUT", 5))
+
+    def get_kendra_read_timeout(self) -> float:
+        """Returns the Kendra read timeout in seconds. Defaults to 30."""
+        return float(self._env.get("KENDRA_READ_TIMEOUT", 30))
+
+    def get_kendra_max_attempts(self) -> int:
+        """Returns the max Kendra attempts (adaptive retry mode). Defaults to 3."""
+        return int(self._env.get("KENDRA_MAX_ATTEMPTS", 3))
+
+    def get_client_warmup_enabled(self) -> bool:
+        """Returns whether upstream connections are opened on startup. Defaults to True."""
+        return self._env.get("CLIENT_WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_warmup_enabled(self) -> bool:
+        """Returns whether the most frequent past queries are replayed into the cache on startup. Defaults to False."""
+        return self._env.get("WARMUP_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    def get_warmup_source(self) -> str:
+        """Returns where query history is read from ('auto', 'store' or 'logs'). Defaults to 'auto'."""
+        return self._env.get("WARMUP_SOURCE", "auto").lower()
+
+    def get_warmup_top_n(self) -> int:
+        """Returns the number of queries replayed by the cache warm-up. Defaults to 100."""
+        return int(self._env.get("WARMUP_TOP_N", 100))
+
+    def get_warmup_concurrency(self) -> int:
+        """Returns the number of queries replayed concurrently by the cache warm-up. Defaults to 4."""
+        return int(self._env.get("WARMUP_CONCURRENCY", 4))
+
+    def get_warmup_lookback_days(self) -> float:
+        """Returns how many days of query history the warm-up ranks. Defaults to 7."""
+        return float(self._env.get("WARMUP_LOOKBACK_DAYS", 7))
+
+    def get_warmup_half_life_hours(self) -> float:
+        """Returns the age in hours at which a past query counts half when ranking. Defaults to 24."""
+        return float(self._env.get("WARMUP_HALF_LIFE_HOURS", 24))
+
+    def get_warmup_timeout(self) -> float:
+        """Returns the max seconds the worker stays unready while warming up. Defaults to 120."""
+        return float(self._env.get("WARMUP_TIMEOUT", 120))
+
+    def get_warmup_refresh_interval(self) -> float:
+        """Returns the seconds between refreshes of the warm queries (0 disables). Defaults to 80% of RESPONSE_CACHE_TTL."""
+        return float(self._env.get("WARMUP_REFRESH_INTERVAL", 0.8 * self.get_response_cache_ttl()))
+
+    def get_response_cache_enabled(self) -> bool:
+        """Returns whether the response cache is enabled. Defaults to True."""
+        return self._env.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_response_cache_ttl(self) -> float:
+        """Returns the in-process response cache TTL in seconds. Defaults to 3600."""
+        return float(self._env.get("RESPONSE_CACHE_TTL", 3600))
+
+    def get_response_cache_max_entries(self) -> int:
+        """Returns the in-process response cache capacity. Defaults to 1024."""
+        return int(self._env.get("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+
+    def get_response_cache_backend(self) -> str:
+        """Returns the shared response cache tier ('', 'sqlite' or 'redis'). Defaults to ''."""
+        return self._env.get("RESPONSE_CACHE_BACKEND", "").lower()
+
+    def get_response_cache_shared_ttl(self) -> float:
+        """Returns the shared response cache TTL in seconds. Defaults to 86400."""
+        return float(self._env.get("RESPONSE_CACHE_SHARED_TTL", 86400))
+
+    def get_response_cache_sqlite_path(self) -> str:
+        """Returns the SQLite file used by the shared response cache. Defaults to 'response_cache.sqlite3'."""
+        return self._env.get("RESPONSE_CACHE_SQLITE_PATH", "response_cache.sqlite3")
+
+    def get_response_cache_redis_url(self) -> str:
+        """Returns the Redis URL used by the shared response cache. Defaults to 'redis://localhost:6379/0'."""
+        return self._env.get("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    def get_consensus_cache_enabled(self) -> bool:
+        """Returns whether consensus results are memoized. Defaults to True."""
+        return self._env.get("CONSENSUS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_consensus_cache_max_entries(self) -> int:
+        """Returns the in-process consensus cache capacity. Defaults to 4096."""
+        return int(self._env.get("CONSENSUS_CACHE_MAX_ENTRIES", 4096))
+
+    def get_consensus_cache_ttl(self) -> float:
+        """Returns the consensus cache TTL in seconds. Defaults to 86400."""
+        return float(self._env.get("CONSENSUS_CACHE_TTL", 86400))
+
+    def get_consensus_cache_path(self) -> str:
+        """Returns the SQLite file persisting the consensus cache. Defaults to '' (memory only)."""
+        return self._env.get("CONSENSUS_CACHE_PATH", "")
+
+    def get_open_ai_embedding_model(self) -> str:
+        """Returns the OpenAI embedding model. Defaults to 'text-embedding-3-small'."""
+        return self._env.get("OPEN_AI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+    def get_semantic_cache_enabled(self) -> bool:
+        """Returns whether the semantic query cache is enabled. Defaults to False."""
+        return self._env.get("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    def get_semantic_cache_embedder(self) -> str:
+        """Returns the semantic cache embedder ('openai' or 'hashing'). Defaults to 'openai'."""
+        return self._env.get("SEMANTIC_CACHE_EMBEDDER", "openai").lower()
+
+    def get_semantic_cache_dim(self) -> int:
+        """Returns the vector size of the local hashing embedder. Defaults to 512."""
+        return int(self._env.get("SEMANTIC_CACHE_DIM", 512))
+
+    def get_semantic_cache_threshold(self) -> float:
+        """Returns the cosine similarity needed to serve a cached answer. Defaults to 0.92."""
+        return float(self._env.get("SEMANTIC_CACHE_THRESHOLD", 0.92))
+
+    def get_semantic_cache_max_entries(self) -> int:
+        """Returns the semantic cache capacity. Defaults to 10000."""
+        return int(self._env.get("SEMANTIC_CACHE_MAX_ENTRIES", 10000))
+
+    def get_semantic_cache_ttl(self) -> float:
+        """Returns the semantic cache TTL in seconds. Defaults to 3600."""
+        return float(self._env.get("SEMANTIC_CACHE_TTL", 3600))
+
+    def get_semantic_cache_ivf_threshold(self) -> int:
+        """Returns the entry count above which the IVF index is used. Defaults to 20000."""
+        return int(self._env.get("SEMANTIC_CACHE_IVF_THRESHOLD", 20000))
+
+    def get_semantic_cache_ivf_nprobe(self) -> int:
+        """Returns the number of IVF lists scanned per lookup. Defaults to 8."""
+        return int(self._env.get("SEMANTIC_CACHE_IVF_NPROBE", 8))
+
+    def get_semantic_cache_snapshot_path(self) -> str:
+        """Returns the .npy snapshot restored on startup and saved on shutdown. Defaults to ''."""
+        return self._env.get("SEMANTIC_CACHE_SNAPSHOT_PATH", "")
+
+    def get_selection_enabled(self) -> bool:
+        """Returns whether answers are ranked, deduped and token-budgeted before consensus. Defaults to True."""
+        return self._env.get("SELECTION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_selection_token_budget(self) -> int:
+        """Returns the token budget for the statements sent to consensus. Defaults to 2000."""
+        return int(self._env.get("SELECTION_TOKEN_BUDGET", 2000))
+
+    def get_selection_top_k(self) -> int:
+        """Returns the maximum number of statements sent to consensus. Defaults to 10."""
+        return int(self._env.get("SELECTION_TOP_K", 10))
+
+    def get_selection_overlap_weight(self) -> float:
+        """Returns the share of the ranking score given to query overlap vs. confidence. Defaults to 0.5."""
+        return float(self._env.get("SELECTION_OVERLAP_WEIGHT", 0.5))
+
+    def get_selection_duplicate_threshold(self) -> float:
+        """Returns the estimated Jaccard similarity above which excerpts are duplicates. Defaults to 0.8."""
+        return float(self._env.get("SELECTION_DUPLICATE_THRESHOLD", 0.8))
+
+    def get_retriever_backend(self) -> str:
+        """Returns the document retriever: 'kendra' or 'local'. Defaults to 'kendra'."""
+        return self._env.get("RETRIEVER_BACKEND", "kendra").lower()
+
+    def get_local_retriever_corpus_dir(self) -> str:
+        """Returns the directory of .txt/.md documents indexed by the local retriever. Defaults to 'corpus'."""
+        return self._env.get("LOCAL_RETRIEVER_CORPUS_DIR", "corpus")
+
+    def get_local_retriever_index_dir(self) -> str:
+        """Returns the directory holding the memory-mapped local index. Defaults to 'local_index'."""
+        return self._env.get("LOCAL_RETRIEVER_INDEX_DIR", "local_index")
+
+    def get_local_retriever_chunk_words(self) -> int:
+        """Returns the target chunk size in words. Defaults to 120."""
+        return int(self._env.get("LOCAL_RETRIEVER_CHUNK_WORDS", 120))
+
+    def get_local_retriever_top_k(self) -> int:
+        """Returns the number of chunks returned per query. Defaults to 10."""
+        return int(self._env.get("LOCAL_RETRIEVER_TOP_K", 10))
+
+    def get_local_retriever_dense(self) -> bool:
+        """Returns whether dense vectors are blended into BM25 scores. Defaults to False."""
+        return self._env.get("LOCAL_RETRIEVER_DENSE", "false").lower() in ("1", "true", "yes")
+
+    def get_local_retriever_dense_weight(self) -> float:
+        """Returns the share of the hybrid score given to dense similarity. Defaults to 0.3."""
+        return float(self._env.get("LOCAL_RETRIEVER_DENSE_WEIGHT", 0.3))
+
+    def get_local_retriever_base_url(self) -> str:
+        """Returns the URL prefix for local document links; file paths are used when empty. Defaults to ''."""
+        return self._env.get("LOCAL_RETRIEVER_BASE_URL", "")
+
+    def get_server_workers(self) -> int:
+        """Returns the number of worker processes; 0 means one per CPU. Defaults to 0."""
+        return int(self._env.get("SERVER_WORKERS", 0))
+
+    def get_server_host(self) -> str:
+        """Returns the address the server binds to. Defaults to '0.0.0.0'."""
+        return self._env.get("SERVER_HOST", "0.0.0.0")
+
+    def get_server_port(self) -> int:
+        """Returns the port the server binds to. Defaults to 8000."""
+        return int(self._env.get("SERVER_PORT", 8000))
+
+    def get_server_state_dir(self) -> str:
+        """Returns the directory for state shared by workers; a fresh temp dir when empty. Defaults to ''."""
+        return self._env.get("SERVER_STATE_DIR", "")
+
+    def get_metrics_multiproc_dir(self) -> str:
+        """Returns the directory where workers write metric snapshots; empty for one process. Defaults to ''."""
+        return self._env.get("METRICS_MULTIPROC_DIR", "")
+
+    def get_metrics_snapshot_interval(self) -> float:
+        """Returns the seconds between metric snapshots of a worker. Defaults to 5."""
+        return float(self._env.get("METRICS_SNAPSHOT_INTERVAL", 5))
+
+    def get_concurrency_limit_enabled(self) -> bool:
+        """Returns whether upstream calls go through the adaptive concurrency limiters. Defaults to True."""
+        return self._env.get("CONCURRENCY_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_kendra_concurrency_limit(self) -> int:
+        """Returns the initial number of concurrent Kendra queries allowed. Defaults to 20."""
+        return int(self._env.get("KENDRA_CONCURRENCY_LIMIT", 20))
+
+    def get_openai_concurrency_limit(self) -> int:
+        """Returns the initial number of concurrent OpenAI completions allowed. Defaults to 20."""
+        return int(self._env.get("OPENAI_CONCURRENCY_LIMIT", 20))
+
+    def get_concurrency_limit_min(self) -> int:
+        """Returns the lowest an adaptive concurrency limit may go. Defaults to 2."""
+        return max(1, int(self._env.get("CONCURRENCY_LIMIT_MIN", 2)))
+
+    def get_concurrency_limit_max(self) -> int:
+        """Returns the highest an adaptive concurrency limit may go. Defaults to 200."""
+        return int(self._env.get("CONCURRENCY_LIMIT_MAX", 200))
+
+    def get_concurrency_limit_tolerance(self) -> float:
+        """Returns the latency growth over the long-term average tolerated before a limit shrinks. Defaults to 1.5."""
+        return float(self._env.get("CONCURRENCY_LIMIT_TOLERANCE", 1.5))
+
+    def get_concurrency_queue_size(self) -> int:
+        """Returns the number of calls per upstream allowed to wait for a slot. Defaults to 16."""
+        return int(self._env.get("CONCURRENCY_QUEUE_SIZE", 16))
+
+    def get_concurrency_queue_timeout(self) -> float:
+        """Returns the seconds a call waits for a slot before it is shed with 503. Defaults to 1.0."""
+        return float(self._env.get("CONCURRENCY_QUEUE_TIMEOUT", 1.0))
+
+    def get_circuit_breaker_enabled(self) -> bool:
+        """Returns whether Kendra and OpenAI calls go through circuit breakers. Defaults to True."""
+        return self._env.get("CIRCUIT_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_circuit_breaker_window(self) -> float:
+        """Returns the seconds of call outcomes a breaker's failure rate covers. Defaults to 30."""
+        return float(self._env.get("CIRCUIT_BREAKER_WINDOW", 30))
+
+    def get_circuit_breaker_min_calls(self) -> int:
+        """Returns the calls a breaker's window must hold before it may open. Defaults to 10."""
+        return int(self._env.get("CIRCUIT_BREAKER_MIN_CALLS", 10))
+
+    def get_circuit_breaker_failure_rate(self) -> float:
+        """Returns the failure share (0..1) that opens a breaker. Defaults to 0.5."""
+        return float(self._env.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+
+    def get_circuit_breaker_open_seconds(self) -> float:
+        """Returns the seconds an open breaker fails fast before probing the upstream. Defaults to 15."""
+        return float(self._env.get("CIRCUIT_BREAKER_OPEN_SECONDS", 15))
+
+    def get_circuit_breaker_half_open_calls(self) -> int:
+        """Returns the successful probe calls that close a half-open breaker. Defaults to 3."""
+        return max(1, int(self._env.get("CIRCUIT_BREAKER_HALF_OPEN_CALLS", 3)))
+
+    def get_degraded_mode_enabled(self) -> bool:
+        """Returns whether Kendra excerpts are returned as answers while OpenAI is unavailable. Defaults to True."""
+        return self._env.get("DEGRADED_MODE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def get_degraded_max_answers(self) -> int:
+        """Returns the number of Kendra excerpts returned in degraded mode. Defaults to 3."""
+        return int(self._env.get("DEGRADED_MAX_ANSWERS", 3))
+
+    def get_hedging_enabled(self) -> bool:
+        """Returns whether slow Kendra and OpenAI calls are hedged with a second attempt. Defaults to False."""
+        return self._env.get("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    def get_hedging_quantile(self) -> float:
+        """Returns the observed latency quantile after which a hedge is sent. Defaults to 0.95."""
+        return float(self._env.get("HEDGING_QUANTILE", 0.95))
+
+    def get_hedging_budget_percent(self) -> float:
+        """Returns the maximum hedges as a percentage of calls per upstream. Defaults to 5."""
+        return float(self._env.get("HEDGING_BUDGET_PERCENT", 5))
+
+    def get_hedging_min_delay_ms(self) -> float:
+        """Returns the minimum milliseconds before a hedge is sent. Defaults to 10."""
+        return float(self._env.get("HEDGING_MIN_DELAY_MS", 10))
+
+    def get_hedging_workers(self) -> int:
+        """Returns the size of the thread pool running hedged sync calls. Defaults to 32."""
+        return int(self._env.get("HEDGING_WORKERS", 32))
+
 
+for _name, _getter in list(vars(Settings).items()):
+    if _name.startswith("get_"):
+        setattr(Settings, _name, _memoized(_getter))
+del _name, _getter
 
 # Create a global instance to be used by other modules
 settings = Settings()
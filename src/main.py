@@ -1,41 +1,68 @@
-from typing import List
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Tuple
 from src.services.aws_kendra import AWSKendra
+from src.services.retriever import Retriever
 from src.services.openai import OpenAI
 from src.utils.logger import csv_logger
+from src.utils.cache import ResponseCache, response_cache
+from src.utils.semantic_cache import semantic_cache
+from src.utils.single_flight import response_flight
+from src.utils.selection import answer_selector
+from src.utils.concurrency_limit import Overloaded
+from src.utils.circuit_breaker import CircuitOpen
+from src.utils.interaction_store import current_interaction, interaction_store
+from src.utils.metrics import DEGRADED_RESPONSES, EMPTY_RESULTS, PROMPT_TOKENS, timed
 from src.models.chatbot_response import ChatbotResponse
+from src.models.kendra_answer import KendraAnswer
+from src.models.chatbot_batch_response import ChatbotBatchResponse
 from src.configs.settings import settings
 
-def get_response_from_bot(query: str) -> List[ChatbotResponse]:
+def _get_retriever() -> Retriever:
     """
-    Orchestrates the chatbot response generation process.
+    Returns the configured document retriever (`settings.get_retriever_backend()`).
+    """
+    if settings.get_retriever_backend() == "local":
+        # Imported on first use: only the local backend needs the index code
+        from src.services.local_retriever import LocalRetriever
+        return LocalRetriever.get_instance()
+    return AWSKendra.get_instance()
+
+def _collect_answers(answers: Iterable[KendraAnswer]) -> Tuple[List[str], List[int], List[str]]:
+    """
+    Splits extracted Kendra answers into statements, weights and unique source URLs.
 
     Args:
-        query (str): The user's query string.
+        answers (Iterable[KendraAnswer]): Extracted answers.
 
     Returns:
-        Optional[ChatbotResponse]: A structured response object, or None if no answer found.
+        Tuple[List[str], List[int], List[str]]: Statements, weights and URLs (first-seen order).
     """
-    query_id, result_items = AWSKendra.get_instance().get_kendra_query_results(query=query)
-    answers_with_urls = AWSKendra.get_instance().get_answers_from_query_results(result_items=result_items)
-    
     statements: List[str] = []
     weights: List[int] = []
-    urls: List[str] = []
-    
-    csv_logger.log("INFO", f"Kendra returned {len(answers_with_urls)} answers for query: {query}")
-
-    for item in answers_with_urls:
-        ans = item[0]
-        weight = item[2]
-        statements.append(ans)
-        weights.append(weight)
-        if item[1] not in urls:
-            urls.append(item[1])
-            
-    res = OpenAI.get_instance().get_consensus(statements, weights, query)
-    
+    urls: Dict[str, None] = {}
+
+    for answer in answers:
+        statements.append(answer.text)
+        weights.append(answer.confidence)
+        urls[answer.url] = None
+
+    return statements, weights, list(urls)
+
+def _build_responses(query: str, query_id: Optional[str], urls: List[str], res: Dict[str, int]) -> List[ChatbotResponse]:
+    """
+    Converts a consensus result into the response models returned by the API.
+
+    Args:
+        query (str): The user's query string.
+        query_id (Optional[str]): The Kendra QueryId.
+        urls (List[str]): Unique source URLs.
+        res (Dict[str, int]): Consensus answers mapped to their scores.
+
+    Returns:
+        List[ChatbotResponse]: One response per consensus answer.
+    """
     results: List[ChatbotResponse] = []
-    
+
     for key, value in res.items():
         response = ChatbotResponse(
             queryId=str(query_id),
@@ -46,6 +73,380 @@ def get_response_from_bot(query: str) -> List[ChatbotResponse]:
         results.append(response)
 
     if not results:
-        csv_logger.log("WARNING", f"No consensus answer found for query: {query}")
+        csv_logger.log("WARNING", "No consensus answer found for query: %s", query)
+
+    return results
+
+def _degraded_response(query: str, query_id: Optional[str], statements: List[str], weights: List[int],
+                       urls: List[str]) -> List[ChatbotResponse]:
+    """
+    Answers with the top-weighted Kendra excerpts while OpenAI's circuit breaker is open.
+    The responses are flagged `degraded` and not cached, so consensus answers come back
+    as soon as OpenAI recovers.
+
+    Args:
+        query (str): The user's query string.
+        query_id (Optional[str]): The Kendra QueryId.
+        statements (List[str]): Selected Kendra excerpts.
+        weights (List[int]): Confidence weight of each excerpt.
+        urls (List[str]): Unique source URLs.
+
+    Returns:
+        List[ChatbotResponse]: Up to `settings.get_degraded_max_answers()` excerpts, best first.
+    """
+    ranked = sorted(range(len(statements)), key=weights.__getitem__, reverse=True)
+    ranked = ranked[:settings.get_degraded_max_answers()]
+    DEGRADED_RESPONSES.inc("openai")
+    csv_logger.log("WARNING", "OpenAI unavailable, answering with %d Kendra excerpts for query: %s", len(ranked), query)
+    return [
+        ChatbotResponse(
+            queryId=str(query_id),
+            answer=statements[index],
+            score=weights[index],
+            urls=urls[:settings.get_max_urls_to_process()],
+            degraded=True,
+        )
+        for index in ranked
+    ]
+
+def _get_cached_response(query: str) -> Optional[List[ChatbotResponse]]:
+    """
+    Looks the query up in the exact-match cache, then in the semantic cache.
+
+    Args:
+        query (str): The user's query string.
+
+    Returns:
+        Optional[List[ChatbotResponse]]: Cached responses, or None on a miss.
+    """
+    with timed("cache"):
+        cached = response_cache.get(query)
+        if cached is not None:
+            return cached
+        cached = semantic_cache.get(query)
+        if cached is not None:
+            response_cache.set(query, cached)
+        return cached
+
+async def _get_cached_response_async(query: str) -> Optional[List[ChatbotResponse]]:
+    """
+    Async variant of `_get_cached_response`.
+    """
+    with timed("cache"):
+        cached = response_cache.get(query)
+        if cached is not None:
+            return cached
+        cached = await semantic_cache.get_async(query)
+        if cached is not None:
+            response_cache.set(query, cached)
+        return cached
+
+def _extract_answers(result_items: Optional[List[Any]], query: str,
+                     query_id: Optional[str] = None) -> Tuple[List[str], List[int], List[str]]:
+    """
+    Extracts Kendra answers, selects the ones sent to consensus and splits them,
+    recording the extraction and selection stages.
+
+    Args:
+        result_items (Optional[List[Any]]): Kendra ResultItems.
+        query (str): The user's query string.
+        query_id (Optional[str]): The Kendra QueryId, recorded with the interaction.
+
+    Returns:
+        Tuple[List[str], List[int], List[str]]: Statements, weights and URLs.
+    """
+    with timed("extract"):
+        answers = _get_retriever().get_answers_from_query_results(result_items=result_items)
+
+    csv_logger.log("INFO", "Kendra returned %d answers for query: %s", len(answers), query)
+    interaction = current_interaction()
+    if interaction is not None:
+        interaction.query_id = None if query_id is None else str(query_id)
+        interaction.kendra_results = len(result_items or [])
+        interaction.answers = len(answers)
+    if not answers:
+        EMPTY_RESULTS.inc("kendra")
+        return _collect_answers(answers)
+
+    with timed("select"):
+        selection = answer_selector.select(query, answers)
+    PROMPT_TOKENS.inc("candidate", amount=selection.candidate_tokens)
+    PROMPT_TOKENS.inc("selected", amount=selection.selected_tokens)
+    if selection.tokens_saved:
+        csv_logger.log(
+            "INFO",
+            "Selected %d/%d answers (%d near-duplicates), saved %d of %d statement tokens for query: %s",
+            len(selection.answers), len(answers), selection.duplicates, selection.tokens_saved,
+            selection.candidate_tokens, query,
+        )
+    return _collect_answers(selection.answers)
+
+def _finish_response(query: str, query_id: Optional[str], urls: List[str], res: Dict[str, int]) -> List[ChatbotResponse]:
+    """
+    Builds the responses and stores them in the exact-match cache.
+    """
+    with timed("build"):
+        results = _build_responses(query, query_id, urls, res)
+        response_cache.set(query, results)
+    if not results:
+        EMPTY_RESULTS.inc("consensus")
+    return results
+
+def _compute_response(query: str) -> List[ChatbotResponse]:
+    """
+    Runs the Kendra and OpenAI pipeline for a query and caches the result.
+
+    Args:
+        query (str): The user's query string.
+
+    Returns:
+        List[ChatbotResponse]: Structured responses, empty if no answer found.
+    """
+    with timed("retrieve"):
+        query_id, result_items = _get_retriever().get_kendra_query_results(query=query)
+    statements, weights, urls = _extract_answers(result_items, query, query_id)
+
+    try:
+        with timed("consensus"):
+            res = OpenAI.get_instance().get_consensus(statements, weights, query)
+    except CircuitOpen:
+        if not settings.get_degraded_mode_enabled():
+            raise
+        return _degraded_response(query, query_id, statements, weights, urls)
+
+    results = _finish_response(query, query_id, urls, res)
+    semantic_cache.set(query, results)
+    return results
+
+async def _limited(limit: Optional[asyncio.Semaphore], awaitable: Awaitable[Any]) -> Any:
+    """
+    Awaits `awaitable`, holding `limit` while it runs when one is given.
+    """
+    if limit is None:
+        return await awaitable
+    async with limit:
+        return await awaitable
+
+async def _compute_response_async(
+    query: str,
+    kendra_limit: Optional[asyncio.Semaphore] = None,
+    openai_limit: Optional[asyncio.Semaphore] = None,
+) -> List[ChatbotResponse]:
+    """
+    Async variant of `_compute_response`.
+
+    Args:
+        query (str): The user's query string.
+        kendra_limit (Optional[asyncio.Semaphore]): Bounds concurrent Kendra calls.
+        openai_limit (Optional[asyncio.Semaphore]): Bounds concurrent OpenAI calls.
+
+    Returns:
+        List[ChatbotResponse]: Structured responses, empty if no answer found.
+    """
+    with timed("retrieve"):
+        query_id, result_items = await _limited(
+            kendra_limit, _get_retriever().get_kendra_query_results_async(query=query)
+        )
+    statements, weights, urls = _extract_answers(result_items, query, query_id)
+
+    try:
+        with timed("consensus"):
+            res = await _limited(
+                openai_limit, OpenAI.get_instance().get_consensus_async(statements, weights, query)
+            )
+    except CircuitOpen:
+        if not settings.get_degraded_mode_enabled():
+            raise
+        return _degraded_response(query, query_id, statements, weights, urls)
+
+    results = _finish_response(query, query_id, urls, res)
+    await semantic_cache.set_async(query, results)
+    return results
+
+def get_response_from_bot(query: str) -> List[ChatbotResponse]:
+    """
+    Orchestrates the chatbot response generation process.
+    Concurrent calls for the same normalized query share one upstream computation.
+    Every call is recorded in the interaction store.
+
+    Args:
+        query (str): The user's query string.
+
+    Returns:
+        Optional[ChatbotResponse]: A structured response object, or None if no answer found.
+    """
+    with interaction_store.track(query, "chatbot") as interaction:
+        cached = _get_cached_response(query)
+        if cached is not None:
+            interaction.cache_hit = True
+            interaction.set_results(cached)
+            return cached
+
+        results = list(response_flight.do(ResponseCache.make_key(query), lambda: _compute_response(query)))
+        interaction.set_results(results)
+        return results
+
+async def get_response_from_bot_async(query: str, source: str = "chatbot",
+                                      refresh: bool = False) -> List[ChatbotResponse]:
+    """
+    Async variant of `get_response_from_bot`. Upstream calls are awaited, so the
+    event loop can serve other requests while Kendra and OpenAI respond.
+
+    Args:
+        query (str): The user's query string.
+        source (str): Entry point recorded in the interaction store.
+        refresh (bool): Skip the cache lookup and recompute, replacing the cached entry.
+
+    Returns:
+        List[ChatbotResponse]: Structured responses, empty if no answer found.
+    """
+    with interaction_store.track(query, source) as interaction:
+        cached = None if refresh else await _get_cached_response_async(query)
+        if cached is not None:
+            interaction.cache_hit = True
+            interaction.set_results(cached)
+            return cached
+
+        results = await response_flight.do_async(
+            ResponseCache.make_key(query), lambda: _compute_response_async(query)
+        )
+        interaction.set_results(results)
+        return list(results)
+
+async def get_responses_from_bot_stream(queries: List[str]) -> AsyncIterator[ChatbotBatchResponse]:
+    """
+    Answers many queries concurrently and yields each result as soon as it completes.
+
+    Duplicate queries (after normalization) are computed once. Kendra and OpenAI
+    calls are bounded by separate limits from settings.
+
+    Args:
+        queries (List[str]): The user queries, possibly with duplicates.
+
+    Yields:
+        ChatbotBatchResponse: One result per input query, tagged with its input index.
+    """
+    kendra_limit = asyncio.Semaphore(settings.get_batch_kendra_concurrency())
+    openai_limit = asyncio.Semaphore(settings.get_batch_openai_concurrency())
+
+    # Map each unique normalized query to the input positions asking it
+    positions: Dict[str, List[int]] = {}
+    for index, query in enumerate(queries):
+        if not query or not query.strip():
+            yield ChatbotBatchResponse(index=index, query=query, error="Empty query.")
+            continue
+        positions.setdefault(ResponseCache.make_key(query), []).append(index)
+
+    async def answer(key: str) -> Tuple[str, Optional[List[ChatbotResponse]], Optional[str]]:
+        query = queries[positions[key][0]]
+        with interaction_store.track(query, "batch") as interaction:
+            try:
+                cached = await _get_cached_response_async(query)
+                if cached is not None:
+                    interaction.cache_hit = True
+                    interaction.set_results(cached)
+                    return key, cached, None
+                results = await response_flight.do_async(
+                    key, lambda: _compute_response_async(query, kendra_limit, openai_limit)
+                )
+                interaction.set_results(results)
+                return key, results, None
+            except Overloaded as ex:
+                interaction.error = type(ex).__name__
+                csv_logger.log("WARNING", "Shed batch query (%s): %s", ex, query)
+                return key, None, ex.detail
+            except Exception as ex:
+                interaction.error = type(ex).__name__
+                csv_logger.log("ERROR", "Exception answering batch query: %s", query, exception=ex)
+                return key, None, "Internal Server Error"
+
+    tasks = [asyncio.ensure_future(answer(key)) for key in positions]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, results, error = await next_done
+            if error is None and not results:
+                error = "No answer found for your query."
+            for index in positions[key]:
+                yield ChatbotBatchResponse(
+                    index=index,
+                    query=queries[index],
+                    responses=list(results or []),
+                    error=error,
+                )
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def get_responses_from_bot_async(queries: List[str]) -> List[ChatbotBatchResponse]:
+    """
+    Answers many queries concurrently and returns the results in input order.
+
+    Args:
+        queries (List[str]): The user queries.
+
+    Returns:
+        List[ChatbotBatchResponse]: One result (responses or error) per input query.
+    """
+    results: List[Optional[ChatbotBatchResponse]] = [None] * len(queries)
+    async for item in get_responses_from_bot_stream(queries):
+        results[item.index] = item
+    return results
+
+def get_responses_from_bot(queries: List[str]) -> List[ChatbotBatchResponse]:
+    """
+    Sync entry point for batch jobs (evaluation, cache pre-warming).
+    Must not be called from inside a running event loop.
+
+    Args:
+        queries (List[str]): The user queries.
+
+    Returns:
+        List[ChatbotBatchResponse]: One result (responses or error) per input query.
+    """
+    return asyncio.run(get_responses_from_bot_async(queries))
+
+async def stream_response_from_bot(query: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams the chatbot answer: source URLs first, then model tokens and partial
+    scores, and finally the structured responses.
+
+    Args:
+        query (str): The user's query string.
+
+    Yields:
+        Tuple[str, Any]: (event, data) pairs. Events are "sources", "token",
+        "partial" and finally "result" with the `ChatbotResponse` list.
+    """
+    with interaction_store.track(query, "stream") as interaction:
+        cached = await _get_cached_response_async(query)
+        if cached is not None:
+            interaction.cache_hit = True
+            interaction.set_results(cached)
+            yield "sources", {"queryId": cached[0].queryId, "urls": cached[0].urls}
+            yield "result", cached
+            return
+
+        with timed("retrieve"):
+            query_id, result_items = await _get_retriever().get_kendra_query_results_async(query=query)
+        statements, weights, urls = _extract_answers(result_items, query, query_id)
+        yield "sources", {"queryId": str(query_id), "urls": urls[:settings.get_max_urls_to_process()]}
+
+        res: Dict[str, int] = {}
+        try:
+            async for event, data in OpenAI.get_instance().stream_consensus_async(statements, weights, query):
+                if event == "consensus":
+                    res = data
+                else:
+                    yield event, data
+        except CircuitOpen:
+            if not settings.get_degraded_mode_enabled():
+                raise
+            results = _degraded_response(query, query_id, statements, weights, urls)
+            interaction.set_results(results)
+            yield "result", results
+            return
 
-    return results
\ No newline at end of file
+        results = _finish_response(query, query_id, urls, res)
+        interaction.set_results(results)
+        await semantic_cache.set_async(query, results)
+        yield "result", results
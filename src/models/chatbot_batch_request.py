@@ -0,0 +1,12 @@
+from typing import ClassVar, List
+from pydantic import BaseModel, Field
+
+class ChatbotBatchRequest(BaseModel):
+    """
+    Represents the request body for the batch chatbot endpoint.
+    """
+    # Const
+    MIN_QUERIES: ClassVar[int] = 1
+
+    queries: List[str] = Field(..., description="The user queries to answer", min_length=MIN_QUERIES)
+    stream: bool = Field(False, description="Stream results as NDJSON lines as they complete")
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from src.models.chatbot_response import ChatbotResponse
+
+class ChatbotBatchResponse(BaseModel):
+    """
+    Represents the result for one query of a batch request.
+    """
+    index: int
+    query: str
+    responses: List[ChatbotResponse] = []
+    error: Optional[str] = None
@@ -1,3 +1,4 @@
+from typing import ClassVar
 from pydantic import BaseModel, Field
 
 class ChatbotRequest(BaseModel):
@@ -5,6 +6,6 @@ class ChatbotRequest(BaseModel):
     Represents the request body for the chatbot endpoint.
     """
     # Const
-    MIN_LENGTH = 1
+    MIN_LENGTH: ClassVar[int] = 1
 
     query: str = Field(..., description="The user's input query string", min_length=MIN_LENGTH)
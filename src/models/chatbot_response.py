@@ -9,3 +9,5 @@ class ChatbotResponse(BaseModel):
     answer: str
     score: int
     urls: List[str]
+    # Set when the answer is a raw Kendra excerpt because OpenAI was unavailable
+    degraded: bool = False
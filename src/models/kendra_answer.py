@@ -0,0 +1,9 @@
+from typing import NamedTuple
+
+class KendraAnswer(NamedTuple):
+    """
+    A single answer extracted from a Kendra result item.
+    """
+    text: str
+    url: str
+    confidence: int
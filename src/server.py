@@ -0,0 +1,223 @@
+"""
+Production entry point: a pre-fork server running several uvicorn workers on one socket.
+
+    python -m src.server --workers 4 --port 8000
+
+The app and the upstream SDKs (which the app itself imports lazily) are loaded
+once in the master before forking, so the interpreter, fastapi, boto3, openai
+and numpy pages are shared copy-on-write by the workers.
+State that must be global is pointed at shared storage before the import:
+rate limits and the response cache tier use SQLite files in the state dir,
+and workers write metric snapshots that `/metrics` merges.
+The cache warm-up runs once in the master, so workers inherit its result and
+only the first worker refreshes the warmed queries.
+"""
+import os
+import sys
+import time
+import asyncio
+import signal
+import socket
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+
+# Not via `settings`: these defaults must be in the environment before anything reads it
+_SHARED_DEFAULTS = {
+    "RATE_LIMIT_STORAGE_URI": "sqlite:///{state_dir}/rate_limits.sqlite3",
+    "RESPONSE_CACHE_BACKEND": "sqlite",
+    "RESPONSE_CACHE_SQLITE_PATH": "{state_dir}/response_cache.sqlite3",
+    "METRICS_MULTIPROC_DIR": "{state_dir}/metrics",
+}
+
+
+def configure_shared_state(state_dir: str) -> Dict[str, str]:
+    """
+    Points cross-worker state at files under `state_dir`, keeping any value the
+    environment already sets (e.g. a redis:// rate-limit storage).
+
+    Args:
+        state_dir (str): Directory shared by every worker.
+
+    Returns:
+        Dict[str, str]: The variables that were set.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    applied = {}
+    for name, template in _SHARED_DEFAULTS.items():
+        if not os.environ.get(name):
+            os.environ[name] = applied[name] = template.format(state_dir=state_dir)
+    return applied
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Opens the listening socket in the master; every worker accepts on it.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def warm_up_cache() -> None:
+    """
+    Runs the cache warm-up in the master before forking: the local cache tier is
+    inherited by every worker and the shared tier is filled once, instead of
+    each worker replaying the same queries.
+    """
+    from src.utils.interaction_store import interaction_store
+    from src.utils.logger import csv_logger
+    from src.warmup import cache_warmer
+
+    asyncio.run(cache_warmer.warm_up())
+    # Writer threads do not survive a fork; each worker starts its own
+    csv_logger.close()
+    interaction_store.close()
+
+
+def reset_after_fork() -> None:
+    """
+    Drops the state a worker must not inherit from the master (runs in the child):
+    upstream clients and thread pools, whose threads do not exist after a fork,
+    and the metrics recorded by the warm-up, which every worker would report again.
+    """
+    from src.services.aws_kendra import AWSKendra
+    from src.services.clients import ClientFactory
+    from src.utils.cache import consensus_cache, response_cache
+    from src.utils.hedging import Hedger
+    from src.utils.metrics import metrics
+    from src.utils.semantic_cache import semantic_cache
+    from src.utils.single_flight import response_flight
+
+    # Connections and pools must never be shared across processes
+    ClientFactory.get_instance().reset()
+    AWSKendra.get_instance().reset_executors()
+    Hedger.reset_executor()
+    metrics.reset()
+    for stats in (response_cache, consensus_cache, semantic_cache, response_flight):
+        stats.reset_stats()
+
+
+def run_worker(app, sock: socket.socket, refresh: bool = True) -> None:
+    """
+    Serves `app` on the inherited socket until uvicorn exits (runs in the child).
+    `refresh` is False for all but one worker, so warmed queries are refreshed once.
+    """
+    import uvicorn
+    from src.warmup import cache_warmer
+
+    reset_after_fork()
+    if not refresh:
+        cache_warmer.refresh_interval = 0
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, lifespan="on", log_level="info", access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    """
+    Forks and supervises the workers: dead workers are replaced, SIGTERM/SIGINT
+    stop every worker gracefully.
+    """
+
+    # Const
+    RESPAWN_DELAY = 1.0
+    SHUTDOWN_TIMEOUT = 30.0
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, refresh=slot == 0)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+
+    def stop(self, signum: int, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        print(f"[server] master {os.getpid()} running {self.workers} workers", file=sys.stderr, flush=True)
+
+        deadline: Optional[float] = None
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0 if not self.stopping else os.WNOHANG)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid == 0:
+                deadline = deadline or time.monotonic() + self.SHUTDOWN_TIMEOUT
+                if time.monotonic() > deadline:
+                    for child in list(self.children):
+                        os.kill(child, signal.SIGKILL)
+                time.sleep(0.1)
+                continue
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self.stopping:
+                print(f"[server] worker {pid} exited ({status}), restarting", file=sys.stderr, flush=True)
+                time.sleep(self.RESPAWN_DELAY)
+                self.spawn(slot)
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from src.configs.settings import settings
+
+    parser = argparse.ArgumentParser(description="Run DocuChatAI with pre-forked workers.")
+    parser.add_argument("--host", default=settings.get_server_host())
+    parser.add_argument("--port", type=int, default=settings.get_server_port())
+    parser.add_argument("--workers", type=int, default=settings.get_server_workers(), help="0 = one per CPU")
+    parser.add_argument("--state-dir", default=settings.get_server_state_dir(), help="state shared by workers")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1:
+        state_dir = args.state_dir or tempfile.mkdtemp(prefix="docuchat-")
+        for name, value in configure_shared_state(state_dir).items():
+            print(f"[server] {name}={value}", file=sys.stderr)
+        settings.reload()
+
+    # Preload: import the app and the SDKs it defers once, before forking
+    from src.api import app
+    from src.utils.metrics import metrics
+    from src.services.clients import preload_sdks
+    preload_sdks()
+
+    sock = bind_socket(args.host, args.port)
+    if workers == 1:
+        run_worker(app, sock)
+        return 0
+    # Snapshots of a previous run would be merged into this run's counters
+    metrics.clear_snapshots(settings.get_metrics_multiproc_dir())
+    warm_up_cache()
+    return Master(app, sock, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
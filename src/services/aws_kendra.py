@@ -1,19 +1,28 @@
-import boto3
-import random
-from typing import Optional, Any, List, Tuple
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Dict, List, Set, Tuple
 
 from src.configs.settings import settings
+from src.services.clients import ClientFactory
+from src.services.retriever import Retriever
 from src.utils.logger import csv_logger
+from src.utils.concurrency_limit import Overloaded, Permit, kendra_limiter
+from src.utils.circuit_breaker import kendra_breaker
+from src.utils.hedging import kendra_hedger
+from src.utils.metrics import ERRORS, KENDRA_PAGES, KENDRA_RESULTS, UPSTREAM_DURATION, timed
+from src.utils.tracing import current_span
 
-class AWSKendra:
+class AWSKendra(Retriever):
     """
     Singleton service class for interacting with AWS Kendra.
     """
     __instance = None
-    _client = None
-    
-    # Const
-    MAX_CONFIDENCE = 100
+    _executor: Optional[ThreadPoolExecutor] = None
+    _page_executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
     
     @staticmethod 
     def get_instance() -> 'AWSKendra':
@@ -30,139 +39,238 @@ class AWSKendra:
             
     def get_kendra_client(self) -> Optional[Any]:
         """
-        Creates and returns a boto3 Kendra client.
+        Returns the shared boto3 Kendra client from the client factory.
 
         Returns:
             Any: The boto3 Kendra client, or None if creation fails.
         """
         try:
-            if self._client is None:
-                self._client = boto3.client('kendra', 
-                                           region_name=settings.get_aws_region(), 
-                                           aws_access_key_id=settings.get_aws_access_key(), 
-                                           aws_secret_access_key=settings.get_aws_secret_key())
-            return self._client
+            return ClientFactory.get_instance().get_kendra_client()
         except Exception as ex:
             csv_logger.log("ERROR", "Exception in AWSKendra.get_kendra_client()", exception=ex)
             return None
     
-    def get_kendra_query_results(self, query: str) -> Tuple[Optional[str], Optional[List[Any]]]:
+    def get_kendra_query_results(self, query: str, permit: Optional[Permit] = None) -> Tuple[Optional[str], Optional[List[Any]]]:
         """
-        Queries the Kendra index.
+        Queries the Kendra index, within the Kendra concurrency limit and circuit breaker.
+        A slow query is hedged with a second one when hedging is enabled.
 
         Args:
             query (str): The search query.
+            permit (Optional[Permit]): A slot already acquired from `kendra_limiter`; one is
+                acquired here when omitted.
 
         Returns:
             Tuple[Optional[str], Optional[List[Any]]]: A tuple containing the QueryId and a list of ResultItems.
+
+        Raises:
+            Overloaded: Kendra is at its concurrency limit and the call was shed, or its
+                circuit breaker is open (`CircuitOpen`).
         """
         try:
-            client = self.get_kendra_client()
-            if not client:
-                return None, None
-            response = client.query(QueryText=str(query), IndexId=settings.get_aws_kendra_index_id())
-            query_id = response.get('QueryId')
-            result_items = response.get('ResultItems')
+            if permit is None:
+                kendra_breaker.check()  # fail fast before waiting for a slot
+            with permit or kendra_limiter.acquire():
+                client = self.get_kendra_client()
+                if not client:
+                    return None, None
+                page_count = settings.get_kendra_page_count()
+                with kendra_breaker.attempt(), timed("kendra", UPSTREAM_DURATION):
+                    if page_count > 1:
+                        query_id, result_items = self.get_paged_query_results(client, query, page_count)
+                    else:
+                        response = kendra_hedger.run(lambda: client.query(
+                            QueryText=str(query), IndexId=settings.get_aws_kendra_index_id()
+                        ))
+                        query_id = response.get('QueryId')
+                        result_items = response.get('ResultItems')
+                    span = current_span()
+                    if span is not None:
+                        span.set_attributes({
+                            "kendra.query_bytes": len(str(query).encode("utf-8")),
+                            "kendra.page_count": page_count,
+                            "kendra.query_id": query_id,
+                            "kendra.result_items": len(result_items or []),
+                        })
+            for item in result_items or []:
+                KENDRA_RESULTS.inc(str(item.get('Type')))
             return query_id, result_items
+        except Overloaded:
+            raise
         except Exception as ex:
+            ERRORS.inc("kendra")
             csv_logger.log("ERROR", "Exception in AWSKendra.get_kendra_query_results()", exception=ex)
             return None, None
-        
-    def get_answers_from_query_results(self, result_items: List[Any]) -> List[List[Any]]:
+
+    def query_page(self, client: Any, query: str, page_number: int, page_size: int) -> Dict[str, Any]:
+        """
+        Fetches a single page of Kendra results, recording its latency as `kendra.page<N>`.
+
+        Args:
+            client (Any): The boto3 Kendra client.
+            query (str): The search query.
+            page_number (int): 1-based page number.
+            page_size (int): Results per page.
+
+        Returns:
+            Dict[str, Any]: The raw Kendra query response.
         """
-        Extracts answers and their metadata from Kendra query results.
+        with timed(f"kendra.page{page_number}", UPSTREAM_DURATION):
+            return kendra_hedger.run(lambda: client.query(
+                QueryText=str(query),
+                IndexId=settings.get_aws_kendra_index_id(),
+                PageNumber=page_number,
+                PageSize=page_size,
+            ))
+
+    def query_page_limited(self, client: Any, query: str, page_number: int, page_size: int) -> Dict[str, Any]:
+        """
+        `query_page` within its own `kendra_limiter` slot, so the adaptive limit sees
+        every page in flight (run on the page pool for pages after the first).
+        """
+        with kendra_limiter.acquire():
+            return self.query_page(client, query, page_number, page_size)
+
+    def get_paged_query_results(self, client: Any, query: str, page_count: int) -> Tuple[Optional[str], List[Any]]:
+        """
+        Fetches up to `page_count` pages and merges them in page order.
+        The first page is fetched alone (in the caller's concurrency slot); the
+        remaining pages are only requested, concurrently and each in a slot of its
+        own, when it is full and holds fewer than
+        `settings.get_kendra_high_confidence_target()` VERY HIGH/HIGH answers.
+        Merging stops after the last page (a short page) or once the target is
+        reached, cancelling pages not yet started.
+        Items from later pages whose DocumentId already appeared on an earlier page are dropped.
+        A failing first page fails the query, a failing (or shed) later page is logged and skipped.
 
         Args:
-            result_items (List[Any]): A list of Kendra result items.
+            client (Any): The boto3 Kendra client.
+            query (str): The search query.
+            page_count (int): Maximum number of pages to fetch.
 
         Returns:
-            List[List[Any]]: A list of answers, where each answer is [text, url, confidence_score].
+            Tuple[Optional[str], List[Any]]: The QueryId of the first page and the merged ResultItems.
         """
+        page_size = settings.get_kendra_page_size()
+        target = settings.get_kendra_high_confidence_target()
+        merged: List[Any] = []
+        seen_documents: Set[str] = set()
+        high_confidence = 0
+
+        def merge(response: Dict[str, Any]) -> bool:
+            """Appends a page's new items; returns whether later pages are still needed."""
+            nonlocal high_confidence
+            items = response.get('ResultItems') or []
+            page_documents = []
+            for item in items:
+                document_id = item.get('DocumentId')
+                if document_id is not None:
+                    if document_id in seen_documents:
+                        continue
+                    page_documents.append(document_id)
+                merged.append(item)
+                if (item.get('Type') in self.ANSWER_TYPES
+                        and (item.get('ScoreAttributes') or {}).get('ScoreConfidence') in self.HIGH_CONFIDENCE):
+                    high_confidence += 1
+            seen_documents.update(page_documents)
+            return len(items) >= page_size and not (target and high_confidence >= target)
+
+        first = self.query_page(client, query, 1, page_size)
+        query_id = first.get('QueryId')
+        fetched = 1
+        futures = []
         try:
-            # DOC_URLS = []
-            ANSWERS_WITH_URLS = []
-            if result_items is None:
-                return []
-                
-            for i in range(len(result_items)):
-                answer = ""
-                item = result_items[i]
-                if item.get('Type') == 'ANSWER':
-                    # get doc url 
-                    item_doc_url = item.get('DocumentURI')
-                    
-                    # get doc kendra score
-                    item_doc_score = item.get('ScoreAttributes')
-                    if not item_doc_score:
-                        continue  # Skip items without score attributes
-                    
-                    item_doc_confidence = item_doc_score.get('ScoreConfidence')
-                    confidence = self.get_confidence_weightage_by_confidence(confidence=item_doc_confidence)
-
-                    # get doc suggested text
-                    item_doc_exercpt_prop = item.get('DocumentExcerpt')
-                    item_doc_text = item_doc_exercpt_prop.get('Text')
-                    item_doc_text = str(item_doc_text)
-                    doc_text_splitted = item_doc_text.split('\n')
-                    content = ""
-                    for text in doc_text_splitted:
-                        text = text.strip()
-                        if text != "":
-                            content += f" {text}"
-                    answer = content.strip()
-                    answer = answer.replace(u'\xa0', u' ') # replacing whitespaces with space
-                    answer_with_url = [answer, str(item_doc_url), confidence]
-                    ANSWERS_WITH_URLS.append(answer_with_url)
-                
-                if item.get('Type') == 'DOCUMENT':
-                    # get doc url 
-                    item_doc_url = item.get('DocumentURI')
-                    
-                    # get doc kendra score
-                    item_doc_score = item.get('ScoreAttributes')
-                    item_doc_confidence = item_doc_score.get('ScoreConfidence')
-                    confidence = self.get_confidence_weightage_by_confidence(confidence=item_doc_confidence)
-
-                    # get doc suggested text
-                    item_doc_exercpt_prop = item.get('DocumentExcerpt')
-                    item_doc_text = item_doc_exercpt_prop.get('Text')
-                    item_doc_text = str(item_doc_text)
-                    doc_text_splitted = item_doc_text.split('\n')
-                    content = ""
-                    for text in doc_text_splitted:
-                        text = text.strip()
-                        text = text.strip('.')
-                        if text != "":
-                            content += f" {text}"
-                    answer = content.strip()
-                    answer = answer.replace(u'\xa0', u' ') # replacing whitespaces with space
-                    answer_with_url = [answer, str(item_doc_url), confidence]
-                    ANSWERS_WITH_URLS.append(answer_with_url)
-            return ANSWERS_WITH_URLS
-        except Exception as ex:
-            csv_logger.log("ERROR", "Exception in AWSKendra.get_answers_from_query_results()", exception=ex)
-            return []
-        
-    def get_confidence_weightage_by_confidence(self, confidence: str) -> int:
+            if merge(first) and page_count > 1:
+                executor = self.get_page_executor()
+                # One context copy per page: a Context cannot be entered by two threads at once
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, self.query_page_limited, client, query, page_number, page_size
+                    )
+                    for page_number in range(2, page_count + 1)
+                ]
+            for page_number, future in enumerate(futures, start=2):
+                try:
+                    response = future.result()
+                except Exception as ex:
+                    ERRORS.inc("kendra")
+                    csv_logger.log("WARNING", "Kendra page %d failed for query: %s", page_number, query, exception=ex)
+                    continue
+                fetched += 1
+                if not merge(response):
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+            KENDRA_PAGES.inc("fetched", amount=fetched)
+            KENDRA_PAGES.inc("skipped", amount=page_count - fetched)
+        return query_id, merged
+
+    def get_page_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the bounded thread pool used to fetch Kendra result pages concurrently.
+        Separate from `get_executor()` so a query waiting on its pages never starves them.
+
+        Returns:
+            ThreadPoolExecutor: Pool sized by `settings.get_kendra_page_workers()`.
+        """
+        if self._page_executor is None:
+            with self._executor_lock:
+                if self._page_executor is None:
+                    self._page_executor = ThreadPoolExecutor(
+                        max_workers=settings.get_kendra_page_workers(),
+                        thread_name_prefix="kendra-page",
+                    )
+        return self._page_executor
+
+    def reset_executors(self) -> None:
+        """
+        Forgets both thread pools without shutting them down, so they are rebuilt on
+        next use. Call it in a forked child: pools created before the fork have no
+        threads there and would never run a submitted call.
+        """
+        with self._executor_lock:
+            self._executor = None
+            self._page_executor = None
+
+    def get_executor(self) -> ThreadPoolExecutor:
         """
-        Maps Kendra confidence levels to a numerical weight.
+        Returns the bounded thread pool used to run blocking boto3 calls off the event loop.
+
+        Returns:
+            ThreadPoolExecutor: Pool sized by `settings.get_kendra_max_workers()`.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.get_kendra_max_workers(),
+                        thread_name_prefix="kendra",
+                    )
+        return self._executor
+
+    async def get_kendra_query_results_async(self, query: str) -> Tuple[Optional[str], Optional[List[Any]]]:
+        """
+        Async variant of `get_kendra_query_results`.
+        boto3 has no native async API, so the call runs on the dedicated Kendra pool.
+        The concurrency slot is acquired first, so excess calls are shed instead of
+        queueing in the pool.
 
         Args:
-            confidence (str): The confidence level string (e.g., 'VERY HIGH', 'HIGH').
+            query (str): The search query.
 
         Returns:
-            int: A random integer within the weighted range for the confidence level.
-        """
-        r = 0
-        if confidence == 'VERY HIGH':
-            r = 10
-        elif confidence == 'HIGH':
-            r = 8
-        elif confidence == 'MEDIUM':
-            r = 5
-        elif confidence == 'LOW':
-            r = 1
-        
-        if r >= self.MAX_CONFIDENCE:
-            r = self.MAX_CONFIDENCE
-        return r
+            Tuple[Optional[str], Optional[List[Any]]]: A tuple containing the QueryId and a list of ResultItems.
+
+        Raises:
+            Overloaded: Kendra is at its concurrency limit and the call was shed, or its
+                circuit breaker is open (`CircuitOpen`).
+        """
+        kendra_breaker.check()
+        permit = await kendra_limiter.acquire_async()
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so request-scoped state (timings) follows the call
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self.get_kendra_query_results, query, permit)
+        # If this task is cancelled the pool still runs the call, which releases the slot
+        return await loop.run_in_executor(self.get_executor(), call)
@@ -0,0 +1,223 @@
+import importlib
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+from src.configs.settings import settings
+from src.utils.logger import csv_logger
+
+if TYPE_CHECKING:
+    import boto3
+    import httpx
+    from botocore.config import Config
+    from openai import OpenAI as OpenAIClient
+    from openai import AsyncOpenAI as AsyncOpenAIClient
+
+# The SDKs take most of the import time of the app, so they are imported on first use
+_LAZY_IMPORTS = {
+    "boto3": ("boto3", None),
+    "httpx": ("httpx", None),
+    "Config": ("botocore.config", "Config"),
+    "OpenAIClient": ("openai", "OpenAI"),
+    "AsyncOpenAIClient": ("openai", "AsyncOpenAI"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Resolves the lazily imported SDK names as module attributes (PEP 562)."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_IMPORTS[name]
+    value = importlib.import_module(module_name)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def _sdk(name: str) -> Any:
+    # Looked up on every use so a patched module attribute takes effect
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+def preload_sdks() -> None:
+    """
+    Imports every upstream SDK now, e.g. in a pre-fork master so the modules
+    are shared copy-on-write by the workers instead of imported by each one.
+    """
+    for name in _LAZY_IMPORTS:
+        _sdk(name)
+
+
+class ClientFactory:
+    """
+    Singleton factory that builds the upstream SDK clients once, behind a lock,
+    with explicit connection pool, keep-alive, timeout and retry settings.
+    """
+
+    __instance = None
+
+    @staticmethod
+    def get_instance() -> "ClientFactory":
+        """Static access method."""
+        if ClientFactory.__instance == None:
+            ClientFactory()
+        return ClientFactory.__instance
+
+    def __init__(self):
+        if ClientFactory.__instance != None:
+            raise Exception("This class is a singleton!")
+        else:
+            ClientFactory.__instance = self
+            self._lock = threading.Lock()
+            self._openai_client: Optional["OpenAIClient"] = None
+            self._async_openai_client: Optional["AsyncOpenAIClient"] = None
+            self._kendra_client: Optional[Any] = None
+
+    def get_httpx_limits(self) -> "httpx.Limits":
+        """
+        Returns the connection pool limits for the OpenAI HTTP transport.
+
+        Returns:
+            httpx.Limits: Max connections, keep-alive connections and keep-alive expiry.
+        """
+        return _sdk("httpx").Limits(
+            max_connections=settings.get_openai_max_connections(),
+            max_keepalive_connections=settings.get_openai_max_keepalive_connections(),
+            keepalive_expiry=settings.get_openai_keepalive_expiry(),
+        )
+
+    def get_httpx_timeout(self) -> "httpx.Timeout":
+        """
+        Returns the per-phase timeouts for the OpenAI HTTP transport.
+
+        Returns:
+            httpx.Timeout: Connect, read, write and pool-acquire timeouts.
+        """
+        return _sdk("httpx").Timeout(
+            connect=settings.get_openai_connect_timeout(),
+            read=settings.get_openai_read_timeout(),
+            write=settings.get_openai_write_timeout(),
+            pool=settings.get_openai_pool_timeout(),
+        )
+
+    def get_boto_config(self) -> "Config":
+        """
+        Returns the botocore configuration for the Kendra client.
+
+        Returns:
+            Config: Pool size, adaptive retries and connect/read timeouts.
+        """
+        return _sdk("Config")(
+            max_pool_connections=settings.get_kendra_max_pool_connections(),
+            retries={"mode": "adaptive", "max_attempts": settings.get_kendra_max_attempts()},
+            connect_timeout=settings.get_kendra_connect_timeout(),
+            read_timeout=settings.get_kendra_read_timeout(),
+            tcp_keepalive=True,
+        )
+
+    def get_openai_client(self) -> "OpenAIClient":
+        """
+        Returns the shared OpenAI client, creating it on first use.
+
+        Returns:
+            OpenAIClient: OpenAI client on a pooled httpx transport.
+        """
+        if self._openai_client is None:
+            with self._lock:
+                if self._openai_client is None:
+                    self._openai_client = _sdk("OpenAIClient")(
+                        api_key=settings.get_openai_secret_key(),
+                        max_retries=settings.get_openai_max_retries(),
+                        http_client=_sdk("httpx").Client(
+                            limits=self.get_httpx_limits(), timeout=self.get_httpx_timeout()
+                        ),
+                    )
+        return self._openai_client
+
+    def get_async_openai_client(self) -> "AsyncOpenAIClient":
+        """
+        Returns the shared async OpenAI client, creating it on first use.
+
+        Returns:
+            AsyncOpenAIClient: Async OpenAI client on a pooled httpx transport.
+        """
+        if self._async_openai_client is None:
+            with self._lock:
+                if self._async_openai_client is None:
+                    self._async_openai_client = _sdk("AsyncOpenAIClient")(
+                        api_key=settings.get_openai_secret_key(),
+                        max_retries=settings.get_openai_max_retries(),
+                        http_client=_sdk("httpx").AsyncClient(
+                            limits=self.get_httpx_limits(), timeout=self.get_httpx_timeout()
+                        ),
+                    )
+        return self._async_openai_client
+
+    def get_kendra_client(self) -> Any:
+        """
+        Returns the shared boto3 Kendra client, creating it on first use.
+        boto3 clients are thread-safe once created.
+
+        Returns:
+            Any: The boto3 Kendra client.
+        """
+        if self._kendra_client is None:
+            with self._lock:
+                if self._kendra_client is None:
+                    self._kendra_client = _sdk("boto3").client(
+                        'kendra',
+                        region_name=settings.get_aws_region(),
+                        aws_access_key_id=settings.get_aws_access_key(),
+                        aws_secret_access_key=settings.get_aws_secret_key(),
+                        config=self.get_boto_config(),
+                    )
+        return self._kendra_client
+
+    def warm_up(self) -> None:
+        """
+        Builds the sync clients and opens connections to both upstreams so the
+        first user request does not pay for DNS, TCP and TLS setup.
+        Failures are logged and never raised.
+        """
+        try:
+            self.get_kendra_client().describe_index(Id=settings.get_aws_kendra_index_id())
+        except Exception as ex:
+            csv_logger.log("WARNING", "Kendra warm-up failed", exception=ex)
+        try:
+            self.get_openai_client().models.list()
+        except Exception as ex:
+            csv_logger.log("WARNING", "OpenAI warm-up failed", exception=ex)
+
+    async def warm_up_async(self) -> None:
+        """
+        Opens connections on the async OpenAI transport used by the API.
+        Failures are logged and never raised.
+        """
+        try:
+            await self.get_async_openai_client().models.list()
+        except Exception as ex:
+            csv_logger.log("WARNING", "Async OpenAI warm-up failed", exception=ex)
+
+    def override(self, kendra: Optional[Any] = None, openai: Optional[Any] = None,
+                 async_openai: Optional[Any] = None) -> None:
+        """
+        Replaces the cached clients with local stand-ins (benchmarks, offline runs).
+
+        Args:
+            kendra (Optional[Any]): Object exposing the boto3 Kendra `query` API.
+            openai (Optional[Any]): Object exposing the sync OpenAI SDK API.
+            async_openai (Optional[Any]): Object exposing the async OpenAI SDK API.
+        """
+        with self._lock:
+            self._kendra_client = kendra
+            self._openai_client = openai
+            self._async_openai_client = async_openai
+
+    def reset(self) -> None:
+        """
+        Drops the cached clients so they are rebuilt on next use.
+        """
+        with self._lock:
+            self._openai_client = None
+            self._async_openai_client = None
+            self._kendra_client = None
@@ -0,0 +1,499 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.configs.settings import settings
+from src.services.retriever import Retriever
+from src.utils.logger import csv_logger
+from src.utils.metrics import ERRORS, UPSTREAM_DURATION, timed
+
+_WORD_PATTERN = re.compile(r"\w+")
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+
+# Words too common to help ranking; keeping them out shrinks the postings a lot
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was what when "
+    "where which who why will with you your do does can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into casefolded index terms, dropping stopwords.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: The terms, in order.
+    """
+    return [word for word in _WORD_PATTERN.findall(text.casefold()) if word not in _STOPWORDS]
+
+
+def chunk_text(text: str, chunk_words: int) -> List[str]:
+    """
+    Packs paragraphs into chunks of about `chunk_words` words. Paragraphs longer
+    than that are split on word boundaries. Line breaks inside a chunk are kept,
+    like Kendra excerpts.
+
+    Args:
+        text (str): The document text.
+        chunk_words (int): Target chunk size in words.
+
+    Returns:
+        List[str]: The chunks.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        words = paragraph.split()
+        if len(words) > chunk_words:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            for start in range(0, len(words), chunk_words):
+                chunks.append(" ".join(words[start:start + chunk_words]))
+            continue
+        if size + len(words) > chunk_words and current:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(words)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class LocalIndex:
+    """
+    BM25 inverted index over document chunks, stored as flat NumPy arrays:
+
+    - postings in CSR form (`offsets`, `postings_chunks`, `postings_tfs`), one slice per term;
+    - a forward index in the same form (`forward_offsets`, `forward_terms`, `forward_tfs`),
+      used to rebuild postings incrementally without re-tokenizing unchanged files;
+    - chunk texts as one UTF-8 blob plus offsets;
+    - optionally L2-normalized dense vectors for hybrid scoring.
+
+    `save` writes every array as `.npy`; `load` memory-maps them, so opening an index
+    costs a few page faults regardless of its size.
+    """
+
+    # Const
+    ARRAYS = (
+        "offsets", "postings_chunks", "postings_tfs", "forward_offsets", "forward_terms", "forward_tfs",
+        "chunk_lengths", "text_offsets", "text_blob", "vectors",
+    )
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.terms: List[str] = []
+        # Per source file: {"mtime", "size", "first", "count"} (chunk range)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.chunk_files: List[str] = []
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunk_files)
+
+    @property
+    def average_length(self) -> float:
+        lengths = self.arrays.get("chunk_lengths")
+        return float(lengths.mean()) if lengths is not None and len(lengths) else 0.0
+
+    def chunk_text(self, chunk: int) -> str:
+        """Returns the text of a chunk from the (possibly memory-mapped) blob."""
+        offsets = self.arrays["text_offsets"]
+        return bytes(self.arrays["text_blob"][offsets[chunk]:offsets[chunk + 1]]).decode("utf-8")
+
+    def forward(self, chunk: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the term ids and term frequencies of a chunk."""
+        offsets = self.arrays["forward_offsets"]
+        start, end = offsets[chunk], offsets[chunk + 1]
+        return self.arrays["forward_terms"][start:end], self.arrays["forward_tfs"][start:end]
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns the chunk ids and term frequencies for a term, or None if it is unknown."""
+        term_id = self.vocabulary.get(term)
+        offsets = self.arrays.get("offsets")
+        if term_id is None or offsets is None or term_id + 1 >= len(offsets):
+            return None
+        start, end = offsets[term_id], offsets[term_id + 1]
+        return self.arrays["postings_chunks"][start:end], self.arrays["postings_tfs"][start:end]
+
+    def term_id(self, term: str) -> int:
+        """Returns the id of a term, adding it to the (append-only) vocabulary."""
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.vocabulary[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a directory.
+
+        Args:
+            path (str): Target directory (created if needed).
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"terms": self.terms, "files": self.files, "chunk_files": self.chunk_files}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalIndex":
+        """
+        Opens an index directory with every array memory-mapped read-only.
+
+        Args:
+            path (str): Directory written by `save`.
+
+        Returns:
+            LocalIndex: The index.
+        """
+        index = cls()
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index.terms = meta["terms"]
+        index.vocabulary = {term: term_id for term_id, term in enumerate(index.terms)}
+        index.files = meta["files"]
+        index.chunk_files = meta["chunk_files"]
+        for name in cls.ARRAYS:
+            array_path = os.path.join(path, f"{name}.npy")
+            if os.path.exists(array_path):
+                index.arrays[name] = np.load(array_path, mmap_mode="r")
+        return index
+
+
+class LocalRetriever(Retriever):
+    """
+    Singleton retriever over a local document corpus (`.txt`/`.md` files), with BM25
+    ranking and optional hybrid dense scoring. Runs fully offline and returns
+    Kendra-shaped DOCUMENT results.
+
+    The index is built incrementally: only added or modified files are re-read,
+    and each build is written to a new generation directory that is switched to
+    atomically, so other workers keep reading their memory-mapped generation.
+    """
+    __instance = None
+
+    # Const
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    EXTENSIONS = (".txt", ".md")
+    CURRENT_FILE = "CURRENT"
+
+    @staticmethod
+    def get_instance() -> 'LocalRetriever':
+        """ Static access method. """
+        if LocalRetriever.__instance == None:
+            LocalRetriever()
+        return LocalRetriever.__instance
+
+    def __init__(self):
+        if LocalRetriever.__instance != None:
+            raise Exception("This class is a singleton!")
+        else:
+            LocalRetriever.__instance = self
+            self.corpus_dir = settings.get_local_retriever_corpus_dir()
+            self.index_dir = settings.get_local_retriever_index_dir()
+            self.chunk_words = settings.get_local_retriever_chunk_words()
+            self.top_k = settings.get_local_retriever_top_k()
+            self.dense_weight = settings.get_local_retriever_dense_weight() if settings.get_local_retriever_dense() else 0.0
+            self.base_url = settings.get_local_retriever_base_url()
+            self.embedder = None
+            self.index: Optional[LocalIndex] = None
+            self._lock = threading.Lock()
+
+    def get_embedder(self) -> Any:
+        """
+        Returns the embedder for dense scoring (the local hashing embedder, so no network is needed).
+        """
+        if self.embedder is None:
+            from src.utils.semantic_cache import HashingEmbedder
+
+            self.embedder = HashingEmbedder(dim=settings.get_semantic_cache_dim())
+        return self.embedder
+
+    def _scan_corpus(self) -> Dict[str, Dict[str, Any]]:
+        files = {}
+        for root, _, names in os.walk(self.corpus_dir):
+            for name in sorted(names):
+                if not name.endswith(self.EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                relative = os.path.relpath(path, self.corpus_dir).replace(os.sep, "/")
+                files[relative] = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        return files
+
+    def _current_path(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.index_dir, self.CURRENT_FILE)) as f:
+                generation = f.read().strip()
+        except OSError:
+            return None
+        path = os.path.join(self.index_dir, generation)
+        return path if generation and os.path.isdir(path) else None
+
+    def load(self) -> Optional[LocalIndex]:
+        """
+        Memory-maps the current index generation, if there is one.
+
+        Returns:
+            Optional[LocalIndex]: The index, or None if none was built yet.
+        """
+        path = self._current_path()
+        if path is None:
+            return None
+        try:
+            self.index = LocalIndex.load(path)
+        except Exception as ex:
+            csv_logger.log("ERROR", "Exception in LocalRetriever.load()", exception=ex)
+            self.index = None
+        return self.index
+
+    def build(self) -> LocalIndex:
+        """
+        Brings the index up to date with the corpus directory. Chunks of unchanged
+        files are reused (text, term counts and vectors); only new or modified files
+        are read and tokenized. Postings are then rebuilt from the forward index.
+
+        Returns:
+            LocalIndex: The up-to-date index.
+        """
+        with self._lock:
+            previous = self.index or self.load() or LocalIndex()
+            files = self._scan_corpus()
+            unchanged = {name: {"mtime": f["mtime"], "size": f["size"]} for name, f in previous.files.items()}
+            if unchanged == files and len(previous):
+                self.index = previous
+                return previous
+
+            started = time.perf_counter()
+            index = LocalIndex()
+            index.terms = list(previous.terms)
+            index.vocabulary = dict(previous.vocabulary)
+
+            texts: List[bytes] = []
+            forward: List[Tuple[np.ndarray, np.ndarray]] = []
+            reused_vectors: List[Optional[int]] = []
+            new_texts: List[str] = []
+            reused = 0
+            for relative, stat in files.items():
+                old = previous.files.get(relative)
+                first = len(index.chunk_files)
+                if old is not None and old["mtime"] == stat["mtime"] and old["size"] == stat["size"]:
+                    for chunk in range(old["first"], old["first"] + old["count"]):
+                        texts.append(previous.chunk_text(chunk).encode("utf-8"))
+                        forward.append(tuple(np.array(a) for a in previous.forward(chunk)))
+                        reused_vectors.append(chunk)
+                        index.chunk_files.append(relative)
+                    reused += old["count"]
+                else:
+                    with open(os.path.join(self.corpus_dir, relative), encoding="utf-8", errors="replace") as f:
+                        chunks = chunk_text(f.read(), self.chunk_words)
+                    for chunk in chunks:
+                        terms, counts = np.unique(
+                            np.fromiter((index.term_id(t) for t in tokenize(chunk)), dtype=np.int32), return_counts=True
+                        )
+                        texts.append(chunk.encode("utf-8"))
+                        forward.append((terms.astype(np.int32), counts.astype(np.uint16)))
+                        reused_vectors.append(None)
+                        new_texts.append(chunk)
+                        index.chunk_files.append(relative)
+                index.files[relative] = dict(stat, first=first, count=len(index.chunk_files) - first)
+
+            self._build_arrays(index, texts, forward)
+            if self.dense_weight:
+                index.arrays["vectors"] = self._build_vectors(previous, reused_vectors, new_texts)
+
+            generation = f"gen-{time.time_ns()}"
+            index.save(os.path.join(self.index_dir, generation))
+            self._switch_generation(generation)
+            self.index = LocalIndex.load(os.path.join(self.index_dir, generation))
+            csv_logger.log(
+                "INFO",
+                "Local index built: %d chunks (%d reused) from %d files in %.2fs",
+                len(index), reused, len(files), time.perf_counter() - started,
+            )
+            return self.index
+
+    @staticmethod
+    def _build_arrays(index: LocalIndex, texts: List[bytes], forward: List[Tuple[np.ndarray, np.ndarray]]) -> None:
+        lengths = [int(counts.sum()) for _, counts in forward]
+        index.arrays["chunk_lengths"] = np.asarray(lengths, dtype=np.int32)
+        index.arrays["text_offsets"] = np.concatenate(([0], np.cumsum([len(t) for t in texts]))).astype(np.int64)
+        index.arrays["text_blob"] = np.frombuffer(b"".join(texts), dtype=np.uint8)
+
+        sizes = np.asarray([len(terms) for terms, _ in forward], dtype=np.int64)
+        index.arrays["forward_offsets"] = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        forward_terms = np.concatenate([t for t, _ in forward]) if forward else np.zeros(0, np.int32)
+        forward_tfs = np.concatenate([c for _, c in forward]) if forward else np.zeros(0, np.uint16)
+        index.arrays["forward_terms"] = forward_terms.astype(np.int32)
+        index.arrays["forward_tfs"] = forward_tfs.astype(np.uint16)
+
+        # Invert: sort (term, chunk) pairs by term; chunk ids stay ascending within a term
+        chunk_ids = np.repeat(np.arange(len(forward), dtype=np.int32), sizes)
+        order = np.argsort(forward_terms, kind="stable")
+        index.arrays["postings_chunks"] = chunk_ids[order]
+        index.arrays["postings_tfs"] = index.arrays["forward_tfs"][order]
+        counts = np.bincount(forward_terms, minlength=len(index.terms))
+        index.arrays["offsets"] = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def _build_vectors(self, previous: LocalIndex, reused: List[Optional[int]], new_texts: List[str]) -> np.ndarray:
+        embedder = self.get_embedder()
+        new_vectors = embedder.embed(new_texts) if new_texts else np.zeros((0, embedder.dim), np.float32)
+        old_vectors = previous.arrays.get("vectors")
+        rows = []
+        fresh = iter(new_vectors)
+        for chunk in reused:
+            if chunk is not None and old_vectors is not None and len(old_vectors) > chunk:
+                rows.append(np.asarray(old_vectors[chunk]))
+            elif chunk is not None:
+                rows.append(embedder.embed([previous.chunk_text(chunk)])[0])
+            else:
+                rows.append(next(fresh))
+        return np.vstack(rows).astype(np.float32) if rows else np.zeros((0, embedder.dim), np.float32)
+
+    def _switch_generation(self, generation: str) -> None:
+        """Atomically points CURRENT at `generation` and removes older generations."""
+        pointer = os.path.join(self.index_dir, self.CURRENT_FILE)
+        temporary = f"{pointer}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(generation)
+        os.replace(temporary, pointer)
+        for name in os.listdir(self.index_dir):
+            if name.startswith("gen-") and name != generation:
+                # Memory maps held by other processes stay valid after unlink on POSIX
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+    def get_index(self) -> LocalIndex:
+        """
+        Returns the index, loading the current generation or building it on first use.
+        """
+        if self.index is None and self.load() is None:
+            self.build()
+        return self.index
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[int, float, float]]:
+        """
+        Ranks chunks for a query.
+
+        Args:
+            query (str): The search query.
+            top_k (Optional[int]): Number of results; `settings.get_local_retriever_top_k()` when omitted.
+
+        Returns:
+            List[Tuple[int, float, float]]: (chunk id, score in [0, 1], share of query terms matched),
+            best first.
+        """
+        index = self.get_index()
+        top_k = top_k or self.top_k
+        count = len(index)
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not count or not terms:
+            return []
+
+        lengths = index.arrays["chunk_lengths"]
+        norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * lengths / max(index.average_length, 1.0))
+        scores = np.zeros(count, dtype=np.float32)
+        matched = np.zeros(count, dtype=np.int16)
+        for term in terms:
+            postings = index.postings(term)
+            if postings is None or not len(postings[0]):
+                continue
+            chunks, tfs = postings
+            tfs = tfs.astype(np.float32)
+            idf = np.log1p((count - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            # Chunk ids are unique within a term's postings, so fancy-index accumulation is safe
+            scores[chunks] += idf * tfs * (self.BM25_K1 + 1) / (tfs + norm[chunks])
+            matched[chunks] += 1
+
+        top = float(scores.max())
+        if top <= 0:
+            return []
+        combined = scores / top
+        if self.dense_weight and "vectors" in index.arrays:
+            vector = self.get_embedder().embed([query])
+            if vector is not None:
+                similarity = np.clip(np.asarray(index.arrays["vectors"]) @ vector[0], 0, 1)
+                combined = (1 - self.dense_weight) * combined + self.dense_weight * similarity
+
+        candidates = np.flatnonzero(combined > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-combined[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-combined[candidates], kind="stable")]
+        return [(int(c), float(combined[c]), float(matched[c]) / len(terms)) for c in candidates]
+
+    @staticmethod
+    def get_confidence_level(score: float, coverage: float) -> str:
+        """
+        Maps a relative score and query-term coverage to a Kendra confidence level.
+
+        Args:
+            score (float): Score relative to the best hit, in [0, 1].
+            coverage (float): Share of query terms found in the chunk.
+
+        Returns:
+            str: 'VERY HIGH', 'HIGH', 'MEDIUM' or 'LOW'.
+        """
+        value = (score + coverage) / 2
+        if value >= 0.85:
+            return 'VERY HIGH'
+        if value >= 0.65:
+            return 'HIGH'
+        if value >= 0.4:
+            return 'MEDIUM'
+        return 'LOW'
+
+    def iter_result_items(self, hits: List[Tuple[int, float, float]]) -> Iterator[Dict[str, Any]]:
+        """
+        Converts search hits into Kendra-shaped DOCUMENT result items.
+        """
+        index = self.index
+        for chunk, score, coverage in hits:
+            relative = index.chunk_files[chunk]
+            uri = f"{self.base_url.rstrip('/')}/{relative}" if self.base_url else os.path.abspath(
+                os.path.join(self.corpus_dir, relative)
+            )
+            yield {
+                'Id': f"{relative}#{chunk}",
+                'Type': 'DOCUMENT',
+                'DocumentId': relative,
+                'DocumentURI': uri,
+                'DocumentTitle': {'Text': os.path.basename(relative)},
+                'ScoreAttributes': {'ScoreConfidence': self.get_confidence_level(score, coverage)},
+                'DocumentExcerpt': {'Text': index.chunk_text(chunk)},
+            }
+
+    def get_kendra_query_results(self, query: str) -> Tuple[Optional[str], Optional[List[Any]]]:
+        """
+        Searches the local index.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            Tuple[Optional[str], Optional[List[Any]]]: A generated query id and Kendra-shaped result items.
+        """
+        try:
+            with timed("local", UPSTREAM_DURATION):
+                hits = self.search(query)
+                return uuid.uuid4().hex, list(self.iter_result_items(hits))
+        except Exception as ex:
+            ERRORS.inc("local_retriever")
+            csv_logger.log("ERROR", "Exception in LocalRetriever.get_kendra_query_results()", exception=ex)
+            return None, None
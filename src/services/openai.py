@@ -1,9 +1,21 @@
 import json
-from openai import OpenAI as OpenAIClient
-from typing import List, Optional, Dict
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional, Dict, Tuple
 
 from src.configs.settings import settings
+from src.services.clients import ClientFactory
 from src.utils.logger import csv_logger
+from src.utils.cache import consensus_cache
+from src.utils.partial_json import PartialJSONParser
+from src.utils.concurrency_limit import Overloaded, openai_limiter
+from src.utils.circuit_breaker import openai_breaker
+from src.utils.hedging import openai_hedger
+from src.utils.interaction_store import current_interaction
+from src.utils.metrics import ERRORS, OPENAI_TOKENS, UPSTREAM_DURATION, timed
+from src.utils.tracing import current_span
+
+if TYPE_CHECKING:
+    from openai import OpenAI as OpenAIClient
+    from openai import AsyncOpenAI as AsyncOpenAIClient
 
 
 class OpenAI:
@@ -12,7 +24,6 @@ class OpenAI:
     """
 
     __instance = None
-    _client: Optional[OpenAIClient] = None
     
     # Const
     CONSENSUS_TEMPERATURE = 0.0
@@ -30,20 +41,85 @@ class OpenAI:
         else:
             OpenAI.__instance = self
 
-    def get_openai_client(self) -> OpenAIClient:
+    def get_openai_client(self) -> "OpenAIClient":
         """
-        Creates and returns the OpenAI client instance.
+        Returns the shared OpenAI client from the client factory.
 
         Returns:
             OpenAIClient: Configured OpenAI client with API key.
         """
-        if self._client is None:
-            self._client = OpenAIClient(api_key=settings.get_openai_secret_key())
-        return self._client
+        return ClientFactory.get_instance().get_openai_client()
+
+    def get_async_openai_client(self) -> "AsyncOpenAIClient":
+        """
+        Returns the shared async OpenAI client from the client factory.
+
+        Returns:
+            AsyncOpenAIClient: Configured async OpenAI client with API key.
+        """
+        return ClientFactory.get_instance().get_async_openai_client()
+
+    def get_chat_messages(self, query: str) -> List[Dict[str, str]]:
+        """
+        Builds the chat messages sent for a prompt.
+
+        Args:
+            query (str): The prompt for the model.
+
+        Returns:
+            List[Dict[str, str]]: The system and user messages.
+        """
+        return [
+            {
+                "role": "system",
+                "content": "You are an intelligent assistant. Output valid JSON.",
+            },
+            {"role": "user", "content": query},
+        ]
+
+    def record_usage(self, usage: Optional[object]) -> None:
+        """
+        Adds the token counts from a completion `usage` field to the metrics, to
+        the interaction being answered and to the current span.
+
+        Args:
+            usage (Optional[object]): The `usage` object of a completion response.
+        """
+        interaction = current_interaction()
+        span = current_span()
+        for kind in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, kind, None)
+            if isinstance(value, int):
+                OPENAI_TOKENS.inc(kind.split("_")[0], amount=value)
+                if interaction is not None:
+                    interaction.add_tokens(kind.split("_")[0], value)
+                if span is not None:
+                    span.set_attribute(f"openai.{kind}", span.attributes.get(f"openai.{kind}", 0) + value)
+
+    @staticmethod
+    def trace_completion(query: str, response: Any) -> None:
+        """
+        Adds the model and payload sizes to the current span (the `openai` span of a traced request).
+
+        Args:
+            query (str): The prompt sent.
+            response (Any): The chat completion received.
+        """
+        span = current_span()
+        if span is None:
+            return
+        choices = getattr(response, "choices", None) or []
+        message = getattr(getattr(choices[0], "message", None), "content", None) if choices else None
+        span.set_attributes({
+            "openai.model": settings.get_open_ai_model(),
+            "openai.prompt_bytes": len(query.encode("utf-8")),
+            "openai.response_bytes": len(message.encode("utf-8")) if isinstance(message, str) else 0,
+        })
 
     def get_chatgpt_response(self, query: str, temp: float, **kwargs) -> Optional[str]:
         """
-        Sends a query to OpenAI and returns the response.
+        Sends a query to OpenAI and returns the response. A slow call is hedged
+        with a second one when hedging is enabled.
 
         Args:
             query (str): The prompt for the model.
@@ -51,42 +127,137 @@ class OpenAI:
 
         Returns:
             Optional[str]: The generated text response, or None if an error occurs.
+
+        Raises:
+            Overloaded: OpenAI is at its concurrency limit and the call was shed, or its
+                circuit breaker is open (`CircuitOpen`).
         """
         try:
             client = self.get_openai_client()
-            response = client.chat.completions.create(
-                model=settings.get_open_ai_model(),
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an intelligent assistant. Output valid JSON.",
-                    },
-                    {"role": "user", "content": query},
-                ],
-                temperature=temp,
-                max_tokens=settings.get_max_tokens(),
-            )
+            with openai_breaker.attempt(), openai_limiter.acquire(), timed("openai", UPSTREAM_DURATION):
+                response = openai_hedger.run(lambda: client.chat.completions.create(
+                    model=settings.get_open_ai_model(),
+                    messages=self.get_chat_messages(query),
+                    temperature=temp,
+                    max_tokens=settings.get_max_tokens(),
+                ))
+                self.record_usage(getattr(response, "usage", None))
+                self.trace_completion(query, response)
             message = response.choices[0].message.content
             return message.strip() if message else None
+        except Overloaded:
+            raise
         except Exception as ex:
+            ERRORS.inc("openai")
             csv_logger.log(
                 "ERROR", "Exception in OpenAI.get_chatgpt_response()", exception=ex
             )
             return None
 
-    def get_consensus(
-        self, statements: List[str], weights: List[int], my_query: str
-    ) -> Dict[str, int]:
+    async def get_chatgpt_response_async(self, query: str, temp: float, **kwargs) -> Optional[str]:
         """
-        Generates a consensus answer from multiple statements using ChatGPT.
+        Async variant of `get_chatgpt_response` using the async OpenAI client.
+
+        Args:
+            query (str): The prompt for the model.
+            temp (float): The temperature for the model (0.0 to 1.0).
+
+        Returns:
+            Optional[str]: The generated text response, or None if an error occurs.
+
+        Raises:
+            Overloaded: OpenAI is at its concurrency limit and the call was shed, or its
+                circuit breaker is open (`CircuitOpen`).
+        """
+        try:
+            client = self.get_async_openai_client()
+            with openai_breaker.attempt(), await openai_limiter.acquire_async(), timed("openai", UPSTREAM_DURATION):
+                response = await openai_hedger.run_async(lambda: client.chat.completions.create(
+                    model=settings.get_open_ai_model(),
+                    messages=self.get_chat_messages(query),
+                    temperature=temp,
+                    max_tokens=settings.get_max_tokens(),
+                ))
+                self.record_usage(getattr(response, "usage", None))
+                self.trace_completion(query, response)
+            message = response.choices[0].message.content
+            return message.strip() if message else None
+        except Overloaded:
+            raise
+        except Exception as ex:
+            ERRORS.inc("openai")
+            csv_logger.log(
+                "ERROR", "Exception in OpenAI.get_chatgpt_response_async()", exception=ex
+            )
+            return None
+
+    def get_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Embeds texts with the configured OpenAI embedding model. Goes through the
+        OpenAI circuit breaker and concurrency limit like completions, so an
+        outage makes the semantic cache miss at once instead of waiting.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            Optional[List[List[float]]]: One vector per text, or None if an error occurs or
+            OpenAI is shed (concurrency limit or open circuit breaker).
+        """
+        try:
+            client = self.get_openai_client()
+            with openai_breaker.attempt(), openai_limiter.acquire(), timed("openai.embeddings", UPSTREAM_DURATION):
+                response = client.embeddings.create(
+                    model=settings.get_open_ai_embedding_model(), input=texts
+                )
+            return [item.embedding for item in response.data]
+        except Overloaded:
+            return None
+        except Exception as ex:
+            ERRORS.inc("openai")
+            csv_logger.log(
+                "ERROR", "Exception in OpenAI.get_embeddings()", exception=ex
+            )
+            return None
+
+    async def get_embeddings_async(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Async variant of `get_embeddings`.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            Optional[List[List[float]]]: One vector per text, or None if an error occurs or
+            OpenAI is shed (concurrency limit or open circuit breaker).
+        """
+        try:
+            client = self.get_async_openai_client()
+            with openai_breaker.attempt(), await openai_limiter.acquire_async(), \
+                    timed("openai.embeddings", UPSTREAM_DURATION):
+                response = await client.embeddings.create(
+                    model=settings.get_open_ai_embedding_model(), input=texts
+                )
+            return [item.embedding for item in response.data]
+        except Overloaded:
+            return None
+        except Exception as ex:
+            ERRORS.inc("openai")
+            csv_logger.log(
+                "ERROR", "Exception in OpenAI.get_embeddings_async()", exception=ex
+            )
+            return None
+
+    def get_consensus_prompt(self, statements: List[str], my_query: str) -> str:
+        """
+        Builds the ensemble prompt sent to ChatGPT for consensus generation.
 
         Args:
             statements (List[str]): A list of candidate answer statements.
-            weights (List[int]): Weights associated with each statement.
             my_query (str): The original user query.
 
         Returns:
-            Dict[str, int]: A dictionary mapping consolidated answers to their aggregate scores.
+            str: The ensemble prompt.
         """
         statements_str = "\n".join([f"{i} | {y}" for i, y in enumerate(statements)])
 
@@ -118,37 +289,240 @@ class OpenAI:
 
         Answers:
         """
+        return ensemble_prompt
 
-        result = self.get_chatgpt_response(
-            ensemble_prompt, self.CONSENSUS_TEMPERATURE, response_format={"type": "json_object"}
+    def get_consensus_cache_key(self, statements: List[str], weights: List[int], my_query: str) -> str:
+        """
+        Returns the memoization key for a consensus call. The consensus runs at
+        temperature 0.0, so identical inputs produce the same answer.
+
+        Args:
+            statements (List[str]): A list of candidate answer statements.
+            weights (List[int]): Weights associated with each statement.
+            my_query (str): The original user query.
+
+        Returns:
+            str: Content hash of the model settings and inputs.
+        """
+        return consensus_cache.make_key(
+            settings.get_open_ai_model(), settings.get_max_tokens(), statements, weights, my_query
         )
+
+    def score_consensus(self, data: Dict, weights: List[int]) -> Dict[str, int]:
+        """
+        Scores a decoded consensus object with the statement weights.
+
+        Args:
+            data (Dict): The decoded `items` or `statement` JSON object.
+            weights (List[int]): Weights associated with each statement.
+
+        Returns:
+            Dict[str, int]: A dictionary mapping consolidated answers to their aggregate scores.
+        """
+        container = {}
+        if data.get("type") == "items":
+            for entry in data.get("data", []):
+                statement_id = entry.get("id")
+                items = entry.get("items", [])
+
+                for item in items:
+                    if item not in container:
+                        container[item] = 0
+                    # map item back to the original statement's weight
+                    if 0 <= statement_id < len(weights):
+                        container[item] += weights[statement_id]
+        elif data.get("type") == "statement":
+            text = data.get("text")
+            if text:
+                container[text] = sum(weights)
+        return container
+
+    def parse_consensus(self, result: Optional[str], weights: List[int]) -> Dict[str, int]:
+        """
+        Parses the JSON consensus returned by ChatGPT and scores it with the statement weights.
+
+        Args:
+            result (Optional[str]): The raw model output.
+            weights (List[int]): Weights associated with each statement.
+
+        Returns:
+            Dict[str, int]: A dictionary mapping consolidated answers to their aggregate scores.
+        """
         container = {}
         if not result:
             return container
 
         try:
             data = json.loads(result)
-
-            if data.get("type") == "items":
-                for entry in data.get("data", []):
-                    statement_id = entry.get("id")
-                    items = entry.get("items", [])
-
-                    for item in items:
-                        if item not in container:
-                            container[item] = 0
-                        # map item back to the original statement's weight
-                        if 0 <= statement_id < len(weights):
-                            container[item] += weights[statement_id]
-            elif data.get("type") == "statement":
-                text = data.get("text")
-                if text:
-                    container[text] = sum(weights)
+            container = self.score_consensus(data, weights)
         except json.JSONDecodeError as e:
             csv_logger.log(
-                "ERROR", f"Failed to parse JSON response: {result}", exception=e
+                "ERROR", "Failed to parse JSON response: %s", result, exception=e
             )
         except Exception as e:
             csv_logger.log("ERROR", "Error processing consensus data", exception=e)
 
         return container
+
+    def get_consensus(
+        self, statements: List[str], weights: List[int], my_query: str
+    ) -> Dict[str, int]:
+        """
+        Generates a consensus answer from multiple statements using ChatGPT.
+
+        Args:
+            statements (List[str]): A list of candidate answer statements.
+            weights (List[int]): Weights associated with each statement.
+            my_query (str): The original user query.
+
+        Returns:
+            Dict[str, int]: A dictionary mapping consolidated answers to their aggregate scores.
+        """
+        cache_key = self.get_consensus_cache_key(statements, weights, my_query)
+        cached = consensus_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        ensemble_prompt = self.get_consensus_prompt(statements, my_query)
+        result = self.get_chatgpt_response(
+            ensemble_prompt, self.CONSENSUS_TEMPERATURE, response_format={"type": "json_object"}
+        )
+        container = self.parse_consensus(result, weights)
+        consensus_cache.set(cache_key, container)
+        return container
+
+    async def get_consensus_async(
+        self, statements: List[str], weights: List[int], my_query: str
+    ) -> Dict[str, int]:
+        """
+        Async variant of `get_consensus`.
+
+        Args:
+            statements (List[str]): A list of candidate answer statements.
+            weights (List[int]): Weights associated with each statement.
+            my_query (str): The original user query.
+
+        Returns:
+            Dict[str, int]: A dictionary mapping consolidated answers to their aggregate scores.
+        """
+        cache_key = self.get_consensus_cache_key(statements, weights, my_query)
+        cached = consensus_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        ensemble_prompt = self.get_consensus_prompt(statements, my_query)
+        result = await self.get_chatgpt_response_async(
+            ensemble_prompt, self.CONSENSUS_TEMPERATURE, response_format={"type": "json_object"}
+        )
+        container = self.parse_consensus(result, weights)
+        consensus_cache.set(cache_key, container)
+        return container
+
+    async def stream_chatgpt_response_async(self, query: str, temp: float, **kwargs) -> AsyncIterator[str]:
+        """
+        Streams the model output for a prompt as it is generated.
+
+        Args:
+            query (str): The prompt for the model.
+            temp (float): The temperature for the model (0.0 to 1.0).
+
+        Yields:
+            str: Text deltas in generation order.
+
+        Raises:
+            Overloaded: OpenAI is at its concurrency limit and the call was shed, or its
+                circuit breaker is open (`CircuitOpen`).
+        """
+        client = self.get_async_openai_client()
+        # The slot is held until the whole completion has streamed
+        with openai_breaker.attempt(), await openai_limiter.acquire_async():
+            stream = await client.chat.completions.create(
+                model=settings.get_open_ai_model(),
+                messages=self.get_chat_messages(query),
+                temperature=temp,
+                max_tokens=settings.get_max_tokens(),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                self.record_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+    async def stream_consensus_async(
+        self, statements: List[str], weights: List[int], my_query: str
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streams a consensus answer, scoring the partial JSON as tokens arrive.
+
+        Args:
+            statements (List[str]): A list of candidate answer statements.
+            weights (List[int]): Weights associated with each statement.
+            my_query (str): The original user query.
+
+        Yields:
+            Tuple[str, Any]: ("token", str) for each text delta, ("partial", Dict[str, int])
+            whenever the scored answers change, and finally ("consensus", Dict[str, int])
+            scored exactly like `get_consensus`.
+        """
+        cache_key = self.get_consensus_cache_key(statements, weights, my_query)
+        cached = consensus_cache.get(cache_key)
+        if cached is not None:
+            yield "consensus", cached
+            return
+
+        ensemble_prompt = self.get_consensus_prompt(statements, my_query)
+        parser = PartialJSONParser()
+        last_partial: Dict[str, int] = {}
+        try:
+            async for delta in self.stream_chatgpt_response_async(
+                ensemble_prompt, self.CONSENSUS_TEMPERATURE, response_format={"type": "json_object"}
+            ):
+                yield "token", delta
+                parser.feed(delta)
+                partial = self.score_partial_consensus(parser, weights)
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    yield "partial", partial
+        except Overloaded:
+            raise
+        except Exception as ex:
+            ERRORS.inc("openai")
+            csv_logger.log(
+                "ERROR", "Exception in OpenAI.stream_consensus_async()", exception=ex
+            )
+            yield "consensus", {}
+            return
+
+        container = self.parse_consensus(parser.text.strip(), weights)
+        consensus_cache.set(cache_key, container)
+        yield "consensus", container
+
+    def score_partial_consensus(self, parser: PartialJSONParser, weights: List[int]) -> Dict[str, int]:
+        """
+        Scores the consensus JSON received so far. For `items` answers only
+        entries that are fully received are counted.
+
+        Args:
+            parser (PartialJSONParser): Parser fed with the streamed output.
+            weights (List[int]): Weights associated with each statement.
+
+        Returns:
+            Dict[str, int]: The partial answers mapped to their scores.
+        """
+        data = parser.snapshot()
+        if not isinstance(data, dict):
+            return {}
+        if data.get("type") == "items" and isinstance(data.get("data"), list):
+            entries = data["data"]
+            # root object + data array are open while entries stream in
+            if parser.depth > 2:
+                entries = entries[:-1]
+            data = {"type": "items", "data": [e for e in entries if isinstance(e, dict) and isinstance(e.get("id"), int)]}
+        try:
+            return self.score_consensus(data, weights)
+        except Exception:
+            return {}
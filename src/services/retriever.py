@@ -0,0 +1,126 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.kendra_answer import KendraAnswer
+from src.utils.logger import csv_logger
+
+def _normalize_excerpt(text: str, strip_dots: bool = False) -> str:
+    """
+    Joins the non-empty, stripped lines of an excerpt with single spaces and
+    turns NBSPs into plain spaces. Line-wise `split`/`strip` stays on CPython's
+    fast string paths, which beats both a regex and a full `str.split()`.
+
+    Args:
+        text (str): Raw excerpt text.
+        strip_dots (bool): Also drop leading/trailing periods of each line.
+
+    Returns:
+        str: The normalized text.
+    """
+    lines = text.replace("\xa0", " ").split("\n")
+    if strip_dots:
+        parts = [line.strip().strip(".") for line in lines]
+    else:
+        parts = [line.strip() for line in lines]
+    return " ".join(filter(None, parts))
+
+class Retriever(ABC):
+    """
+    Interface for document retrievers. Implementations return results in the
+    shape of a Kendra `Query` response (`Type`, `DocumentId`, `DocumentURI`,
+    `ScoreAttributes.ScoreConfidence`, `DocumentExcerpt.Text`), so answer
+    extraction is shared by every backend.
+    """
+
+    # Const
+    MAX_CONFIDENCE = 100
+    CONFIDENCE_WEIGHTS = {'VERY HIGH': 10, 'HIGH': 8, 'MEDIUM': 5, 'LOW': 1}
+    ANSWER_TYPES = frozenset(('ANSWER', 'DOCUMENT'))
+    HIGH_CONFIDENCE = frozenset(('VERY HIGH', 'HIGH'))
+
+    @abstractmethod
+    def get_kendra_query_results(self, query: str) -> Tuple[Optional[str], Optional[List[Any]]]:
+        """
+        Runs a query.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            Tuple[Optional[str], Optional[List[Any]]]: A query id and Kendra-shaped result items,
+            or (None, None) on failure.
+        """
+
+    async def get_kendra_query_results_async(self, query: str) -> Tuple[Optional[str], Optional[List[Any]]]:
+        """
+        Async variant of `get_kendra_query_results`. Runs the sync call in a worker thread
+        unless the backend provides its own implementation.
+        """
+        return await asyncio.to_thread(self.get_kendra_query_results, query)
+
+    def iter_answers_from_query_results(self, result_items: Optional[Iterable[Any]]) -> Iterator[KendraAnswer]:
+        """
+        Lazily extracts answers from Kendra result items in a single pass.
+        Items that are not ANSWER/DOCUMENT, lack score attributes or have an empty
+        excerpt are skipped instead of failing the whole result set.
+
+        Args:
+            result_items (Optional[Iterable[Any]]): Kendra result items (any iterable, e.g. a page stream).
+
+        Yields:
+            KendraAnswer: The normalized excerpt text, document URL and confidence weight.
+        """
+        # Confidence weights resolved once, rather than a method call per item
+        weights = {level: self.get_confidence_weightage_by_confidence(level) for level in self.CONFIDENCE_WEIGHTS}
+        answer_types = self.ANSWER_TYPES
+        for item in result_items or ():
+            item_type = item.get('Type')
+            if item_type not in answer_types:
+                continue
+
+            item_doc_score = item.get('ScoreAttributes')
+            if not item_doc_score:
+                continue  # Skip items without score attributes
+
+            text = (item.get('DocumentExcerpt') or {}).get('Text')
+            if not text:
+                continue
+            # Document excerpts are line fragments; drop their leading/trailing periods
+            answer = _normalize_excerpt(str(text), item_type == 'DOCUMENT')
+            if not answer:
+                continue
+
+            confidence = weights.get(item_doc_score.get('ScoreConfidence'), 0)
+            yield KendraAnswer(answer, str(item.get('DocumentURI')), confidence)
+
+    def get_answers_from_query_results(self, result_items: Optional[Iterable[Any]]) -> List[KendraAnswer]:
+        """
+        Extracts answers and their metadata from Kendra query results.
+
+        Args:
+            result_items (Optional[Iterable[Any]]): Kendra result items.
+
+        Returns:
+            List[KendraAnswer]: The extracted answers, in result order.
+        """
+        try:
+            return list(self.iter_answers_from_query_results(result_items))
+        except Exception as ex:
+            csv_logger.log("ERROR", "Exception in AWSKendra.get_answers_from_query_results()", exception=ex)
+            return []
+
+    def get_confidence_weightage_by_confidence(self, confidence: str) -> int:
+        """
+        Maps Kendra confidence levels to a numerical weight.
+
+        Args:
+            confidence (str): The confidence level string (e.g., 'VERY HIGH', 'HIGH').
+
+        Returns:
+            int: A random integer within the weighted range for the confidence level.
+        """
+        r = self.CONFIDENCE_WEIGHTS.get(confidence, 0)
+        if r >= self.MAX_CONFIDENCE:
+            r = self.MAX_CONFIDENCE
+        return r
@@ -0,0 +1,438 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.configs.settings import settings
+from src.models.chatbot_response import ChatbotResponse
+from src.utils.logger import csv_logger
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query so trivially different phrasings share a cache entry.
+
+    Args:
+        query (str): The raw user query.
+
+    Returns:
+        str: Lower-cased query with punctuation removed and whitespace collapsed.
+    """
+    text = _PUNCTUATION_RE.sub(" ", str(query).casefold())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with per-entry TTL and a maximum entry count.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used one is evicted.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value, evicting the least recently used entries past capacity."""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Removes an entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    Shared second-tier cache stored in a SQLite file, usable by several processes.
+    The connection is opened per process, so a backend created before a fork
+    (pre-fork server) is safe to use in every worker.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the stored string, or None if missing or expired."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Stores a string for `ttl` seconds."""
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._connection().execute("DELETE FROM cache")
+
+
+class RedisCacheBackend:
+    """
+    Shared second-tier cache on any Redis-protocol client exposing `get` and `set(..., ex=)`.
+    """
+
+    def __init__(self, client: Any, prefix: str = "docuchat:"):
+        """
+        Args:
+            client (Any): A redis-py compatible client (or a local fake in tests).
+            prefix (str): Namespace prepended to every key.
+        """
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        """Builds a backend from a redis:// URL. Requires the optional `redis` package."""
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the stored string, or None if missing or expired."""
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Stores a string for `ttl` seconds."""
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def clear(self) -> None:
+        """Removes every entry under the prefix."""
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for chatbot responses keyed on the normalized query.
+    Tier one is an in-process LRU; tier two is an optional shared backend.
+    """
+
+    def __init__(self, backend: Optional[Any] = None):
+        """
+        Args:
+            backend (Optional[Any]): Shared tier; built from settings when omitted.
+        """
+        self.enabled = settings.get_response_cache_enabled()
+        self.shared_ttl = settings.get_response_cache_shared_ttl()
+        self.local = LRUCache(
+            max_entries=settings.get_response_cache_max_entries(),
+            ttl=settings.get_response_cache_ttl(),
+        )
+        self.backend = backend if backend is not None else self._build_backend()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _build_backend(self) -> Optional[Any]:
+        """
+        Creates the shared tier configured by `RESPONSE_CACHE_BACKEND`, if any.
+        """
+        backend = settings.get_response_cache_backend()
+        try:
+            if backend == "sqlite":
+                return SQLiteCacheBackend(settings.get_response_cache_sqlite_path())
+            if backend == "redis":
+                return RedisCacheBackend.from_url(settings.get_response_cache_redis_url())
+        except Exception as ex:
+            csv_logger.log("ERROR", "Failed to initialise '%s' response cache backend", backend, exception=ex)
+        return None
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        """
+        Returns the cache key for a query.
+
+        Args:
+            query (str): The raw user query.
+
+        Returns:
+            str: Hex digest of the normalized query.
+        """
+        return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[List[ChatbotResponse]]:
+        """
+        Looks up a cached response, promoting shared-tier hits into the local tier.
+
+        Args:
+            query (str): The raw user query.
+
+        Returns:
+            Optional[List[ChatbotResponse]]: The cached responses, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        key = self.make_key(query)
+
+        value = self.local.get(key)
+        if value is not None:
+            self._record(local=True)
+            return list(value)
+
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(key)
+                if raw is not None:
+                    value = [ChatbotResponse(**item) for item in json.loads(raw)]
+                    self.local.set(key, value)
+                    self._record(shared=True)
+                    return list(value)
+            except Exception as ex:
+                csv_logger.log("ERROR", "Exception in ResponseCache.get() shared tier", exception=ex)
+
+        self._record()
+        return None
+
+    def set(self, query: str, responses: List[ChatbotResponse]) -> None:
+        """
+        Stores responses in both tiers. Empty results are not cached.
+
+        Args:
+            query (str): The raw user query.
+            responses (List[ChatbotResponse]): The responses to cache.
+        """
+        if not self.enabled or not responses:
+            return
+        key = self.make_key(query)
+        value = list(responses)
+        self.local.set(key, value)
+
+        if self.backend is not None:
+            try:
+                raw = json.dumps([item.model_dump() for item in value])
+                self.backend.set(key, raw, self.shared_ttl)
+            except Exception as ex:
+                csv_logger.log("ERROR", "Exception in ResponseCache.set() shared tier", exception=ex)
+
+    def clear(self) -> None:
+        """
+        Empties both tiers and resets the counters.
+        """
+        self.local.clear()
+        if self.backend is not None:
+            self.backend.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """
+        Resets the counters.
+        """
+        with self._stats_lock:
+            self.hits = self.local_hits = self.shared_hits = self.misses = 0
+
+    def _record(self, local: bool = False, shared: bool = False) -> None:
+        with self._stats_lock:
+            if local or shared:
+                self.hits += 1
+                self.local_hits += int(local)
+                self.shared_hits += int(shared)
+            else:
+                self.misses += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters and the local tier size.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self.local),
+            }
+
+
+class ConsensusCache:
+    """
+    Memoizes parsed consensus results on a content hash of the consensus inputs.
+    Catches reworded queries whose retrieval results are identical.
+    """
+
+    def __init__(self, backend: Optional[Any] = None):
+        """
+        Args:
+            backend (Optional[Any]): Persistent tier; a SQLite file from settings when omitted.
+        """
+        self.enabled = settings.get_consensus_cache_enabled()
+        self.ttl = settings.get_consensus_cache_ttl()
+        self.local = LRUCache(max_entries=settings.get_consensus_cache_max_entries(), ttl=self.ttl)
+        self.backend = backend if backend is not None else self._build_backend()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _build_backend(self) -> Optional[Any]:
+        """
+        Opens the SQLite file configured by `CONSENSUS_CACHE_PATH`, if any.
+        """
+        path = settings.get_consensus_cache_path()
+        if not path:
+            return None
+        try:
+            return SQLiteCacheBackend(path)
+        except Exception as ex:
+            csv_logger.log("ERROR", "Failed to open consensus cache file", exception=ex)
+            return None
+
+    @staticmethod
+    def make_key(model: str, max_tokens: int, statements: List[str], weights: List[int], query: str) -> str:
+        """
+        Returns a stable hash of everything that determines the consensus output.
+
+        Args:
+            model (str): The OpenAI model name.
+            max_tokens (int): The completion token limit.
+            statements (List[str]): The ordered candidate statements.
+            weights (List[int]): Weights associated with each statement.
+            query (str): The original user query.
+
+        Returns:
+            str: Hex digest of the inputs.
+        """
+        payload = json.dumps([model, max_tokens, statements, weights, query], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, int]]:
+        """
+        Returns the parsed consensus for a key, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            try:
+                raw = self.backend.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+            except Exception as ex:
+                csv_logger.log("ERROR", "Exception in ConsensusCache.get() persistent tier", exception=ex)
+
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return dict(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, int]) -> None:
+        """
+        Stores a parsed consensus. Empty results are not cached.
+        """
+        if not self.enabled or not value:
+            return
+        value = dict(value)
+        self.local.set(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, json.dumps(value), self.ttl)
+            except Exception as ex:
+                csv_logger.log("ERROR", "Exception in ConsensusCache.set() persistent tier", exception=ex)
+
+    def clear(self) -> None:
+        """
+        Empties both tiers and resets the counters.
+        """
+        self.local.clear()
+        if self.backend is not None:
+            self.backend.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """
+        Resets the counters.
+        """
+        with self._stats_lock:
+            self.hits = self.misses = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters and the local tier size.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.local)}
+
+
+# Global instances
+response_cache = ResponseCache()
+consensus_cache = ConsensusCache()
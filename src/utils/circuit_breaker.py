@@ -0,0 +1,219 @@
+import math
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from src.configs.settings import settings
+from src.utils.logger import csv_logger
+from src.utils.metrics import CIRCUIT_TRANSITIONS
+from src.utils.concurrency_limit import Overloaded
+
+
+class CircuitOpen(Overloaded):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open.
+    Handled like `Overloaded`: 503 with `Retry-After` set to the rest of the cool-down.
+    """
+
+    # Const
+    STATE = "unavailable (circuit open)"
+    detail = "Service temporarily unavailable, retry later."
+
+
+class _Attempt:
+    """
+    One call let through by a breaker; its outcome is recorded when the `with` block exits.
+    """
+
+    __slots__ = ("breaker", "probe")
+
+    def __init__(self, breaker: "CircuitBreaker", probe: bool):
+        self.breaker = breaker
+        self.probe = probe
+
+    def __enter__(self) -> "_Attempt":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.breaker._finish(self.probe, False)
+        elif issubclass(exc_type, self.breaker.ignore):
+            self.breaker._finish(self.probe, None)
+        else:
+            self.breaker._finish(self.probe, True)
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    closed: calls go through; outcomes are counted in a sliding time window of
+    `BUCKETS` buckets. Once the window holds at least `min_calls` calls and the
+    failure rate reaches `failure_rate`, the breaker opens.
+    open: calls fail immediately with `CircuitOpen` for `open_seconds`.
+    half-open: up to `half_open_calls` probe calls go through; if all succeed the
+    breaker closes, any failure opens it again.
+    """
+
+    # Const
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+    BUCKETS = 10
+
+    def __init__(self, name: str, window: Optional[float] = None, min_calls: Optional[int] = None,
+                 failure_rate: Optional[float] = None, open_seconds: Optional[float] = None,
+                 half_open_calls: Optional[int] = None, enabled: Optional[bool] = None,
+                 ignore: Tuple[Type[BaseException], ...] = (Overloaded, asyncio.CancelledError, GeneratorExit),
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name (str): Upstream name, used in metrics and errors.
+            window (Optional[float]): Seconds of call outcomes the failure rate is computed over.
+            min_calls (Optional[int]): Calls the window must hold before the breaker may open.
+            failure_rate (Optional[float]): Failure share (0..1) that opens the breaker.
+            open_seconds (Optional[float]): Cool-down before probe calls are let through.
+            half_open_calls (Optional[int]): Successful probes needed to close again.
+            enabled (Optional[bool]): When False every call goes through and nothing is counted.
+            ignore (Tuple[Type[BaseException], ...]): Exceptions that are neither success nor failure.
+            clock (Callable[[], float]): Monotonic time source (tests).
+        """
+        self.name = name
+        self.window = window if window is not None else settings.get_circuit_breaker_window()
+        self.min_calls = min_calls if min_calls is not None else settings.get_circuit_breaker_min_calls()
+        self.failure_rate = failure_rate if failure_rate is not None else settings.get_circuit_breaker_failure_rate()
+        self.open_seconds = open_seconds if open_seconds is not None else settings.get_circuit_breaker_open_seconds()
+        self.half_open_calls = (
+            half_open_calls if half_open_calls is not None else settings.get_circuit_breaker_half_open_calls()
+        )
+        self.enabled = enabled if enabled is not None else settings.get_circuit_breaker_enabled()
+        self.ignore = ignore
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        # [bucket number, calls, failures] per slot of the ring
+        self._buckets: List[List[int]] = [[-1, 0, 0] for _ in range(self.BUCKETS)]
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: State as a number (0 closed, 1 half-open, 2 open), calls and failures in the window.
+        """
+        with self._lock:
+            calls, failures = self._totals(self.clock())
+            return {"state": self.STATE_VALUES[self.state], "calls": calls, "failures": failures}
+
+    def reset(self) -> None:
+        """Closes the breaker and forgets every recorded outcome."""
+        with self._lock:
+            self.state = self.CLOSED
+            self._probes = 0
+            self._probe_successes = 0
+            for bucket in self._buckets:
+                bucket[:] = [-1, 0, 0]
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker lets probe calls through, at least 1."""
+        return max(1, math.ceil(self._opened_at + self.open_seconds - self.clock()))
+
+    def check(self) -> None:
+        """
+        Fails fast without taking a probe slot, e.g. before queueing for a concurrency slot.
+
+        Raises:
+            CircuitOpen: The breaker is open, or half-open with every probe slot taken.
+        """
+        with self._lock:
+            if not self.enabled:
+                return
+            if self.state == self.OPEN and self.clock() - self._opened_at < self.open_seconds:
+                raise CircuitOpen(self.name, self.retry_after())
+            if self.state == self.HALF_OPEN and self._probes >= self.half_open_calls:
+                raise CircuitOpen(self.name, 1)
+
+    def attempt(self) -> _Attempt:
+        """
+        Lets one call through; use the result as a context manager around the upstream call.
+
+        Returns:
+            _Attempt: Records success, failure (any exception not in `ignore`) or neither on exit.
+
+        Raises:
+            CircuitOpen: The breaker is open, or half-open with every probe slot taken.
+        """
+        with self._lock:
+            if not self.enabled:
+                return _Attempt(self, False)
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    raise CircuitOpen(self.name, self.retry_after())
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    raise CircuitOpen(self.name, 1)
+                self._probes += 1
+                return _Attempt(self, True)
+            return _Attempt(self, False)
+
+    def _finish(self, probe: bool, failed: Optional[bool]) -> None:
+        with self._lock:
+            if not self.enabled:
+                return
+            now = self.clock()
+            if probe:
+                self._probes -= 1
+                if self.state != self.HALF_OPEN or failed is None:
+                    return
+                if failed:
+                    self._transition(self.OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._transition(self.CLOSED)
+                return
+
+            if failed is None or self.state != self.CLOSED:
+                return  # late results of calls started before the breaker opened
+            bucket = self._bucket(now)
+            bucket[1] += 1
+            if failed:
+                bucket[2] += 1
+                calls, failures = self._totals(now)
+                if calls >= self.min_calls and failures >= self.failure_rate * calls:
+                    self._transition(self.OPEN)
+
+    def _bucket(self, now: float) -> List[int]:
+        # Caller holds the lock
+        number = int(now * self.BUCKETS / self.window)
+        bucket = self._buckets[number % self.BUCKETS]
+        if bucket[0] != number:
+            bucket[:] = [number, 0, 0]
+        return bucket
+
+    def _totals(self, now: float) -> Tuple[int, int]:
+        # Caller holds the lock
+        oldest = int(now * self.BUCKETS / self.window) - self.BUCKETS
+        live = [bucket for bucket in self._buckets if bucket[0] > oldest]
+        return sum(bucket[1] for bucket in live), sum(bucket[2] for bucket in live)
+
+    def _transition(self, state: str) -> None:
+        # Caller holds the lock
+        previous, self.state = self.state, state
+        self._probe_successes = 0
+        if state == self.OPEN:
+            self._opened_at = self.clock()
+        if state == self.CLOSED:
+            for bucket in self._buckets:
+                bucket[:] = [-1, 0, 0]
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+        csv_logger.log("WARNING", "Circuit breaker for %s: %s -> %s", self.name, previous, state)
+
+
+# One breaker per upstream so an OpenAI outage never blocks Kendra and vice versa
+kendra_breaker = CircuitBreaker("kendra")
+openai_breaker = CircuitBreaker("openai")
@@ -0,0 +1,268 @@
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Union
+
+from src.configs.settings import settings
+from src.utils.metrics import LOAD_SHED
+
+
+class Overloaded(Exception):
+    """
+    Raised when an upstream's concurrency limit and wait queue are full, or a
+    queued call was not admitted in time. The API answers it with 503 and `Retry-After`.
+    """
+
+    # Const
+    STATE = "overloaded"
+    detail = "Service overloaded, retry later."
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(f"{upstream} is {self.STATE}, retry after {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class _ThreadWaiter:
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def grant(self) -> None:
+        self.event.set()
+
+
+class _AsyncWaiter:
+    __slots__ = ("loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future: "asyncio.Future[bool]" = loop.create_future()
+
+    def grant(self) -> None:
+        # Released from any thread (e.g. the Kendra pool), so hop onto the waiter's loop
+        self.loop.call_soon_threadsafe(self._set)
+
+    def _set(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class Permit:
+    """
+    One admitted upstream call. Releasing it reports the call's latency to the
+    limiter; leaving the `with` block with an exception reports a failure.
+    """
+
+    __slots__ = ("limiter", "start", "released")
+
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        self.limiter = limiter
+        self.start = time.monotonic()
+        self.released = False
+
+    def release(self, failed: bool = False, sample: bool = True) -> None:
+        """
+        Args:
+            failed (bool): The call failed (error or timeout), which shrinks the limit.
+            sample (bool): Whether the call's latency says anything about the upstream.
+        """
+        if not self.released:
+            self.released = True
+            self.limiter._release(time.monotonic() - self.start if sample else None, failed)
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.release()
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit, Overloaded)):
+            # The client went away or the call never reached the upstream
+            self.release(sample=False)
+        else:
+            self.release(failed=True)
+
+
+class AdaptiveLimiter:
+    """
+    Adaptive concurrency limit for one upstream, a simplified Gradient2:
+    the limit follows the ratio between the long-term and the current latency,
+    so it grows while latency stays flat and shrinks as soon as requests start
+    queueing upstream; failures cut it multiplicatively.
+
+    Calls over the limit wait in a short FIFO queue; when that queue is full,
+    or a waiter is not admitted within the queue timeout, the call is shed
+    with `Overloaded` instead of adding to the latency of everyone else.
+    Works for threadpool callers (`acquire`) and asyncio callers (`acquire_async`).
+    """
+
+    # Const
+    SMOOTHING = 0.2
+    SHORT_WINDOW = 10
+    LONG_WINDOW = 600
+    FAILURE_BACKOFF = 0.9
+    MAX_RETRY_AFTER = 30
+
+    def __init__(self, name: str, initial_limit: int, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, tolerance: Optional[float] = None,
+                 queue_size: Optional[int] = None, queue_timeout: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            name (str): Upstream name, used in metrics and errors.
+            initial_limit (int): Concurrent calls allowed before any latency was observed.
+            min_limit (Optional[int]): Lower bound of the limit.
+            max_limit (Optional[int]): Upper bound of the limit.
+            tolerance (Optional[float]): Latency growth over the long-term average tolerated before shrinking.
+            queue_size (Optional[int]): Calls allowed to wait for a slot.
+            queue_timeout (Optional[float]): Seconds a call waits for a slot before it is shed.
+            enabled (Optional[bool]): When False every call is admitted (only counted).
+        """
+        self.name = name
+        self.min_limit = min_limit if min_limit is not None else settings.get_concurrency_limit_min()
+        self.max_limit = max_limit if max_limit is not None else settings.get_concurrency_limit_max()
+        self.tolerance = tolerance if tolerance is not None else settings.get_concurrency_limit_tolerance()
+        self.queue_size = queue_size if queue_size is not None else settings.get_concurrency_queue_size()
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.get_concurrency_queue_timeout()
+        self.enabled = enabled if enabled is not None else settings.get_concurrency_limit_enabled()
+        self._lock = threading.Lock()
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self._in_flight = 0
+        self._waiters: Deque[Union[_ThreadWaiter, _AsyncWaiter]] = deque()
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        self._samples = 0
+        self.shed = 0
+
+    @property
+    def limit(self) -> int:
+        """The number of concurrent calls currently allowed."""
+        return int(self._limit)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Current limit, in-flight and queued calls, long-term latency and shed count.
+        """
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "latency": self._long_latency or 0.0,
+                "shed": self.shed,
+            }
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: about one upstream round trip, at least 1."""
+        return min(self.MAX_RETRY_AFTER, max(1, math.ceil(self._long_latency or 1)))
+
+    def _admit(self) -> bool:
+        # Caller holds the lock
+        if not self.enabled or (self._in_flight < self.limit and not self._waiters):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _shed(self, reason: str) -> Overloaded:
+        # Caller holds the lock
+        self.shed += 1
+        LOAD_SHED.inc(self.name, reason)
+        return Overloaded(self.name, self.retry_after())
+
+    def acquire(self) -> Permit:
+        """
+        Waits (up to the queue timeout) for a slot.
+
+        Returns:
+            Permit: Release it, or use it as a context manager around the upstream call.
+
+        Raises:
+            Overloaded: The queue is full or no slot freed up in time.
+        """
+        with self._lock:
+            if self._admit():
+                return Permit(self)
+            if len(self._waiters) >= self.queue_size:
+                raise self._shed("queue_full")
+            waiter = _ThreadWaiter()
+            self._waiters.append(waiter)
+
+        if not waiter.event.wait(self.queue_timeout):
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise self._shed("timeout")
+            # Granted while timing out: the slot is ours
+        return Permit(self)
+
+    async def acquire_async(self) -> Permit:
+        """
+        Async variant of `acquire`; waiting does not block the event loop.
+        """
+        with self._lock:
+            if self._admit():
+                return Permit(self)
+            if len(self._waiters) >= self.queue_size:
+                raise self._shed("queue_full")
+            waiter = _AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise self._shed("timeout")
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            self._release(None, False)  # granted just before the cancel: hand the slot on
+            raise
+        return Permit(self)
+
+    def _release(self, latency: Optional[float], failed: bool) -> None:
+        with self._lock:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if failed:
+                self._limit = max(self.min_limit, self._limit * self.FAILURE_BACKOFF)
+            elif latency is not None:
+                self._update(latency, in_flight)
+            while self._waiters and self._in_flight < self.limit:
+                self._in_flight += 1
+                self._waiters.popleft().grant()
+
+    def _update(self, latency: float, in_flight: int) -> None:
+        # Caller holds the lock
+        latency = max(latency, 1e-6)
+        self._samples += 1
+        if self._long_latency is None:
+            self._long_latency = self._short_latency = latency
+            return
+        # Exponential averages that start as plain means, so the first calls do not skew the baseline;
+        # the short one smooths out single slow calls
+        self._short_latency += (latency - self._short_latency) * max(2 / (self.SHORT_WINDOW + 1), 1 / self._samples)
+        self._long_latency += (latency - self._long_latency) * max(2 / (self.LONG_WINDOW + 1), 1 / self._samples)
+        if self._long_latency > 2 * self._short_latency:
+            self._long_latency *= 0.95  # recover quickly after a slow period
+
+        # Only grow a limit that is actually used
+        if in_flight < self._limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / self._short_latency))
+        target = self._limit * gradient + math.sqrt(self._limit)
+        limit = self._limit * (1 - self.SMOOTHING) + target * self.SMOOTHING
+        self._limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+
+
+# Separate limits so a slow OpenAI does not shed Kendra calls and vice versa
+kendra_limiter = AdaptiveLimiter("kendra", settings.get_kendra_concurrency_limit())
+openai_limiter = AdaptiveLimiter("openai", settings.get_openai_concurrency_limit())
@@ -0,0 +1,261 @@
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, List, Optional
+
+from src.configs.settings import settings
+from src.utils.metrics import HEDGES
+
+
+class LatencySketch:
+    """
+    Rolling latency quantile over the most recent `window` observations.
+    The sorted copy behind `quantile` is rebuilt at most every `refresh` observations,
+    so asking for the hedge delay on every call stays cheap.
+    """
+
+    def __init__(self, window: int = 1000, refresh: int = 50):
+        self.window = window
+        self.refresh = refresh
+        self._values: List[float] = []
+        self._position = 0
+        self._sorted: List[float] = []
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def observe(self, value: float) -> None:
+        """Adds one latency in seconds, replacing the oldest once the window is full."""
+        with self._lock:
+            if len(self._values) < self.window:
+                self._values.append(value)
+            else:
+                self._values[self._position] = value
+                self._position = (self._position + 1) % self.window
+            self._stale += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Args:
+            q (float): Quantile in (0, 1), e.g. 0.95.
+
+        Returns:
+            Optional[float]: The latency at `q`, or None before any observation.
+        """
+        with self._lock:
+            if not self._values:
+                return None
+            if self._stale >= self.refresh or not self._sorted:
+                self._sorted = sorted(self._values)
+                self._stale = 0
+            values = self._sorted
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a share of calls: every call deposits `percent` and every hedge
+    spends 100 (whole percents keep the sums exact). Unused budget accrues up to `burst` hedges.
+    """
+
+    def __init__(self, percent: float, burst: float = 10.0):
+        self.percent = max(0.0, percent)
+        self.capacity = burst * 100
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.percent)
+
+    def withdraw(self) -> bool:
+        """Spends one hedge if the budget allows it."""
+        with self._lock:
+            if self.tokens >= 100:
+                self.tokens -= 100
+                return True
+            return False
+
+
+class Hedger:
+    """
+    Request hedging for one upstream: when an attempt has not answered by the
+    observed latency quantile (p95 by default), an identical second attempt is
+    sent; the first successful response wins and the other attempt is cancelled
+    (async) or its result discarded (threads, which cannot be interrupted).
+
+    Hedges are limited by a `HedgeBudget` and are not sent until `MIN_SAMPLES`
+    latencies were observed. Counted in `docuchat_hedged_requests_total` as
+    calls, hedged, hedge_won and budget_denied.
+    """
+
+    # Const
+    MIN_SAMPLES = 20
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, name: str, enabled: Optional[bool] = None, quantile: Optional[float] = None,
+                 budget_percent: Optional[float] = None, min_delay: Optional[float] = None):
+        """
+        Args:
+            name (str): Upstream name, used in metrics.
+            enabled (Optional[bool]): Off by default; when off calls run directly.
+            quantile (Optional[float]): Latency quantile after which a hedge is sent.
+            budget_percent (Optional[float]): Maximum hedges as a percentage of calls.
+            min_delay (Optional[float]): Lower bound of the hedge delay in seconds.
+        """
+        self.name = name
+        self.enabled = enabled if enabled is not None else settings.get_hedging_enabled()
+        self.quantile = quantile if quantile is not None else settings.get_hedging_quantile()
+        self.min_delay = min_delay if min_delay is not None else settings.get_hedging_min_delay_ms() / 1000
+        self.budget = HedgeBudget(budget_percent if budget_percent is not None else settings.get_hedging_budget_percent())
+        self.sketch = LatencySketch()
+
+    def get_delay(self) -> Optional[float]:
+        """
+        Returns:
+            Optional[float]: Seconds to wait before hedging, None while too few latencies are known.
+        """
+        if len(self.sketch) < self.MIN_SAMPLES:
+            return None
+        return max(self.min_delay, self.sketch.quantile(self.quantile))
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """
+        Returns the thread pool running sync attempts, shared by every upstream.
+
+        Returns:
+            ThreadPoolExecutor: Pool sized by `settings.get_hedging_workers()`.
+        """
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.get_hedging_workers(), thread_name_prefix="hedge"
+                    )
+        return cls._executor
+
+    @classmethod
+    def reset_executor(cls) -> None:
+        """
+        Forgets the thread pool without shutting it down, e.g. in a forked child
+        where its threads do not exist; it is rebuilt on next use.
+        """
+        with cls._executor_lock:
+            cls._executor = None
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = fn()
+        self.sketch.observe(time.perf_counter() - start)
+        return result
+
+    async def _attempt_async(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        result = await factory()
+        self.sketch.observe(time.perf_counter() - start)
+        return result
+
+    def run(self, fn: Callable[[], Any]) -> Any:
+        """
+        Calls `fn`, hedging it with a second call when it is slow.
+
+        Args:
+            fn (Callable[[], Any]): The upstream call; must be safe to run twice.
+
+        Returns:
+            Any: The result of the first attempt that succeeded. If both fail, the first error is raised.
+        """
+        if not self.enabled:
+            return fn()
+        HEDGES.inc(self.name, "calls")
+        self.budget.deposit()
+        delay = self.get_delay()
+        if delay is None:
+            return self._attempt(fn)
+
+        executor = self.get_executor()
+        # One context copy per attempt: a Context cannot be entered by two threads at once
+        first = executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            if first.done():
+                return first.result()  # the call itself raised a TimeoutError
+        if not self.budget.withdraw():
+            HEDGES.inc(self.name, "budget_denied")
+            return first.result()
+
+        HEDGES.inc(self.name, "hedged")
+        second = executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        attempts: List[Future] = [first, second]
+        error: Optional[BaseException] = None
+        while attempts:
+            done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                attempts.remove(attempt)
+                if attempt.exception() is None:
+                    for other in attempts:
+                        other.cancel()
+                    if attempt is second:
+                        HEDGES.inc(self.name, "hedge_won")
+                    return attempt.result()
+                error = error or attempt.exception()
+        raise error
+
+    async def run_async(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of `run`; the losing attempt is cancelled.
+
+        Args:
+            factory (Callable[[], Awaitable[Any]]): Creates the upstream call; called once per attempt.
+
+        Returns:
+            Any: The result of the first attempt that succeeded. If both fail, the first error is raised.
+        """
+        if not self.enabled:
+            return await factory()
+        HEDGES.inc(self.name, "calls")
+        self.budget.deposit()
+        delay = self.get_delay()
+        if delay is None:
+            return await self._attempt_async(factory)
+
+        first = asyncio.ensure_future(self._attempt_async(factory))
+        attempts = {first}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done:
+                return first.result()
+            if not self.budget.withdraw():
+                HEDGES.inc(self.name, "budget_denied")
+                return await first
+
+            HEDGES.inc(self.name, "hedged")
+            second = asyncio.ensure_future(self._attempt_async(factory))
+            attempts.add(second)
+            error: Optional[BaseException] = None
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is second:
+                            HEDGES.inc(self.name, "hedge_won")
+                        return attempt.result()
+                    error = error or attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+
+# Separate latency sketches and budgets per upstream
+kendra_hedger = Hedger("kendra")
+openai_hedger = Hedger("openai")
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.configs.settings import settings
+from src.utils.cache import ResponseCache
+from src.utils.metrics import ERRORS, get_request_timings, use_request_timings
+from src.utils.tracing import current_span, tracer
+
+
+class Interaction:
+    """
+    What happened while answering one query. Filled in along the pipeline
+    (retrieval, token usage, result) and written as one row when tracking ends.
+    """
+
+    __slots__ = (
+        "timestamp", "source", "query", "query_id", "kendra_results", "answers", "cache_hit", "degraded",
+        "error", "prompt_tokens", "completion_tokens", "scores", "urls", "timings", "total_ms", "_start",
+    )
+
+    def __init__(self, query: str, source: str):
+        self.timestamp = time.time()
+        self.source = source
+        self.query = query
+        self.query_id: Optional[str] = None
+        self.kendra_results: Optional[int] = None
+        self.answers: Optional[int] = None
+        self.cache_hit = False
+        self.degraded = False
+        self.error: Optional[str] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.scores: List[int] = []
+        self.urls: List[str] = []
+        self.timings: Dict[str, float] = {}
+        self.total_ms = 0.0
+        self._start = time.perf_counter()
+
+    def set_results(self, results: Sequence[Any]) -> None:
+        """Records the `ChatbotResponse` list returned for the query."""
+        self.scores = [response.score for response in results]
+        self.degraded = any(response.degraded for response in results)
+        if results:
+            self.query_id = self.query_id or results[0].queryId
+            self.urls = list(results[0].urls)
+
+    def add_tokens(self, kind: str, amount: int) -> None:
+        """Adds OpenAI token usage; `kind` is "prompt" or "completion"."""
+        if kind == "prompt":
+            self.prompt_tokens += amount
+        else:
+            self.completion_tokens += amount
+
+
+_current: ContextVar[Optional[Interaction]] = ContextVar("interaction", default=None)
+
+
+def current_interaction() -> Optional[Interaction]:
+    """Returns the interaction tracked in the current context, if any."""
+    return _current.get()
+
+
+class _Tracking:
+    """
+    Makes an `Interaction` current for the `with` block (including threads and tasks
+    started from it) and collects its stage timings; hands it to the store on exit.
+    In a traced request the block is a "query" span carrying the interaction's
+    fields. Values are restored by assignment rather than token reset, so it also
+    works around the yields of an async generator.
+    """
+
+    __slots__ = ("store", "interaction", "previous", "parent_timings", "scope")
+
+    def __init__(self, store: "InteractionStore", interaction: Interaction):
+        self.store = store
+        self.interaction = interaction
+        self.previous: Optional[Interaction] = None
+        self.parent_timings: Optional[Dict[str, float]] = None
+        self.scope: Any = None
+
+    def __enter__(self) -> Interaction:
+        self.previous = _current.get()
+        self.parent_timings = get_request_timings()
+        _current.set(self.interaction)
+        use_request_timings(self.interaction.timings)
+        self.scope = tracer.span("query")
+        self.scope.__enter__()
+        return self.interaction
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        interaction = self.interaction
+        interaction.total_ms = (time.perf_counter() - interaction._start) * 1000
+        if exc_type is not None and interaction.error is None:
+            interaction.error = exc_type.__name__
+        span = current_span()
+        if span is not None:
+            span.set_attributes({
+                "docuchat.source": interaction.source,
+                "docuchat.query_bytes": len(interaction.query.encode("utf-8")),
+                "docuchat.query_id": interaction.query_id,
+                "docuchat.cache_hit": interaction.cache_hit,
+                "docuchat.kendra_results": interaction.kendra_results,
+                "docuchat.answers": interaction.answers,
+                "docuchat.answer_count": len(interaction.scores),
+                "docuchat.degraded": interaction.degraded,
+                "openai.prompt_tokens": interaction.prompt_tokens,
+                "openai.completion_tokens": interaction.completion_tokens,
+            })
+        self.scope.__exit__(exc_type, exc, tb)
+        # Stages still add up in the request's Server-Timing header
+        if self.parent_timings is not None:
+            for stage, ms in interaction.timings.items():
+                self.parent_timings[stage] = self.parent_timings.get(stage, 0.0) + ms
+        use_request_timings(self.parent_timings)
+        _current.set(self.previous)
+        self.store.record(interaction)
+
+
+class InteractionStore:
+    """
+    Structured record of every answered query in a SQLite file (one row per
+    query), replacing free-text log lines for analytics (`python -m src.analytics`).
+
+    Like `CsvLogger`, callers only enqueue rows; one background thread writes
+    them in batches, so the request path never waits on disk. Several worker
+    processes may share the file (WAL mode).
+    """
+
+    # Const
+    COLUMNS = (
+        "ts", "source", "query", "query_hash", "query_id", "kendra_results", "answers", "answer_count",
+        "top_score", "scores", "urls", "cache_hit", "degraded", "error", "prompt_tokens", "completion_tokens",
+        "total_ms", "cache_ms", "kendra_ms", "consensus_ms", "timings",
+    )
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS interactions (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            source TEXT NOT NULL,
+            query TEXT NOT NULL,
+            query_hash TEXT NOT NULL,
+            query_id TEXT,
+            kendra_results INTEGER,
+            answers INTEGER,
+            answer_count INTEGER NOT NULL,
+            top_score INTEGER,
+            scores TEXT NOT NULL,
+            urls TEXT NOT NULL,
+            cache_hit INTEGER NOT NULL,
+            degraded INTEGER NOT NULL,
+            error TEXT,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            total_ms REAL NOT NULL,
+            cache_ms REAL,
+            kendra_ms REAL,
+            consensus_ms REAL,
+            timings TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS interactions_ts ON interactions (ts, total_ms);
+        CREATE INDEX IF NOT EXISTS interactions_query_hash ON interactions (query_hash, ts);
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            path (Optional[str]): SQLite file; `settings.get_interaction_store_path()` when omitted.
+            enabled (Optional[bool]): When False nothing is recorded.
+        """
+        self.enabled = enabled if enabled is not None else settings.get_interaction_store_enabled()
+        self.path = path or settings.get_interaction_store_path()
+        self.batch_size = settings.get_interaction_store_batch_size()
+        self.flush_interval = settings.get_interaction_store_flush_interval()
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # Guards starting/stopping the writer thread, never held while writing
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def track(self, query: str, source: str) -> _Tracking:
+        """
+        Tracks one query while it is answered.
+
+        Args:
+            query (str): The user's query string.
+            source (str): Entry point, e.g. "chatbot", "stream" or "batch".
+
+        Returns:
+            _Tracking: Context manager yielding the `Interaction` to fill in.
+
+        Usage:
+            with interaction_store.track(query, "chatbot") as interaction:
+                interaction.set_results(results)
+        """
+        return _Tracking(self, Interaction(query, source))
+
+    def record(self, interaction: Interaction) -> None:
+        """Enqueues a finished interaction. Never blocks on disk I/O."""
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        self._queue.put(interaction)
+
+    @staticmethod
+    def _row(interaction: Interaction) -> tuple:
+        """Returns the column values (`COLUMNS` order) of an interaction; runs on the writer thread."""
+        timings = interaction.timings
+        return (
+            interaction.timestamp, interaction.source, interaction.query, ResponseCache.make_key(interaction.query),
+            interaction.query_id, interaction.kendra_results, interaction.answers, len(interaction.scores),
+            max(interaction.scores) if interaction.scores else None, json.dumps(interaction.scores),
+            json.dumps(interaction.urls), int(interaction.cache_hit), int(interaction.degraded), interaction.error,
+            interaction.prompt_tokens, interaction.completion_tokens, round(interaction.total_ms, 3),
+            timings.get("cache"), timings.get("kendra"), timings.get("consensus"),
+            json.dumps({stage: round(ms, 3) for stage, ms in timings.items()}),
+        )
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Opens the database, creating the table and indexes if needed.
+
+        Returns:
+            sqlite3.Connection: A new connection owned by the caller.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every row enqueued before this call is written.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the queue was drained within the timeout.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Writes pending rows and stops the writer thread.
+        Registered with `atexit` and called from the API shutdown hook.
+        """
+        with self.lock:
+            thread = self._thread
+            self._thread = None
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def _ensure_writer(self) -> None:
+        """
+        Starts the background writer thread if it is not running (e.g. after a fork).
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self.lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="interaction-store-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Writer loop: collects up to `batch_size` rows or waits `flush_interval`,
+        then inserts them in one transaction.
+        """
+        conn: Optional[sqlite3.Connection] = None
+        stop = False
+        while not stop:
+            batch: List[Interaction] = []
+            waiters: List[threading.Event] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    conn = conn or self.connect()
+                    with conn:
+                        conn.executemany(
+                            f"INSERT INTO interactions ({', '.join(self.COLUMNS)}) "
+                            f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                            [self._row(interaction) for interaction in batch],
+                        )
+                except Exception as e:
+                    ERRORS.inc("interaction_store")
+                    print(f"Failed to write {len(batch)} interactions: {e}", file=sys.stderr)
+            for waiter in waiters:
+                waiter.set()
+        if conn is not None:
+            conn.close()
+
+
+# Global instance
+interaction_store = InteractionStore()
@@ -1,15 +1,58 @@
+import io
 import os
-import pandas as pd
+import csv
+import json
+import time
+import sys
+import queue
+import atexit
+import random
 import threading
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from src.configs.settings import settings
+from src.utils.metrics import ERRORS, timed
+
+# (epoch timestamp, level, message, format args, exception, request ID, log dir), formatted on the writer thread
+Record = Tuple[float, str, str, tuple, Optional[BaseException], Optional[str], str]
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def set_request_id(request_id: Optional[str]) -> None:
+    """Sets the request ID attached to records logged in the current context (and threads/tasks started from it)."""
+    _request_id.set(request_id)
+
+
+def get_request_id() -> Optional[str]:
+    """Returns the request ID of the current context, if any."""
+    return _request_id.get()
+
 
 class CsvLogger:
     """
-    A logger that writes logs to day-wise CSV files using pandas.
+    A logger that writes logs to day-wise files, as CSV or newline-delimited JSON
+    (LOG_FORMAT). JSON records also carry the request ID; the CSV layout stays
+    unchanged so existing day files and readers keep working. Day files are split into numbered parts once they exceed
+    LOG_MAX_BYTES (e.g. logs/2024-01-10_app_log.csv, logs/2024-01-10.1_app_log.csv).
+
+    Records below LOG_LEVEL return before doing any work, and INFO/DEBUG records
+    are kept with probability LOG_SAMPLE_RATE. Callers only enqueue the raw
+    record; a single background thread formats the message (`message % args`),
+    batches records and appends them to the current file.
+
+    Usage:
+        csv_logger.log("INFO", "Processing query: %s", query)
+        csv_logger.log("ERROR", "Exception in Foo.bar()", exception=ex)
     """
-    
+
+    # Const
+    COLUMNS = ["timestamp", "level", "message", "exception"]
+    LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+    # Records at or above this level are never sampled out
+    SAMPLE_BELOW = 30
+
     def __init__(self):
         """
         Initialize the logger.
@@ -17,58 +60,306 @@ class CsvLogger:
         self.log_dir = settings.get_log_dir()
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
-        # Initialize a lock for thread-safe logging
+        self.batch_size = settings.get_log_batch_size()
+        self.flush_interval = settings.get_log_flush_interval()
+        self.min_level = self.LEVELS.get(settings.get_log_level(), 20)
+        self.sample_rate = settings.get_log_sample_rate()
+        self.format = settings.get_log_format()
+        self.max_bytes = settings.get_log_max_bytes()
+
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        # Writer thread state: current file key (log dir, day), part number, handle and size
+        self._key: Optional[Tuple[str, str]] = None
+        self._part = 0
+        self._handle: Optional[Any] = None
+        self._size = 0
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+        self._thread: Optional[threading.Thread] = None
+        # Guards starting/stopping the writer thread, never held while writing
         self.lock = threading.Lock()
+        atexit.register(self.close)
 
-    def _get_log_filename(self, timestamp: datetime) -> str:
+    def _get_log_filename(self, timestamp: datetime, part: int = 0, log_dir: Optional[str] = None) -> str:
         """
         Generates the log filename based on the provided timestamp.
-        
+
         Args:
             timestamp (datetime): The timestamp for the log entry.
+            part (int): Size-rotation part of the day; 0 for the first file.
+            log_dir (Optional[str]): Directory; `self.log_dir` when omitted.
 
         Returns:
             str: Absolute path to the log file (e.g., logs/2024-01-10_app_log.csv).
         """
         current_date = timestamp.strftime("%Y-%m-%d")
+        if part:
+            current_date = f"{current_date}.{part}"
         suffix = settings.get_log_filename_suffix()
         filename = f"{current_date}_{suffix}"
-        return os.path.join(self.log_dir, filename)
+        return os.path.join(log_dir or self.log_dir, filename)
+
+    def is_enabled(self, level: str) -> bool:
+        """Returns whether records of `level` pass the LOG_LEVEL threshold."""
+        return self.LEVELS.get(level, 20) >= self.min_level
+
+    def log(self, level: str, message: str, *args: Any, exception: Optional[BaseException] = None) -> None:
+        """
+        Enqueues an entry for the log file. Never blocks on disk I/O.
+
+        Args:
+            level (str): Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL).
+            message (str): Log message, a %-format string when `args` are given.
+            *args (Any): Format arguments, only applied when the record is written.
+            exception (Optional[BaseException]): Exception object if available.
+        """
+        severity = self.LEVELS.get(level, 20)
+        if severity < self.min_level:
+            return
+        if severity < self.SAMPLE_BELOW and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        with timed("log", traced=False):
+            self._ensure_writer()
+            self._queue.put((time.time(), level, message, args, exception, _request_id.get(), self.log_dir))
 
-    def log(self, level: str, message: str, exception: Optional[Exception] = None) -> None:
+    def flush(self, timeout: Optional[float] = None) -> bool:
         """
-        Logs an entry to the CSV file.
-        
+        Blocks until every entry enqueued before this call is written to disk.
+
         Args:
-            level (str): Log level (INFO, ERROR, WARNING, etc.).
-            message (str): Log message.
-            exception (Optional[Exception]): Exception object if available.
-        """
-        now = datetime.now()
-        timestamp_str = now.strftime("%Y-%m-%d %H:%M:%S")
-        
-        log_entry = {
-            "timestamp": timestamp_str,
-            "level": level,
-            "message": message,
-            "exception": str(exception) if exception else ""
-        }
-        
-        # Create a DataFrame for the single log entry
-        df = pd.DataFrame([log_entry])
-        
-        file_path = self._get_log_filename(now)
-        
-        # Critical section for thread-safe file writing
+            timeout (Optional[float]): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the queue was drained within the timeout.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Flushes pending entries, stops the writer thread and closes open files.
+        Registered with `atexit` and called from the API shutdown hook.
+        """
         with self.lock:
-            # Check if file exists to determine if header is needed
-            header = not os.path.exists(file_path)
-        
+            thread = self._thread
+            self._thread = None
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def _ensure_writer(self) -> None:
+        """
+        Starts the background writer thread if it is not running (e.g. after a fork).
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self.lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="csv-logger-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Writer loop: collects up to `batch_size` records or waits `flush_interval`.
+        """
+        stop = False
+        while not stop:
+            batch: List[Record] = []
+            waiters: List[threading.Event] = []
+            # Block until there is something to do, then gather a batch
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+        self._close_files()
+
+    def _format(self, record: Record, timestamp: datetime) -> bytes:
+        """
+        Renders one record as a CSV row or a JSON line.
+        """
+        _, level, message, args, exception, request_id, _ = record
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = f"{message} {args!r}"
+        if self.format == "json":
+            entry: Dict[str, Any] = {
+                "timestamp": timestamp.isoformat(sep=" ", timespec="milliseconds"),
+                "level": level,
+                "message": message,
+            }
+            if exception is not None:
+                entry["exception"] = str(exception)
+            if request_id:
+                entry["request_id"] = request_id
+            return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._csv.writerow([
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            level,
+            message,
+            str(exception) if exception else "",
+        ])
+        return self._buffer.getvalue().encode("utf-8")
+
+    def _write_batch(self, batch: List[Record]) -> None:
+        """
+        Appends a batch of records to their day files and flushes the handle.
+        """
+        if not batch:
+            return
+        for record in batch:
+            try:
+                timestamp = datetime.fromtimestamp(record[0])
+                line = self._format(record, timestamp)
+                handle = self._get_handle(record[6], timestamp, len(line))
+                handle.write(line)
+                self._size += len(line)
+            except Exception as e:
+                self._report(e)
+        if self._handle is not None:
             try:
-                # Append to CSV
-                df.to_csv(file_path, mode='a', header=header, index=False)
+                self._handle.flush()
             except Exception as e:
-                print(f"Failed to write log to CSV: {e}")
+                self._report(e)
+
+    @staticmethod
+    def _report(error: Exception) -> None:
+        """
+        Reports a failed write on stderr (the logger cannot log its own failures).
+        """
+        ERRORS.inc("log")
+        print(f"Failed to write log record: {error}", file=sys.stderr)
+
+    def _get_handle(self, log_dir: str, timestamp: datetime, size: int) -> Any:
+        """
+        Returns the open handle for a record of `size` bytes, moving to the next
+        day file, or the next part of the day once it would exceed `max_bytes`.
+        Every process checks the size it sees when opening a part, so with
+        several workers the limit is approximate.
+        """
+        key = (log_dir, timestamp.strftime("%Y-%m-%d"))
+        if key != self._key:
+            self._close_files()
+            self._key = key
+            self._part = self._last_part(log_dir, timestamp)
+        elif self.max_bytes and self._size and self._size + size > self.max_bytes:
+            self._close_files()
+            self._part += 1
+        if self._handle is None:
+            # Skip parts left full by a previous run (or another worker), or written in another layout
+            while not self._open(log_dir, timestamp, size):
+                self._part += 1
+        return self._handle
+
+    def _open(self, log_dir: str, timestamp: datetime, size: int) -> bool:
+        """
+        Opens the current part for appending, writing the CSV header to a new file.
+
+        Returns:
+            bool: False (leaving it closed) if the part has no room for `size` bytes
+            or starts with a different header.
+        """
+        file_path = self._get_log_filename(timestamp, self._part, log_dir)
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = b"" if self.format == "json" else (",".join(self.COLUMNS) + "\n").encode("utf-8")
+        existing = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        if existing:
+            if self.max_bytes and existing + size > self.max_bytes:
+                return False
+            with open(file_path, mode="rb") as reader:
+                first = reader.read(len(header) or 1)
+            if first != (header or b"{"):
+                return False
+        self._handle = open(file_path, mode="ab")
+        self._size = self._handle.tell()
+        # Write the header only for a brand new (empty) file
+        if self._size == 0 and header:
+            self._handle.write(header)
+            self._size = len(header)
+        return True
+
+    def _last_part(self, log_dir: str, timestamp: datetime) -> int:
+        """
+        Returns the highest existing part number of the day, so a restart keeps appending to it.
+        """
+        prefix = f"{timestamp.strftime('%Y-%m-%d')}."
+        suffix = f"_{settings.get_log_filename_suffix()}"
+        parts = [0]
+        try:
+            names = os.listdir(log_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if name.startswith(prefix) and name.endswith(suffix):
+                number = name[len(prefix):-len(suffix)]
+                if number.isdigit():
+                    parts.append(int(number))
+        return max(parts)
+
+    def _close_files(self) -> None:
+        """
+        Closes the open log file handle.
+        """
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+        self._handle = None
+        self._size = 0
+
+
+def read_records(file_path: str) -> Iterator[Dict[str, str]]:
+    """
+    Reads back a log file written in either format.
+
+    Args:
+        file_path (str): A CSV or JSON-lines log file.
+
+    Returns:
+        Iterator[Dict[str, str]]: Records with at least timestamp, level and message.
+    """
+    with open(file_path, newline="", encoding="utf-8") as handle:
+        first = handle.read(1)
+        handle.seek(0)
+        if first == "{":
+            for line in handle:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        else:
+            yield from csv.DictReader(handle)
+
 
 # Global instance
 csv_logger = CsvLogger()
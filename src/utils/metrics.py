@@ -0,0 +1,512 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.tracing import Span, current_span, tracer
+
+# Per-request stage timings in milliseconds, rendered into the Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """Adds `amount` to the series identified by `labelvalues`."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        """Returns the current value of a series."""
+        return self._values.get(labelvalues, 0)
+
+    def collect(self) -> Dict[LabelValues, float]:
+        """Returns a copy of every series."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Drops every series."""
+        with self._lock:
+            self._values = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Bucketed histogram with optional labels. The most recent observations per
+    series are also kept in a ring buffer so p50/p95/p99 can be reported.
+    """
+
+    # Const
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    QUANTILES = (0.5, 0.95, 0.99)
+    WINDOW = 2048
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Records one observation for the series identified by `labelvalues`."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # [bucket counts, sum, count, ring buffer, ring position]
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0, [], 0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            window = series[3]
+            if len(window) < self.WINDOW:
+                window.append(value)
+            else:
+                window[series[4]] = value
+                series[4] = (series[4] + 1) % self.WINDOW
+
+    def quantiles(self, *labelvalues: str) -> Dict[float, float]:
+        """Returns p50/p95/p99 over the recent observations of a series."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            window = sorted(series[3]) if series else []
+        if not window:
+            return {}
+        return {q: window[min(int(q * len(window)), len(window) - 1)] for q in self.QUANTILES}
+
+    def count(self, *labelvalues: str) -> int:
+        """Returns the number of observations of a series."""
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def collect(self) -> Dict[LabelValues, list]:
+        """Returns a copy of every series as [bucket counts, sum, count, recent observations]."""
+        with self._lock:
+            return {k: [list(v[0]), v[1], v[2], list(v[3])] for k, v in self._series.items()}
+
+    def reset(self) -> None:
+        """Drops every series."""
+        with self._lock:
+            self._series = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        quantile_name = f"{self.name}_quantile"
+        lines.append(f"# HELP {quantile_name} Recent p50/p95/p99 of {self.name}")
+        lines.append(f"# TYPE {quantile_name} gauge")
+        for labelvalues, _ in items:
+            for q, value in self.quantiles(*labelvalues).items():
+                extra = f'quantile="{q}"'
+                lines.append(f"{quantile_name}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Metric whose samples are read from a callback at scrape time (e.g. cache stats).
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def collect(self) -> Dict[LabelValues, float]:
+        """Returns the current samples, empty if the callback fails."""
+        try:
+            return dict(self.callback())
+        except Exception:
+            return {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        samples = self.collect()
+        for labelvalues, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds every metric and renders them in the Prometheus text exposition format.
+    """
+
+    # Const
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._snapshot_stop: Optional[threading.Event] = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        """Returns the counter called `name`, creating it if needed."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Iterable[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram called `name`, creating it if needed."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_callback(self, name: str, documentation: str, metric_type: str, labelnames: Tuple[str, ...],
+                          callback: Callable[[], Dict[LabelValues, float]]) -> CallbackMetric:
+        """Registers a metric read from `callback` at scrape time."""
+        return self._register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+    def reset(self) -> None:
+        """
+        Zeroes every counter and histogram, e.g. in a worker forked from a master
+        that already recorded calls. Callback metrics are read live and are left as is.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if isinstance(metric, (Counter, Histogram)):
+                metric.reset()
+
+    def render(self, directory: Optional[str] = None) -> str:
+        """
+        Renders every metric.
+
+        Args:
+            directory (Optional[str]): Multi-process snapshot directory. When given, the
+                live values of this process are merged with every other worker's snapshot.
+
+        Returns:
+            str: Prometheus text exposition.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        if directory:
+            metrics = self._merge(metrics, self._read_snapshots(directory))
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        Returns every metric's series in a JSON-serializable form.
+
+        Returns:
+            Dict[str, list]: Metric name to [[label values, value], ...].
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: [[list(k), v] for k, v in metric.collect().items()] for metric in metrics}
+
+    def write_snapshot(self, directory: str) -> None:
+        """
+        Atomically writes this process' snapshot to `<directory>/metrics-<pid>.json`.
+        Files of exited workers are kept so counters stay monotonic; the server
+        removes the files of previous runs with `clear_snapshots` before forking.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def start_snapshots(self, directory: str, interval: float) -> None:
+        """
+        Starts a daemon thread writing this process' snapshot every `interval` seconds.
+        Call it in each worker after the fork.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write_snapshot(directory)
+                except OSError:
+                    pass
+
+        self._snapshot_stop = stop
+        threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+
+    def stop_snapshots(self, directory: str) -> None:
+        """
+        Stops the snapshot thread and writes a final snapshot.
+        """
+        if self._snapshot_stop is not None:
+            self._snapshot_stop.set()
+            self._snapshot_stop = None
+        self.write_snapshot(directory)
+
+    @staticmethod
+    def clear_snapshots(directory: str) -> None:
+        """
+        Removes every snapshot in `directory`, e.g. those left by a previous run.
+        """
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith("metrics-") and (name.endswith(".json") or name.endswith(".json.tmp")):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _read_snapshots(directory: str) -> List[Tuple[int, Dict[str, list]]]:
+        """Returns the (pid, snapshot) of every other process."""
+        snapshots = []
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return snapshots
+        for name in names:
+            if not name.startswith("metrics-") or not name.endswith(".json"):
+                continue
+            pid = name[len("metrics-"):-len(".json")]
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    snapshots.append((int(pid), json.load(f)))
+            except (OSError, ValueError):
+                continue  # being replaced or unreadable; picked up on the next scrape
+        return snapshots
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass  # exists but owned by someone else
+        return True
+
+    @classmethod
+    def _merge(cls, metrics: List[Any], snapshots: List[Tuple[int, Dict[str, list]]]) -> List[Any]:
+        """
+        Sums counters, counter callbacks and histogram buckets across processes;
+        recent observations are concatenated so quantiles cover every worker.
+        Gauges are not additive (a circuit state, a concurrency limit), so each
+        live process keeps its own series under an extra "pid" label.
+        """
+        live = [(pid, snapshot) for pid, snapshot in snapshots if cls._is_alive(pid)]
+        merged = []
+        for metric in metrics:
+            if isinstance(metric, CallbackMetric) and metric.metric_type == "gauge":
+                series = {key + (str(os.getpid()),): value for key, value in metric.collect().items()}
+                for pid, snapshot in live:
+                    for labels, value in snapshot.get(metric.name, []):
+                        series[tuple(labels) + (str(pid),)] = value
+                merged.append(CallbackMetric(
+                    metric.name, metric.documentation, metric.metric_type, metric.labelnames + ("pid",),
+                    lambda s=series: s,
+                ))
+                continue
+            series = metric.collect()
+            for _, snapshot in snapshots:
+                for labels, value in snapshot.get(metric.name, []):
+                    key = tuple(labels)
+                    if isinstance(metric, Histogram):
+                        current = series.get(key)
+                        if current is None:
+                            series[key] = [list(value[0]), value[1], value[2], list(value[3])]
+                        else:
+                            current[0] = [a + b for a, b in zip(current[0], value[0])]
+                            current[1] += value[1]
+                            current[2] += value[2]
+                            current[3].extend(value[3])
+                    else:
+                        series[key] = series.get(key, 0) + value
+            if isinstance(metric, Histogram):
+                combined = Histogram(metric.name, metric.documentation, metric.labelnames, metric.buckets)
+                combined._series = {k: [v[0], v[1], v[2], v[3], 0] for k, v in series.items()}
+            elif isinstance(metric, Counter):
+                combined = Counter(metric.name, metric.documentation, metric.labelnames)
+                combined._values = series
+            else:
+                combined = CallbackMetric(
+                    metric.name, metric.documentation, metric.metric_type, metric.labelnames, lambda s=series: s
+                )
+            merged.append(combined)
+        return merged
+
+metrics = MetricsRegistry()
+
+STAGE_DURATION = metrics.histogram(
+    "docuchat_stage_duration_seconds", "Time spent in each chatbot pipeline stage", ("stage",)
+)
+UPSTREAM_DURATION = metrics.histogram(
+    "docuchat_upstream_duration_seconds", "Latency of upstream service calls", ("upstream",)
+)
+HTTP_DURATION = metrics.histogram(
+    "docuchat_http_request_duration_seconds", "HTTP request latency", ("path",)
+)
+HTTP_REQUESTS = metrics.counter(
+    "docuchat_http_requests_total", "HTTP requests by path and status code", ("path", "status")
+)
+ERRORS = metrics.counter("docuchat_errors_total", "Errors by component", ("component",))
+EMPTY_RESULTS = metrics.counter("docuchat_empty_results_total", "Requests with no results by stage", ("stage",))
+OPENAI_TOKENS = metrics.counter("docuchat_openai_tokens_total", "OpenAI token usage by kind", ("kind",))
+KENDRA_RESULTS = metrics.counter("docuchat_kendra_results_total", "Kendra result items by type", ("type",))
+PROMPT_TOKENS = metrics.counter(
+    "docuchat_prompt_statement_tokens_total", "Statement tokens offered to and sent to consensus", ("kind",)
+)
+KENDRA_PAGES = metrics.counter("docuchat_kendra_pages_total", "Kendra result pages by outcome", ("outcome",))
+LOAD_SHED = metrics.counter(
+    "docuchat_load_shed_total", "Upstream calls rejected by the concurrency limiters", ("upstream", "reason")
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "docuchat_circuit_transitions_total", "Circuit breaker state changes by upstream and new state", ("upstream", "state")
+)
+DEGRADED_RESPONSES = metrics.counter(
+    "docuchat_degraded_responses_total", "Answers built from Kendra excerpts because OpenAI was unavailable", ("upstream",)
+)
+HEDGES = metrics.counter(
+    "docuchat_hedged_requests_total", "Hedged upstream calls by event (calls, hedged, hedge_won, budget_denied)",
+    ("upstream", "event"),
+)
+
+
+class timed:
+    """
+    Times a block and records it into a histogram and the current request's
+    Server-Timing breakdown. In a traced request it is also a span (a client
+    span for upstream calls). A plain class (not a generator) to keep overhead low.
+
+    Usage:
+        with timed("kendra"):
+            ...
+    """
+
+    __slots__ = ("stage", "histogram", "start", "traced", "scope")
+
+    def __init__(self, stage: str, histogram: Histogram = STAGE_DURATION, traced: bool = True):
+        self.stage = stage
+        self.histogram = histogram
+        self.start = 0
+        self.traced = traced
+        self.scope: Any = None
+
+    def __enter__(self) -> "timed":
+        if self.traced and current_span() is not None:
+            kind = Span.CLIENT if self.histogram is UPSTREAM_DURATION else Span.INTERNAL
+            self.scope = tracer.span(self.stage, kind)
+            self.scope.__enter__()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed_ns = time.perf_counter_ns() - self.start
+        if self.scope is not None:
+            self.scope.__exit__(exc_type, exc, tb)
+        self.histogram.observe(elapsed_ns / 1e9, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed_ns / 1e6
+
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Starts collecting stage timings for the current request context.
+
+    Returns:
+        Dict[str, float]: The mutable mapping of stage name to milliseconds.
+    """
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def get_request_timings() -> Optional[Dict[str, float]]:
+    """Returns the stage timings being collected for the current context, if any."""
+    return _request_timings.get()
+
+
+def use_request_timings(timings: Optional[Dict[str, float]]) -> None:
+    """Makes `timed` blocks of the current context record into `timings` (None stops recording)."""
+    _request_timings.set(timings)
+
+
+def format_server_timing(timings: Dict[str, float], total_ms: Optional[float] = None) -> str:
+    """
+    Formats stage timings as a `Server-Timing` header value.
+
+    Args:
+        timings (Dict[str, float]): Stage name to milliseconds.
+        total_ms (Optional[float]): Whole request duration, appended as `total`.
+
+    Returns:
+        str: e.g. "retrieve;dur=120.4, consensus;dur=830.2, total;dur=955.0".
+    """
+    parts = [f"{stage.replace('.', '_')};dur={ms:.1f}" for stage, ms in timings.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,88 @@
+import json
+from typing import Any, List, Optional
+
+
+class PartialJSONParser:
+    """
+    Incrementally scans a JSON document as it streams in and can parse the
+    prefix seen so far by closing any open strings, arrays and objects.
+
+    Scanner state is kept between `feed` calls, so each chunk is scanned once.
+    """
+
+    def __init__(self):
+        self.buffer: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        # Number of containers closed so far; lets callers skip unchanged snapshots
+        self.closed = 0
+
+    def feed(self, chunk: str) -> None:
+        """
+        Appends a chunk of the document.
+
+        Args:
+            chunk (str): The next piece of streamed text.
+        """
+        self.buffer.append(chunk)
+        for char in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append("}" if char == "{" else "]")
+                self._started = True
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                self.closed += 1
+
+    @property
+    def text(self) -> str:
+        """The full text received so far."""
+        return "".join(self.buffer)
+
+    @property
+    def in_string(self) -> bool:
+        """Whether the scanner is currently inside a string literal."""
+        return self._in_string
+
+    @property
+    def depth(self) -> int:
+        """Number of containers currently open."""
+        return len(self._stack)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the top-level value has been closed."""
+        return self._started and not self._stack
+
+    def snapshot(self) -> Optional[Any]:
+        """
+        Parses the prefix received so far.
+
+        Returns:
+            Optional[Any]: The partial value, or None if the prefix cannot be completed
+            (e.g. it ends right after a key or a comma).
+        """
+        if not self._started:
+            return None
+        text = self.text.strip()
+        if self._in_string:
+            if self._escape:
+                text = text[:-1]
+            text += '"'
+        suffix = "".join(reversed(self._stack))
+        for candidate in (text + suffix, text.rstrip().rstrip(",") + suffix):
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+        return None
@@ -0,0 +1,134 @@
+import time
+import hashlib
+from typing import Callable, Dict, List, Mapping, Optional, Union
+
+from fastapi import Request
+from limits import RateLimitItem
+from limits.storage import StorageTypes
+from limits.strategies import STRATEGIES, RateLimiter
+from limits.util import WindowStats
+from slowapi.util import get_remote_address
+
+from src.configs.settings import settings
+from src.utils.rate_limit_storage import GCRASupport
+
+
+class GCRARateLimiter(RateLimiter):
+    """
+    Token bucket as GCRA (generic cell rate algorithm): "10/minute" is a bucket of
+    10 requests refilled at one per 6 seconds, so bursts are capped without the
+    double-rate spike fixed windows allow at their boundary. Each decision is one
+    atomic `acquire_gcra` on the storage. Registered as the `gcra` strategy.
+    """
+
+    def __init__(self, storage: StorageTypes):
+        if not isinstance(storage, GCRASupport):
+            raise NotImplementedError(f"{type(storage).__name__} does not support the gcra strategy")
+        super().__init__(storage)
+
+    @staticmethod
+    def _interval(item: RateLimitItem) -> float:
+        return item.get_expiry() / item.amount
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        allowed, _ = self.storage.acquire_gcra(item.key_for(*identifiers), self._interval(item), item.amount, cost)
+        return allowed
+
+    def test(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        backlog = self.storage.get_gcra(item.key_for(*identifiers))
+        return backlog + cost * self._interval(item) <= item.get_expiry() + 1e-9
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: str) -> WindowStats:
+        """Returns when the bucket is full again and how many requests it allows now."""
+        backlog = self.storage.get_gcra(item.key_for(*identifiers))
+        remaining = int((item.get_expiry() - backlog) / self._interval(item) + 1e-9)
+        return WindowStats(time.time() + backlog, max(0, remaining))
+
+
+STRATEGIES["gcra"] = GCRARateLimiter
+
+
+class RateLimitPolicy:
+    """
+    Decides whom a request is counted against and which quota applies.
+
+    Requests with a known API key count against their tenant, everyone else against
+    the client IP: the `X-Forwarded-For` entry appended by the outermost trusted proxy
+    when proxies are configured, the socket peer otherwise. Unknown API keys are
+    ignored, so rotating made-up keys cannot dodge the per-IP limit.
+    """
+
+    # Const
+    SCOPES = ("chatbot", "batch", "stream")
+
+    def __init__(self, tenants: Optional[Mapping[str, Union[str, Mapping[str, str]]]] = None,
+                 api_key_header: Optional[str] = None, trusted_proxy_hops: Optional[int] = None):
+        """
+        Args:
+            tenants (Optional[Mapping[str, Union[str, Mapping[str, str]]]]): Quotas by API key, see
+                `settings.get_rate_limit_tenants()`.
+            api_key_header (Optional[str]): Header carrying the API key.
+            trusted_proxy_hops (Optional[int]): Proxies that append to `X-Forwarded-For`; 0 ignores the header.
+        """
+        tenants = tenants if tenants is not None else settings.get_rate_limit_tenants()
+        self.api_key_header = api_key_header or settings.get_rate_limit_api_key_header()
+        self.trusted_proxy_hops = (
+            trusted_proxy_hops if trusted_proxy_hops is not None else settings.get_rate_limit_trusted_proxy_hops()
+        )
+        # Only hashes are kept: identities end up as keys in the shared storage
+        self.quotas: Dict[str, Dict[str, str]] = {}
+        for api_key, quota in tenants.items():
+            scopes = dict.fromkeys(self.SCOPES, quota) if isinstance(quota, str) else dict(quota)
+            unknown = set(scopes) - set(self.SCOPES)
+            if unknown:
+                raise ValueError(f"Unknown rate-limit scopes {sorted(unknown)}, expected {self.SCOPES}")
+            self.quotas[self.tenant_identity(api_key)] = scopes
+
+    @staticmethod
+    def tenant_identity(api_key: str) -> str:
+        """Returns the rate-limit key of the tenant owning `api_key`."""
+        return "tenant:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+    def client_ip(self, request: Request) -> str:
+        """Returns the client address, taking trusted proxies into account."""
+        if self.trusted_proxy_hops:
+            forwarded: List[str] = [
+                address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()
+            ]
+            if forwarded:
+                return forwarded[max(0, len(forwarded) - self.trusted_proxy_hops)]
+        return get_remote_address(request)
+
+    def identify(self, request: Request) -> str:
+        """
+        Slowapi key function.
+
+        Returns:
+            str: "tenant:<hash>" for a known API key, "ip:<address>" otherwise.
+        """
+        api_key = request.headers.get(self.api_key_header)
+        if api_key and self.quotas:
+            identity = self.tenant_identity(api_key)
+            if identity in self.quotas:
+                return identity
+        return "ip:" + self.client_ip(request)
+
+    def limit_for(self, scope: str, default: str) -> Callable[[str], str]:
+        """
+        Builds the slowapi limit provider of one endpoint.
+
+        Args:
+            scope (str): One of `SCOPES`.
+            default (str): Limit for anonymous clients and tenants without a quota for `scope`.
+
+        Returns:
+            Callable[[str], str]: Maps the identity from `identify` to its limit.
+        """
+        def provider(key: str) -> str:
+            quota = self.quotas.get(key)
+            return quota.get(scope, default) if quota else default
+        return provider
+
+
+# Per-tenant quotas are parsed once at startup
+rate_limit_policy = RateLimitPolicy()
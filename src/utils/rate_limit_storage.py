@@ -0,0 +1,260 @@
+import os
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple, Type
+
+from limits.storage import MemoryStorage as _MemoryStorage
+from limits.storage import RedisStorage as _RedisStorage
+from limits.storage import Storage
+
+
+def gcra_step(backlog: float, interval: float, capacity: int, cost: int) -> Tuple[bool, float]:
+    """
+    One GCRA (token bucket) decision. `backlog` is how far the bucket's theoretical
+    arrival time lies ahead of now: 0 for a full bucket, `capacity * interval` for an empty one.
+
+    Args:
+        backlog (float): Seconds the stored arrival time is ahead of now (negative values count as 0).
+        interval (float): Seconds to refill one token.
+        capacity (int): Bucket size, i.e. the burst allowed.
+        cost (int): Tokens this request takes.
+
+    Returns:
+        Tuple[bool, float]: Whether the request is allowed, and the backlog to store (unchanged when denied).
+    """
+    backlog = max(backlog, 0.0)
+    new_backlog = backlog + cost * interval
+    if new_backlog > capacity * interval + 1e-9:
+        return False, backlog
+    return True, new_backlog
+
+
+class GCRASupport(ABC):
+    """
+    Storages that can run a GCRA decision atomically, in one round trip
+    to the shared state. Used by the `gcra` rate-limit strategy.
+    """
+
+    @abstractmethod
+    def acquire_gcra(self, key: str, interval: float, capacity: int, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Returns:
+            Tuple[bool, float]: Whether the request is allowed, and the backlog in seconds afterwards.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_gcra(self, key: str) -> float:
+        """Returns the backlog of `key` in seconds (0 for a full or unknown bucket)."""
+        raise NotImplementedError
+
+
+class MemoryStorage(_MemoryStorage, GCRASupport):
+    """
+    The stock in-process `memory://` storage with GCRA support. Limits are per
+    process: use it for a single worker and in tests.
+    """
+
+    STORAGE_SCHEME = ["memory"]
+
+    # Const
+    PRUNE_EVERY = 1024
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._arrivals: Dict[str, float] = {}
+        self._arrivals_lock = threading.Lock()
+        self._acquired = 0
+
+    def acquire_gcra(self, key: str, interval: float, capacity: int, cost: int = 1) -> Tuple[bool, float]:
+        now = time.time()
+        with self._arrivals_lock:
+            allowed, backlog = gcra_step(self._arrivals.get(key, now) - now, interval, capacity, cost)
+            if allowed:
+                self._arrivals[key] = now + backlog
+            self._acquired += 1
+            if self._acquired % self.PRUNE_EVERY == 0:
+                # Full buckets carry no state
+                self._arrivals = {k: arrival for k, arrival in self._arrivals.items() if arrival > now}
+        return allowed, backlog
+
+    def get_gcra(self, key: str) -> float:
+        return max(0.0, self._arrivals.get(key, 0.0) - time.time())
+
+    def clear(self, key: str) -> None:
+        super().clear(key)
+        with self._arrivals_lock:
+            self._arrivals.pop(key, None)
+
+    def reset(self) -> Optional[int]:
+        with self._arrivals_lock:
+            self._arrivals.clear()
+        return super().reset()
+
+
+class RedisStorage(_RedisStorage, GCRASupport):
+    """
+    The stock `redis://` storage (needs the `redis` package) with GCRA support:
+    every decision is one `EVALSHA` of `SCRIPT_GCRA`, which reads the server clock
+    (Redis 5+) so replicas with skewed clocks still share one bucket.
+    """
+
+    STORAGE_SCHEME = ["redis", "rediss", "redis+unix"]
+
+    # Const
+    SCRIPT_GCRA = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local backlog = math.max(tonumber(redis.call('GET', KEYS[1]) or now) - now, 0)
+local new_backlog = backlog + cost * interval
+if new_backlog > capacity * interval + 1e-9 then
+    return {0, tostring(backlog)}
+end
+redis.call('SET', KEYS[1], tostring(now + new_backlog), 'PX', math.ceil(new_backlog * 1000))
+return {1, tostring(new_backlog)}
+"""
+    SCRIPT_GCRA_BACKLOG = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+return tostring(math.max(tonumber(redis.call('GET', KEYS[1]) or now) - now, 0))
+"""
+
+    def initialize_storage(self, uri: str) -> None:
+        super().initialize_storage(uri)
+        self.lua_gcra = self.get_connection().register_script(self.SCRIPT_GCRA)
+        self.lua_gcra_backlog = self.get_connection().register_script(self.SCRIPT_GCRA_BACKLOG)
+
+    def acquire_gcra(self, key: str, interval: float, capacity: int, cost: int = 1) -> Tuple[bool, float]:
+        allowed, backlog = self.lua_gcra([self.prefixed_key(key)], [interval, capacity, cost])
+        return bool(int(allowed)), float(backlog)
+
+    def get_gcra(self, key: str) -> float:
+        return float(self.lua_gcra_backlog([self.prefixed_key(key)]))
+
+
+class SQLiteStorage(Storage, GCRASupport):
+    """
+    `limits` storage backed by a SQLite file, so every worker process of one host
+    shares the same rate-limit counters. Registered for `sqlite://<path>` URIs,
+    e.g. `sqlite:///var/run/docuchat/limits.sqlite3`.
+
+    Use `redis://` (needs the `redis` package) to share limits across hosts.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split("://", 1)[1] or ":memory:"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._acquired = 0
+
+    @property
+    def base_exceptions(self) -> Tuple[Type[Exception], ...]:
+        return (sqlite3.Error,)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process: a storage created before a fork is reopened in each worker
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS arrivals (key TEXT PRIMARY KEY, arrival REAL NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        """Increments the counter for `key`, starting a new window of `expiry` seconds if needed."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO limits (key, count, expires_at) VALUES (?, 0, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET count = CASE WHEN expires_at <= ? THEN 0 ELSE count END, "
+                    "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END",
+                    (key, now + expiry, now, now),
+                )
+                count = conn.execute(
+                    "UPDATE limits SET count = count + ? WHERE key = ? RETURNING count", (amount, key)
+                ).fetchone()[0]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def acquire_gcra(self, key: str, interval: float, capacity: int, cost: int = 1) -> Tuple[bool, float]:
+        """Runs one GCRA decision for `key` inside a write transaction."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT arrival FROM arrivals WHERE key = ?", (key,)).fetchone()
+                allowed, backlog = gcra_step(row[0] - now if row else 0.0, interval, capacity, cost)
+                if allowed:
+                    conn.execute(
+                        "INSERT INTO arrivals (key, arrival) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET arrival = excluded.arrival",
+                        (key, now + backlog),
+                    )
+                self._acquired += 1
+                if self._acquired % MemoryStorage.PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM arrivals WHERE arrival <= ?", (now,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return allowed, backlog
+
+    def get_gcra(self, key: str) -> float:
+        """Returns the GCRA backlog of `key` in seconds."""
+        with self._lock:
+            row = self._connection().execute("SELECT arrival FROM arrivals WHERE key = ?", (key,)).fetchone()
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    def get(self, key: str) -> int:
+        """Returns the current count for `key` (0 when expired or missing)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT count FROM limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        """Returns the epoch time at which the window of `key` ends."""
+        with self._lock:
+            row = self._connection().execute("SELECT expires_at FROM limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    def check(self) -> bool:
+        """Returns whether the database is reachable."""
+        try:
+            with self._lock:
+                self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        """Removes every counter."""
+        with self._lock:
+            conn = self._connection()
+            return conn.execute("DELETE FROM limits").rowcount + conn.execute("DELETE FROM arrivals").rowcount
+
+    def clear(self, key: str) -> None:
+        """Removes the counter for `key`."""
+        with self._lock:
+            self._connection().execute("DELETE FROM limits WHERE key = ?", (key,))
+            self._connection().execute("DELETE FROM arrivals WHERE key = ?", (key,))
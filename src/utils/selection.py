@@ -0,0 +1,210 @@
+import re
+import numpy as np
+from typing import Callable, List, NamedTuple, Optional, Sequence, Set
+
+from src.configs.settings import settings
+from src.models.kendra_answer import KendraAnswer
+
+# Word pieces and single punctuation marks, roughly how BPE tokenizers split English text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"\w+")
+
+# MinHash over 3-word shingles, 31-bit universal hashing so products fit in uint64
+_SHINGLE_SIZE = 3
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def _approximate_token_count(text: str) -> int:
+    """Counts word pieces, with one token per ~4 characters of long words like BPE does."""
+    pieces = _TOKEN_PATTERN.findall(text)
+    return len(pieces) + sum(len(piece) // 4 - 1 for piece in pieces if len(piece) >= 8)
+
+
+def get_token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Returns a local token counter. Uses `tiktoken` when it is installed and its
+    encoding is available offline, otherwise a word-piece approximation.
+
+    Args:
+        model (Optional[str]): Model name used to pick the tiktoken encoding.
+
+    Returns:
+        Callable[[str], int]: Function returning the token count of a string.
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return _approximate_token_count
+
+
+def _truncate_to_tokens(text: str, budget: int, count_tokens: Callable[[str], int]) -> str:
+    """
+    Returns the longest word-boundary prefix of `text` within `budget` tokens of `count_tokens`.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    ends = [match.end() for match in re.finditer(r"\S+", text)]
+    low, high = 0, len(ends)  # ends[:low] fit, ends[high:] do not
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:ends[middle - 1]]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:ends[low - 1]] if low else ""
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_PATTERN.findall(text.casefold())
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles; the fraction of equal signature
+    slots estimates the Jaccard similarity of two excerpts.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, words: List[str]) -> np.ndarray:
+        """
+        Args:
+            words (List[str]): The casefolded words of the excerpt.
+
+        Returns:
+            np.ndarray: `num_perm` minimum hash values.
+        """
+        # Signatures are only compared within one process, so the builtin (salted) hash is fine
+        if len(words) <= _SHINGLE_SIZE:
+            shingles = {hash(tuple(words)) & 0x7FFFFFFF}
+        else:
+            shingles = {hash(shingle) & 0x7FFFFFFF for shingle in zip(words, words[1:], words[2:])}
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.count_nonzero(first == second)) / len(first)
+
+
+class Selection(NamedTuple):
+    """
+    The answers chosen for the consensus prompt and what was left out.
+    """
+    answers: List[KendraAnswer]
+    candidate_tokens: int
+    selected_tokens: int
+    duplicates: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.candidate_tokens - self.selected_tokens
+
+
+class AnswerSelector:
+    """
+    Chooses which Kendra answers are sent to consensus: ranks them by confidence
+    weight and lexical overlap with the query, drops near-duplicate excerpts
+    (MinHash) and greedily packs the best ones into a token budget. The
+    top-ranked answer is always kept, cut to the budget if it exceeds it.
+    Selected answers keep their original Kendra order.
+    """
+
+    # Const
+    MAX_WEIGHT = 10
+
+    def __init__(self, count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            count_tokens (Optional[Callable[[str], int]]): Token counter; a local one for the
+                configured model when omitted.
+        """
+        self.enabled = settings.get_selection_enabled()
+        self.token_budget = settings.get_selection_token_budget()
+        self.top_k = settings.get_selection_top_k()
+        self.overlap_weight = settings.get_selection_overlap_weight()
+        self.duplicate_threshold = settings.get_selection_duplicate_threshold()
+        self._count_tokens = count_tokens
+        self.hasher = MinHasher()
+
+    @property
+    def count_tokens(self) -> Callable[[str], int]:
+        """The token counter, resolved on first use (loading a tiktoken encoding is slow)."""
+        if self._count_tokens is None:
+            self._count_tokens = get_token_counter(settings.get_open_ai_model())
+        return self._count_tokens
+
+    def score(self, answer: KendraAnswer, words: List[str], query_terms: Set[str]) -> float:
+        """
+        Blends the normalized confidence weight with the share of query terms found in the excerpt.
+
+        Args:
+            answer (KendraAnswer): The candidate.
+            words (List[str]): The candidate's casefolded words.
+            query_terms (Set[str]): Casefolded query words.
+
+        Returns:
+            float: Score in [0, 1].
+        """
+        confidence = min(answer.confidence, self.MAX_WEIGHT) / self.MAX_WEIGHT
+        overlap = len(query_terms.intersection(words)) / len(query_terms) if query_terms else 0.0
+        return (1 - self.overlap_weight) * confidence + self.overlap_weight * overlap
+
+    def select(self, query: str, answers: Sequence[KendraAnswer]) -> Selection:
+        """
+        Args:
+            query (str): The user's query.
+            answers (Sequence[KendraAnswer]): Extracted answers in Kendra order.
+
+        Returns:
+            Selection: The chosen answers and token accounting.
+        """
+        count_tokens = self.count_tokens
+        tokens = [count_tokens(answer.text) for answer in answers]
+        candidate_tokens = sum(tokens)
+        if not self.enabled or (len(answers) <= 1 and candidate_tokens <= self.token_budget):
+            return Selection(list(answers), candidate_tokens, candidate_tokens, 0)
+
+        query_terms = set(_words(query))
+        words = [_words(answer.text) for answer in answers]
+        scores = [self.score(answer, answer_words, query_terms) for answer, answer_words in zip(answers, words)]
+        ranked = sorted(range(len(answers)), key=scores.__getitem__, reverse=True)
+
+        kept: List[int] = []
+        signatures: List[np.ndarray] = []
+        used = 0
+        duplicates = 0
+        selected = list(answers)
+        for index in ranked:
+            if len(kept) >= self.top_k:
+                break
+            if used + tokens[index] > self.token_budget:
+                if kept:
+                    continue  # a shorter, lower-ranked excerpt may still fit
+                # The top-ranked answer is always sent, cut to the budget
+                text = _truncate_to_tokens(answers[index].text, self.token_budget, count_tokens)
+                selected[index] = answers[index]._replace(text=text)
+                tokens[index] = count_tokens(text)
+            signature = self.hasher.signature(words[index])
+            if any(self.hasher.similarity(signature, other) >= self.duplicate_threshold for other in signatures):
+                duplicates += 1
+                continue
+            kept.append(index)
+            signatures.append(signature)
+            used += tokens[index]
+
+        kept.sort()
+        return Selection([selected[i] for i in kept], candidate_tokens, used, duplicates)
+
+
+# Global instance used between Kendra extraction and consensus
+answer_selector = AnswerSelector()
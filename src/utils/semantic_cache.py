@@ -0,0 +1,495 @@
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.configs.settings import settings
+from src.models.chatbot_response import ChatbotResponse
+from src.utils.cache import LRUCache, normalize_query
+from src.utils.logger import csv_logger
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder based on the hashing trick over words and character
+    trigrams. Needs no network access, so it is used for tests and offline runs.
+    """
+
+    def __init__(self, dim: int = 512):
+        """
+        Args:
+            dim (int): Size of the produced vectors.
+        """
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = normalize_query(text).split()
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embeds texts into L2-normalized vectors.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            Optional[np.ndarray]: A (len(texts), dim) float32 matrix.
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                matrix[row, (value >> 1) % self.dim] += sign
+        return _normalize_rows(matrix)
+
+    async def embed_async(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Async variant of `embed`; the work is local and cheap."""
+        return self.embed(texts)
+
+
+class OpenAIEmbedder:
+    """
+    Embedder backed by the OpenAI embeddings endpoint.
+    """
+
+    def embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embeds texts into L2-normalized vectors.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            Optional[np.ndarray]: A (len(texts), dim) float32 matrix, or None if the call fails.
+        """
+        from src.services.openai import OpenAI
+
+        vectors = OpenAI.get_instance().get_embeddings(texts)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else None
+
+    async def embed_async(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Async variant of `embed`."""
+        from src.services.openai import OpenAI
+
+        vectors = await OpenAI.get_instance().get_embeddings_async(texts)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scales every row to unit length so dot products are cosine similarities.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class VectorIndex:
+    """
+    In-memory nearest-neighbour index over unit vectors stored in one NumPy matrix.
+
+    Lookups are a single batched dot product. Past `ivf_threshold` entries an IVF
+    (inverted file) structure is trained with k-means so only `nprobe` lists are scanned.
+    Full slots are reused by evicting the least recently used entry.
+    """
+
+    # Const
+    IVF_TRAIN_ITERATIONS = 8
+
+    def __init__(self, dim: int, max_entries: int, ivf_threshold: int = 20000, nprobe: int = 8):
+        """
+        Args:
+            dim (int): Vector size.
+            max_entries (int): Capacity before LRU eviction.
+            ivf_threshold (int): Entry count above which the IVF structure is used.
+            nprobe (int): IVF lists scanned per lookup.
+        """
+        self.dim = dim
+        self.max_entries = max_entries
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._reset(capacity=min(max_entries, 1024))
+
+    def _reset(self, capacity: int) -> None:
+        self._vectors = np.zeros((max(capacity, 1), self.dim), dtype=np.float32)
+        self._last_used = np.zeros(max(capacity, 1), dtype=np.float64)
+        # Wall-clock insert time per slot; +inf for free slots, so they never count as expired
+        self._created = np.full(max(capacity, 1), np.inf, dtype=np.float64)
+        self._keys: List[Optional[str]] = []
+        self._payloads: List[Any] = []
+        self._free: List[int] = []
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size - len(self._free)
+
+    def _grow(self) -> None:
+        capacity = min(self.max_entries, self._vectors.shape[0] * 2)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        last_used = np.zeros(capacity, dtype=np.float64)
+        last_used[:self._size] = self._last_used[:self._size]
+        created = np.full(capacity, np.inf, dtype=np.float64)
+        created[:self._size] = self._created[:self._size]
+        self._vectors, self._last_used, self._created = vectors, last_used, created
+        if self._assignments is not None:
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            assignments[:self._size] = self._assignments[:self._size]
+            self._assignments = assignments
+
+    def add(self, vector: np.ndarray, key: str, payload: Any) -> int:
+        """
+        Inserts a unit vector with its payload.
+
+        Args:
+            vector (np.ndarray): The (dim,) unit vector.
+            key (str): The text the vector was computed from.
+            payload (Any): The value returned on a match.
+
+        Returns:
+            int: The slot the entry was stored in.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._free:
+                slot = self._free.pop()
+            elif self._size < self.max_entries:
+                if self._size == self._vectors.shape[0]:
+                    self._grow()
+                slot = self._size
+                self._size += 1
+                self._keys.append(None)
+                self._payloads.append(None)
+            else:
+                slot = int(np.argmin(self._last_used[:self._size]))
+
+            self._vectors[slot] = vector
+            self._last_used[slot] = now
+            self._keys[slot] = key
+            self._payloads[slot] = payload
+            self._created[slot] = time.time()
+
+            if self._centroids is not None:
+                self._assignments[slot] = int(np.argmax(self._centroids @ vector))
+            if len(self) >= self.ivf_threshold and len(self) >= 2 * self._trained_size:
+                self._train_ivf()
+            return slot
+
+    def remove(self, slot: int) -> None:
+        """
+        Frees a slot; its zero vector can never match a positive threshold.
+        """
+        with self._lock:
+            self._remove(slot)
+
+    def _remove(self, slot: int) -> None:
+        if self._keys[slot] is None:
+            return
+        self._vectors[slot] = 0.0
+        self._last_used[slot] = 0.0
+        self._keys[slot] = None
+        self._payloads[slot] = None
+        self._created[slot] = np.inf
+        self._free.append(slot)
+        if self._assignments is not None:
+            self._assignments[slot] = -1
+
+    def _train_ivf(self) -> None:
+        """
+        Clusters the live vectors with spherical k-means into sqrt(n) lists.
+        """
+        live = np.array([i for i in range(self._size) if self._keys[i] is not None], dtype=np.int64)
+        nlist = max(int(np.sqrt(len(live))), 1)
+        rng = np.random.default_rng(0)
+        centroids = self._vectors[rng.choice(live, size=nlist, replace=False)].copy()
+        data = self._vectors[live]
+        for _ in range(self.IVF_TRAIN_ITERATIONS):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            centroids = np.where(np.linalg.norm(sums, axis=1, keepdims=True) > 0, sums, centroids)
+            centroids = _normalize_rows(centroids)
+
+        assignments = np.full(self._vectors.shape[0], -1, dtype=np.int32)
+        assignments[live] = np.argmax(data @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._assignments = assignments
+        self._trained_size = len(live)
+
+    def search(self, vector: np.ndarray, ttl: Optional[float] = None) -> Optional[Tuple[int, float, str, Any]]:
+        """
+        Finds the most similar stored vector that has not expired. Expired entries
+        seen by the scan are removed while the lock is held.
+
+        Args:
+            vector (np.ndarray): The (dim,) unit query vector.
+            ttl (Optional[float]): Maximum entry age in seconds; no expiry when omitted.
+
+        Returns:
+            Optional[Tuple[int, float, str, Any]]: (slot, cosine score, key, payload), or None if empty.
+        """
+        with self._lock:
+            if len(self) == 0:
+                return None
+            if self._centroids is not None:
+                probes = np.argsort(self._centroids @ vector)[-self.nprobe:]
+                slots = np.nonzero(np.isin(self._assignments[:self._size], probes))[0]
+                if len(slots) == 0:
+                    return None
+                scores = self._vectors[slots] @ vector
+                created = self._created[slots]
+            else:
+                slots = None
+                scores = self._vectors[:self._size] @ vector
+                created = self._created[:self._size]
+            if ttl is not None:
+                fresh = created >= time.time() - ttl
+                if not fresh.all():
+                    expired = np.nonzero(~fresh)[0]
+                    for slot in (expired if slots is None else slots[expired]):
+                        self._remove(int(slot))
+                    scores = np.where(fresh, scores, -np.inf)
+            best = int(np.argmax(scores))
+            slot = best if slots is None else int(slots[best])
+            score = float(scores[best])
+            if score == -np.inf or self._keys[slot] is None:
+                return None
+            self._last_used[slot] = time.monotonic()
+            return slot, score, self._keys[slot], self._payloads[slot]
+
+    def created_at(self, slot: int) -> float:
+        """Returns the wall-clock time an entry was stored."""
+        return float(self._created[slot])
+
+    def save(self, path: str) -> None:
+        """
+        Snapshots the vectors to `path` (.npy) and keys/payloads to `path + '.json'`.
+        Payloads must be JSON serializable.
+        """
+        with self._lock:
+            live = [i for i in range(self._size) if self._keys[i] is not None]
+            np.save(path, self._vectors[live])
+            meta = [
+                {"key": self._keys[i], "payload": self._payloads[i], "created": float(self._created[i])}
+                for i in live
+            ]
+        with open(path + ".json", "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+
+    def load(self, path: str) -> None:
+        """
+        Restores a snapshot written by `save`, replacing the current contents.
+        """
+        vectors = np.load(path)
+        with open(path + ".json", "r", encoding="utf-8") as handle:
+            meta = json.load(handle)
+        with self._lock:
+            self._reset(capacity=min(self.max_entries, max(len(meta), 1024)))
+        for vector, entry in zip(vectors[-self.max_entries:], meta[-self.max_entries:]):
+            slot = self.add(vector, entry["key"], entry["payload"])
+            with self._lock:
+                self._created[slot] = entry["created"]
+
+
+class SemanticCache:
+    """
+    Serves the answer of the most similar previously answered query when the
+    cosine similarity of their embeddings is above a threshold.
+    """
+
+    # Const
+    RECENT_EMBEDDINGS = 1024
+    RECENT_EMBEDDINGS_TTL = 300
+
+    def __init__(self, embedder: Optional[Any] = None, index: Optional[VectorIndex] = None):
+        """
+        Args:
+            embedder (Optional[Any]): Object with `embed` / `embed_async`; built from settings when omitted.
+            index (Optional[VectorIndex]): Vector index; built from settings when omitted.
+        """
+        self.enabled = settings.get_semantic_cache_enabled()
+        self.threshold = settings.get_semantic_cache_threshold()
+        self.ttl = settings.get_semantic_cache_ttl()
+        self.embedder = embedder if embedder is not None else self._build_embedder()
+        self.index = index
+        # Embeddings computed on a miss are reused when the answer is stored
+        self._recent = LRUCache(max_entries=self.RECENT_EMBEDDINGS, ttl=self.RECENT_EMBEDDINGS_TTL)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self.max_lookup_seconds = 0.0
+
+    @staticmethod
+    def _build_embedder() -> Any:
+        if settings.get_semantic_cache_embedder() == "hashing":
+            return HashingEmbedder(dim=settings.get_semantic_cache_dim())
+        return OpenAIEmbedder()
+
+    def _get_index(self, dim: int) -> VectorIndex:
+        if self.index is None:
+            self.index = VectorIndex(
+                dim=dim,
+                max_entries=settings.get_semantic_cache_max_entries(),
+                ivf_threshold=settings.get_semantic_cache_ivf_threshold(),
+                nprobe=settings.get_semantic_cache_ivf_nprobe(),
+            )
+        return self.index
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        key = normalize_query(query)
+        vectors = self._recent.get(key)
+        if vectors is None:
+            vectors = self.embedder.embed([query])
+            if vectors is not None:
+                self._recent.set(key, vectors)
+        return vectors
+
+    async def _embed_async(self, query: str) -> Optional[np.ndarray]:
+        key = normalize_query(query)
+        vectors = self._recent.get(key)
+        if vectors is None:
+            vectors = await self.embedder.embed_async([query])
+            if vectors is not None:
+                self._recent.set(key, vectors)
+        return vectors
+
+    def _lookup(self, vectors: Optional[np.ndarray], started: float) -> Optional[List[ChatbotResponse]]:
+        result = None
+        if vectors is not None and len(vectors):
+            match = self._get_index(vectors.shape[1]).search(vectors[0], ttl=self.ttl)
+            if match is not None:
+                _, score, _, payload = match
+                if score >= self.threshold:
+                    result = [ChatbotResponse(**item) for item in payload]
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.lookup_seconds += elapsed
+            self.max_lookup_seconds = max(self.max_lookup_seconds, elapsed)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def get(self, query: str) -> Optional[List[ChatbotResponse]]:
+        """
+        Returns the answer of the nearest cached query above the threshold.
+
+        Args:
+            query (str): The raw user query.
+
+        Returns:
+            Optional[List[ChatbotResponse]]: The cached responses, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        return self._lookup(self._embed(query), started)
+
+    async def get_async(self, query: str) -> Optional[List[ChatbotResponse]]:
+        """
+        Async variant of `get`.
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        return self._lookup(await self._embed_async(query), started)
+
+    def _store(self, query: str, vectors: Optional[np.ndarray], responses: List[ChatbotResponse]) -> None:
+        if vectors is None or not len(vectors):
+            return
+        payload = [item.model_dump() for item in responses]
+        self._get_index(vectors.shape[1]).add(vectors[0], query, payload)
+
+    def set(self, query: str, responses: List[ChatbotResponse]) -> None:
+        """
+        Indexes a query and its answer. Empty results are not cached.
+
+        Args:
+            query (str): The raw user query.
+            responses (List[ChatbotResponse]): The responses to cache.
+        """
+        if not self.enabled or not responses:
+            return
+        self._store(query, self._embed(query), responses)
+
+    async def set_async(self, query: str, responses: List[ChatbotResponse]) -> None:
+        """
+        Async variant of `set`.
+        """
+        if not self.enabled or not responses:
+            return
+        self._store(query, await self._embed_async(query), responses)
+
+    def snapshot(self, path: str) -> None:
+        """
+        Saves the index to an .npy snapshot (plus a JSON sidecar for the answers).
+        """
+        if self.index is not None and len(self.index):
+            self.index.save(path)
+
+    def restore(self, path: str) -> None:
+        """
+        Loads an .npy snapshot written by `snapshot`.
+        """
+        try:
+            vectors = np.load(path, mmap_mode="r")
+            index = self._get_index(vectors.shape[1])
+            index.load(path)
+        except FileNotFoundError:
+            return
+        except Exception as ex:
+            csv_logger.log("ERROR", "Failed to restore semantic cache from %s", path, exception=ex)
+
+    def clear(self) -> None:
+        """
+        Drops the index and resets the counters.
+        """
+        self.index = None
+        self._recent.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """
+        Resets the counters.
+        """
+        with self._stats_lock:
+            self.hits = self.misses = 0
+            self.lookup_seconds = self.max_lookup_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns hit rate and lookup latency.
+
+        Returns:
+            Dict[str, float]: Semantic cache statistics.
+        """
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_lookup_ms": 1000 * self.lookup_seconds / lookups if lookups else 0.0,
+                "max_lookup_ms": 1000 * self.max_lookup_seconds,
+                "size": len(self.index) if self.index is not None else 0,
+            }
+
+
+# Global instance
+semantic_cache = SemanticCache()
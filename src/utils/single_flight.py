@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """
+    An in-flight computation shared by every thread asking for the same key.
+    """
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncCall:
+    """
+    An in-flight task shared by every coroutine asking for the same key.
+    """
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls for the same key: the first caller (the leader)
+    runs the computation and every concurrent caller receives its result or error.
+
+    Works for threadpool callers (`do`) and asyncio callers (`do_async`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Tuple[int, Hashable], _AsyncCall] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Runs `fn` once for all concurrent callers with the same key.
+
+        Args:
+            key (Hashable): Identifies equivalent requests.
+            fn (Callable[[], Any]): The computation to share.
+
+        Returns:
+            Any: The leader's result. The leader's exception is re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Awaits `fn()` once for all concurrent tasks with the same key on this event loop.
+
+        The computation runs in its own task: a cancelled caller (leader or follower)
+        only stops waiting, and the task is cancelled once no caller is left.
+
+        Args:
+            key (Hashable): Identifies equivalent requests.
+            fn (Callable[[], Awaitable[Any]]): Factory for the coroutine to share.
+
+        Returns:
+            Any: The shared result. The computation's exception is re-raised in every caller.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            call = self._futures.get(flight_key)
+            if call is None:
+                call = _AsyncCall(loop.create_task(self._lead(flight_key, fn)))
+                self._futures[flight_key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+
+        try:
+            # Shield so a cancelled caller does not cancel the shared computation
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0
+            if abandoned and not call.task.done():
+                call.task.cancel()
+
+    async def _lead(self, flight_key: Tuple[int, Hashable], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs the shared computation, forgetting the key as soon as it finishes.
+        """
+        try:
+            return await fn()
+        finally:
+            with self._lock:
+                self._futures.pop(flight_key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns how many computations ran and how many requests were coalesced.
+
+        Returns:
+            Dict[str, int]: Single-flight statistics.
+        """
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._futures),
+            }
+
+    def reset_stats(self) -> None:
+        """
+        Resets the counters.
+        """
+        with self._lock:
+            self.executions = 0
+            self.coalesced = 0
+
+
+# Global instance used around the chatbot pipeline
+response_flight = SingleFlight()
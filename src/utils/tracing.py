@@ -0,0 +1,418 @@
+"""
+Request-scoped tracing with OpenTelemetry-compatible spans.
+
+A sampled request gets a root span (started by the HTTP middleware, continuing
+a W3C `traceparent` header when the caller sends one). Every `timed` block of
+the request then also records a child span, so Kendra and OpenAI calls and the
+processing stages show up without extra instrumentation. The current span lives
+in a context variable, which follows the request into tasks and into the
+executor threads started with `contextvars.copy_context()`.
+
+Finished traces are handed to a `SpanExporter`: `InMemoryExporter` for tests,
+`OTLPFileExporter` for OTLP/JSON lines in a file or on stdout. Unsampled
+requests create no spans; a `timed` block only pays one context variable read.
+"""
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import threading
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.configs.settings import settings
+
+
+class Span:
+    """
+    One timed operation of a trace. Serializes to the OTLP/JSON span layout.
+    """
+
+    # Const (OTLP SpanKind / StatusCode values)
+    INTERNAL, SERVER, CLIENT = 1, 2, 3
+    STATUS_OK, STATUS_ERROR = 1, 2
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status",
+        "status_message", "trace",
+    )
+
+    def __init__(self, name: str, trace: "_Trace", parent_id: Optional[str], kind: int = INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace = trace
+        self.trace_id = trace.trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status = self.STATUS_OK
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        """Returns the W3C `traceparent` header value identifying this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Sets one attribute (str, bool, int, float or a list of them)."""
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        """Sets several attributes; None values are skipped."""
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        """Marks the span as failed."""
+        self.status, self.status_message = self.STATUS_ERROR, message
+
+    def end(self) -> None:
+        """Ends the span and hands it to its trace."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.finish(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Returns the span in the OTLP/JSON encoding."""
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status_message
+            else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+class _Trace:
+    """
+    Spans of one trace in this process; exported together when the local root ends.
+    Spans ending after that (e.g. an abandoned hedge) are exported on their own.
+    """
+
+    __slots__ = ("tracer", "trace_id", "root", "spans", "lock")
+
+    def __init__(self, tracer: "Tracer", trace_id: str):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.root: Optional[Span] = None
+        self.spans: Optional[List[Span]] = []
+        self.lock = threading.Lock()
+
+    def finish(self, span: Span) -> None:
+        with self.lock:
+            if self.spans is not None:
+                self.spans.append(span)
+                if span is not self.root:
+                    return
+                spans, self.spans = self.spans, None
+            else:
+                spans = [span]
+        self.tracer.export(spans)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Returns the span of the current context, if the request is traced."""
+    return _current.get()
+
+
+class _Scope:
+    """
+    Makes a span current for the `with` block and ends it on exit, recording the
+    exception type of a failing block. The previous span is restored by
+    assignment, so a scope may also span the yields of an async generator.
+    """
+
+    __slots__ = ("span", "previous")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.previous: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.previous = _current.get()
+        _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.span.set_error(exc_type.__name__)
+        _current.set(self.previous)
+        self.span.end()
+
+
+class _NoopScope:
+    """Scope of an untraced block: yields None and records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP = _NoopScope()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parses a W3C `traceparent` header.
+
+    Returns:
+        Optional[Tuple[str, str, bool]]: Trace ID, parent span ID and the sampled flag, or None if invalid.
+    """
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2 or parts[0] == "ff":
+        return None
+    try:
+        trace_id, parent_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    if not trace_id or not parent_id:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class SpanExporter(ABC):
+    """
+    Receives finished spans, one local trace per call.
+    """
+
+    @abstractmethod
+    def export(self, spans: Sequence[Span]) -> None:
+        """Exports finished spans. Called on the request path, so it must not block on I/O."""
+
+    def shutdown(self) -> None:
+        """Flushes and releases resources."""
+
+
+class InMemoryExporter(SpanExporter):
+    """
+    Keeps finished spans in memory, for tests.
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        with self.lock:
+            self.spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        """Returns the spans exported so far, in the order they ended."""
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.spans.clear()
+
+
+class OTLPFileExporter(SpanExporter):
+    """
+    Appends each exported trace as one OTLP/JSON `{"resourceSpans": [...]}` line
+    (the OpenTelemetry Collector file exporter layout) to a file, or to stdout
+    when `path` is "-". Lines are written by a background thread.
+    """
+
+    def __init__(self, path: str, service_name: Optional[str] = None):
+        """
+        Args:
+            path (str): Output file, or "-" for stdout.
+            service_name (Optional[str]): `service.name` resource attribute; `settings.get_tracing_service_name()` when omitted.
+        """
+        self.path = path
+        self.service_name = service_name or settings.get_tracing_service_name()
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # Guards starting/stopping the writer thread, never held while writing
+        self.lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self._ensure_writer()
+        self._queue.put(list(spans))
+
+    def encode(self, spans: Sequence[Span]) -> str:
+        """Returns one OTLP/JSON line for `spans`."""
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "docuchat"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }, separators=(",", ":"))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every trace exported before this call is written.
+
+        Returns:
+            bool: True if the queue was drained within the timeout.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self) -> None:
+        with self.lock:
+            thread = self._thread
+            self._thread = None
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def _ensure_writer(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self.lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Writer loop: appends each trace as a line, flushing whenever the queue is empty.
+        """
+        handle = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                if handle is None:
+                    handle = sys.stdout if self.path == "-" else open(self.path, mode="a", encoding="utf-8")
+                handle.write(self.encode(item) + "\n")
+                if self._queue.empty():
+                    handle.flush()
+            except Exception as e:
+                # Imported here: metrics itself imports this module
+                from src.utils.metrics import ERRORS
+                ERRORS.inc("tracing")
+                print(f"Failed to export {len(item)} spans: {e}", file=sys.stderr)
+        if handle is not None and handle is not sys.stdout:
+            handle.close()
+
+
+def build_exporter(name: str, path: str) -> Optional[SpanExporter]:
+    """
+    Returns the exporter configured by TRACING_EXPORTER ('otlp-file', 'stdout', 'memory' or 'none').
+    """
+    if name == "otlp-file":
+        return OTLPFileExporter(path)
+    if name == "stdout":
+        return OTLPFileExporter("-")
+    if name == "memory":
+        return InMemoryExporter()
+    return None
+
+
+class Tracer:
+    """
+    Starts traces with head sampling and child spans within them.
+
+    Usage:
+        with tracer.start_trace("POST /chatbot", request.headers.get("traceparent")) as root:
+            with tracer.span("kendra", Span.CLIENT) as span:
+                ...
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                 exporter: Optional[SpanExporter] = None):
+        """
+        Args:
+            enabled (Optional[bool]): When False no trace is ever started.
+            sample_rate (Optional[float]): Fraction of new traces recorded (callers' sampled flag wins).
+            exporter (Optional[SpanExporter]): Receives finished traces; built from settings when omitted.
+        """
+        self.enabled = enabled if enabled is not None else settings.get_tracing_enabled()
+        self.sample_rate = sample_rate if sample_rate is not None else settings.get_tracing_sample_rate()
+        if exporter is None and self.enabled:
+            exporter = build_exporter(settings.get_tracing_exporter(), settings.get_tracing_otlp_path())
+        self.exporter = exporter
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, kind: int = Span.SERVER,
+                    attributes: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Starts the root span of a request, continuing the caller's trace when
+        `traceparent` is valid. Unsampled requests get a scope yielding None.
+
+        Returns:
+            Any: A context manager yielding the root `Span`, or None when not traced.
+        """
+        if not self.enabled or self.exporter is None:
+            return _NOOP
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+                return _NOOP
+            trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, True
+        if not sampled:
+            return _NOOP
+        trace = _Trace(self, trace_id)
+        trace.root = Span(name, trace, parent_id, kind, attributes)
+        return _Scope(trace.root)
+
+    def span(self, name: str, kind: int = Span.INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Starts a child of the current span; a scope yielding None when the context is not traced.
+        """
+        parent = _current.get()
+        if parent is None:
+            return _NOOP
+        return _Scope(Span(name, parent.trace, parent.span_id, kind, attributes))
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Hands finished spans to the exporter."""
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+    def shutdown(self) -> None:
+        """Flushes the exporter. Called from the API shutdown hook."""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+# Global instance
+tracer = Tracer()
@@ -0,0 +1,267 @@
+"""
+Cache warm-up from query history.
+
+On startup the most frequent recent queries are replayed through
+`get_response_from_bot_async`, so the response cache (and, with a shared tier,
+every other worker) already holds them when traffic arrives. `GET /ready`
+answers 503 until the replay finishes, letting the load balancer hold traffic
+meanwhile. The same queries are then recomputed every WARMUP_REFRESH_INTERVAL,
+before their cache entries expire.
+
+History comes from the interaction store or, when it has none, from the
+"Processing query: ..." records of the log files.
+"""
+import os
+import glob
+import time
+import asyncio
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.main import get_response_from_bot_async
+from src.utils.cache import ResponseCache
+from src.utils.interaction_store import interaction_store
+from src.utils.logger import csv_logger, read_records
+from src.configs.settings import settings
+
+# (query, timestamp, count): `count` occurrences of a query at about `timestamp`
+HistoryEntry = Tuple[str, float, int]
+
+# Message prefix logged by the /chatbot endpoint
+LOG_PREFIX = "Processing query: "
+
+
+def history_from_store(path: str, since: float) -> List[HistoryEntry]:
+    """
+    Reads answered queries from the interaction store, grouped per query and hour.
+    Warm-up replays and unanswered queries (never cached) are left out.
+
+    Args:
+        path (str): Interaction store file.
+        since (float): Oldest epoch timestamp to read.
+
+    Returns:
+        List[HistoryEntry]: One entry per query and hour; empty if there is no store yet.
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    except sqlite3.Error:
+        return []
+    try:
+        return conn.execute(
+            "SELECT MAX(query), AVG(ts), COUNT(*) FROM interactions "
+            "WHERE ts >= ? AND source != 'warmup' AND error IS NULL AND answer_count > 0 "
+            "GROUP BY query_hash, CAST(ts / 3600 AS INTEGER)",
+            (since,),
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def history_from_logs(log_dir: str, since: float, suffix: Optional[str] = None) -> List[HistoryEntry]:
+    """
+    Reads queries from the "Processing query: ..." records of the daily log files
+    (CSV or JSON lines, every size-rotation part).
+
+    Args:
+        log_dir (str): Directory of the `CsvLogger` day files.
+        since (float): Oldest epoch timestamp to read.
+        suffix (Optional[str]): Day file suffix; `settings.get_log_filename_suffix()` when omitted.
+
+    Returns:
+        List[HistoryEntry]: One entry per logged query.
+    """
+    suffix = suffix or settings.get_log_filename_suffix()
+    first_day = datetime.fromtimestamp(since).strftime("%Y-%m-%d")
+    history: List[HistoryEntry] = []
+    for path in sorted(glob.glob(os.path.join(log_dir, f"*_{suffix}"))):
+        # Day files are named <YYYY-MM-DD>[.<part>]_<suffix>
+        if os.path.basename(path)[:10] < first_day:
+            continue
+        try:
+            for record in read_records(path):
+                message = record.get("message") or ""
+                if not message.startswith(LOG_PREFIX):
+                    continue
+                try:
+                    timestamp = datetime.fromisoformat(record["timestamp"]).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if timestamp >= since:
+                    history.append((message[len(LOG_PREFIX):], timestamp, 1))
+        except OSError as ex:
+            csv_logger.log("ERROR", "Failed to read query history from %s", path, exception=ex)
+    return history
+
+
+def rank_queries(history: Iterable[HistoryEntry], now: float, half_life: float, top_n: int) -> List[str]:
+    """
+    Ranks queries by recency-weighted frequency: each occurrence counts
+    0.5 ** (age / half_life). Spellings of the same normalized query are merged,
+    keeping the most recent one.
+
+    Args:
+        history (Iterable[HistoryEntry]): Past occurrences.
+        now (float): Current epoch timestamp.
+        half_life (float): Age in seconds at which an occurrence counts half.
+        top_n (int): Number of queries to return.
+
+    Returns:
+        List[str]: Up to `top_n` queries, highest score first.
+    """
+    scores: Dict[str, float] = {}
+    latest: Dict[str, Tuple[float, str]] = {}
+    for query, timestamp, count in history:
+        key = ResponseCache.make_key(query)
+        if not key:
+            continue
+        scores[key] = scores.get(key, 0.0) + count * 0.5 ** (max(0.0, now - timestamp) / half_life)
+        if key not in latest or timestamp > latest[key][0]:
+            latest[key] = (timestamp, query)
+    ranked = sorted(scores, key=lambda key: (-scores[key], key))
+    return [latest[key][1] for key in ranked[:top_n]]
+
+
+class CacheWarmer:
+    """
+    Replays the top queries on startup and refreshes them periodically.
+    Reports readiness for `GET /ready`.
+    """
+
+    # Const
+    STARTING, WARMING, READY = "starting", "warming", "ready"
+
+    def __init__(self, enabled: Optional[bool] = None, top_n: Optional[int] = None,
+                 concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 refresh_interval: Optional[float] = None, source: Optional[str] = None):
+        """
+        Args:
+            enabled (Optional[bool]): When False the worker is ready immediately.
+            top_n (Optional[int]): Number of queries replayed.
+            concurrency (Optional[int]): Queries replayed at once.
+            timeout (Optional[float]): Seconds after which the worker reports ready anyway.
+            refresh_interval (Optional[float]): Seconds between refreshes; 0 disables them.
+            source (Optional[str]): History source, "auto", "store" or "logs".
+
+        Omitted values come from the WARMUP_* settings.
+        """
+        self.enabled = enabled if enabled is not None else settings.get_warmup_enabled()
+        self.top_n = top_n if top_n is not None else settings.get_warmup_top_n()
+        self.concurrency = max(1, concurrency if concurrency is not None else settings.get_warmup_concurrency())
+        self.timeout = timeout if timeout is not None else settings.get_warmup_timeout()
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else settings.get_warmup_refresh_interval()
+        )
+        self.source = source or settings.get_warmup_source()
+        self.state = self.STARTING if self.enabled else self.READY
+        self.total = 0
+        self.warmed = 0
+        self.failed = 0
+        self.refreshes = 0
+        self.duration: Optional[float] = None
+
+    def load_queries(self, now: Optional[float] = None) -> List[str]:
+        """
+        Returns the queries to warm, ranked by recency-weighted frequency over
+        the last WARMUP_LOOKBACK_DAYS. Blocking; run it in a thread.
+        """
+        now = time.time() if now is None else now
+        since = now - settings.get_warmup_lookback_days() * 86400
+        history: List[HistoryEntry] = []
+        if self.source in ("auto", "store"):
+            history = history_from_store(interaction_store.path, since)
+        if self.source == "logs" or (self.source == "auto" and not history):
+            history = history_from_logs(settings.get_log_dir(), since)
+        return rank_queries(history, now, settings.get_warmup_half_life_hours() * 3600, self.top_n)
+
+    async def replay(self, queries: List[str], refresh: bool = False) -> None:
+        """
+        Answers `queries` at most `concurrency` at a time. The initial warm-up
+        counts queries that were cached and failures as progress (queries without
+        an answer are not cached); refreshes only log failures.
+
+        Args:
+            queries (List[str]): Queries to answer.
+            refresh (bool): Recompute instead of reading the cache.
+        """
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def answer(query: str) -> None:
+            async with limit:
+                try:
+                    results = await get_response_from_bot_async(query, source="warmup", refresh=refresh)
+                except Exception as ex:
+                    if not refresh:
+                        self.failed += 1
+                    csv_logger.log("WARNING", "Cache warm-up failed for query: %s (%s)", query, type(ex).__name__)
+                    return
+                if not refresh and results:
+                    self.warmed += 1
+
+        await asyncio.gather(*(answer(query) for query in queries))
+
+    async def warm_up(self) -> None:
+        """
+        Replays the top queries once and marks the worker ready, at the latest after `timeout` seconds.
+        """
+        if not self.enabled:
+            self.state = self.READY
+            return
+        self.state = self.WARMING
+        start = time.perf_counter()
+        try:
+            queries = await asyncio.to_thread(self.load_queries)
+            self.total, self.warmed, self.failed = len(queries), 0, 0
+            await asyncio.wait_for(self.replay(queries), self.timeout)
+        except asyncio.TimeoutError:
+            csv_logger.log("WARNING", "Cache warm-up timed out after %ss", self.timeout)
+        except Exception as ex:
+            csv_logger.log("ERROR", "Exception in CacheWarmer.warm_up()", exception=ex)
+        self.duration = time.perf_counter() - start
+        self.state = self.READY
+        csv_logger.log(
+            "INFO",
+            "Cache warm-up finished: %d/%d queries warmed, %d failed in %.1fs",
+            self.warmed, self.total, self.failed, self.duration,
+        )
+
+    async def run(self) -> None:
+        """
+        Warms up, then refreshes the top queries every `refresh_interval` seconds.
+        Started as a background task by the API lifespan hook. The warm-up is
+        skipped when it already ran, e.g. in the pre-fork server's master.
+        """
+        if self.state != self.READY:
+            await self.warm_up()
+        while self.enabled and self.refresh_interval > 0:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                queries = await asyncio.to_thread(self.load_queries)
+                await self.replay(queries, refresh=True)
+                self.refreshes += 1
+            except Exception as ex:
+                csv_logger.log("ERROR", "Exception in CacheWarmer.run() refresh", exception=ex)
+
+    def is_ready(self) -> bool:
+        """Returns whether the worker should receive traffic."""
+        return self.state == self.READY
+
+    def get_status(self) -> Dict[str, object]:
+        """Returns the warm-up state and progress."""
+        return {
+            "status": self.state,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "total": self.total,
+            "refreshes": self.refreshes,
+            "duration_s": None if self.duration is None else round(self.duration, 3),
+        }
+
+
+# Global instance
+cache_warmer = CacheWarmer()
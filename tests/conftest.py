@@ -0,0 +1,49 @@
+import pytest
+
+from src.configs.settings import settings
+from src.services.clients import ClientFactory
+from src.utils.cache import consensus_cache, response_cache
+from src.utils.circuit_breaker import kendra_breaker, openai_breaker
+from src.utils.interaction_store import interaction_store
+from src.utils.logger import csv_logger
+from src.utils.semantic_cache import semantic_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """
+    Start every test with empty caches, closed circuit breakers and fresh upstream
+    clients so results, failures and mocked clients never leak between tests.
+    """
+    ClientFactory.get_instance().reset()
+    kendra_breaker.reset()
+    openai_breaker.reset()
+    response_cache.clear()
+    consensus_cache.clear()
+    semantic_cache.clear()
+    yield
+    response_cache.clear()
+    consensus_cache.clear()
+    semantic_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolate_files(tmp_path_factory, monkeypatch):
+    """
+    Point the log files and the interaction store at a temporary directory, so
+    tests never write into (or read history from) the working tree's logs/.
+    """
+    directory = tmp_path_factory.mktemp("files")
+    log_dir = str(directory / "logs")
+    store_path = str(directory / "interactions.sqlite3")
+    monkeypatch.setenv("LOG_DIR", log_dir)
+    monkeypatch.setenv("INTERACTION_STORE_PATH", store_path)
+    settings.reload()
+    monkeypatch.setattr(csv_logger, "log_dir", log_dir)
+    monkeypatch.setattr(interaction_store, "path", store_path)
+    yield
+    # The writer threads keep their files open; stop them so the next test starts afresh
+    csv_logger.close()
+    interaction_store.close()
+    monkeypatch.undo()
+    settings.reload()
@@ -6,7 +6,7 @@ from src.models.chatbot_response import ChatbotResponse
 
 client = TestClient(app)
 
-@patch('src.api.get_response_from_bot')
+@patch('src.api.get_response_from_bot_async')
 @patch('src.api.csv_logger')
 def test_chatbot_endpoint_success(mock_logger, mock_get_response):
     # Setup mock response
@@ -16,7 +16,7 @@ def test_chatbot_endpoint_success(mock_logger, mock_get_response):
         score=100,
         urls=["http://test.com"]
     )
-    mock_get_response.return_value = mock_response
+    mock_get_response.return_value = [mock_response]
 
     # Make request
     payload = {"query": "Hello"}
@@ -24,7 +24,7 @@ def test_chatbot_endpoint_success(mock_logger, mock_get_response):
 
     # Assertions
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()[0]
     assert data["queryId"] == "job-123"
     assert data["answer"] == "Test Answer"
     assert data["urls"] == ["http://test.com"]
@@ -39,6 +39,10 @@ def test_chatbot_endpoint_empty_query(mock_logger):
     assert response.status_code == 400
     assert response.json()["detail"] == "Empty query."
 
+    response = client.post("/chatbot/stream", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Empty query."
+
 @patch('src.api.csv_logger')
 def test_chatbot_endpoint_validation_error(mock_logger):
     # Make request with missing field
@@ -48,7 +52,7 @@ def test_chatbot_endpoint_validation_error(mock_logger):
     # Assertions
     assert response.status_code == 422 # Validation Error
 
-@patch('src.api.get_response_from_bot')
+@patch('src.api.get_response_from_bot_async')
 @patch('src.api.csv_logger')
 def test_chatbot_endpoint_not_found(mock_logger, mock_get_response):
     # Setup mock to return None (no answer)
@@ -62,7 +66,7 @@ def test_chatbot_endpoint_not_found(mock_logger, mock_get_response):
     assert response.status_code == 404
     assert response.json()["detail"] == "No answer found for your query."
 
-@patch('src.api.get_response_from_bot')
+@patch('src.api.get_response_from_bot_async')
 @patch('src.api.csv_logger')
 def test_chatbot_endpoint_internal_error(mock_logger, mock_get_response):
     # Setup mock to raise exception
@@ -70,9 +74,25 @@ def test_chatbot_endpoint_internal_error(mock_logger, mock_get_response):
 
     # Make request
     payload = {"query": "Crash me"}
-    response = client.post("/chatbot", json=payload)
+    response = TestClient(app, raise_server_exceptions=False).post("/chatbot", json=payload)
 
     # Assertions
     # Should be caught by global exception handler => 500
     assert response.status_code == 500
     assert response.json()["detail"] == "Internal Server Error"
+
+@patch('src.api.get_response_from_bot_async')
+def test_request_id_is_echoed_and_attached_to_log_records(mock_get_response):
+    from src.utils.logger import get_request_id
+    seen = []
+
+    async def respond(query):
+        seen.append(get_request_id())
+        return []
+
+    mock_get_response.side_effect = respond
+    with patch('src.api.csv_logger'):
+        response = client.post("/chatbot", json={"query": "Hello"}, headers={"X-Request-ID": "abc-123"})
+        generated = client.post("/chatbot", json={"query": "Hello"})
+    assert response.headers["X-Request-ID"] == "abc-123" and seen[0] == "abc-123"
+    assert len(generated.headers["X-Request-ID"]) == 32 and seen[1] == generated.headers["X-Request-ID"]
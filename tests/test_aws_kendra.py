@@ -1,6 +1,9 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, patch
 from src.services.aws_kendra import AWSKendra
+from src.utils.concurrency_limit import kendra_limiter
+from src.models.kendra_answer import KendraAnswer
 
 @patch('boto3.client')
 @patch('src.configs.settings.settings.get_aws_kendra_index_id')
@@ -73,3 +76,131 @@ def test_get_answers_from_query_results_mixed():
     assert "This" in answers[1][0]
     assert answers[1][1] == "http://doc2"
     assert answers[1][2] == 5  # Deterministic check
+
+def test_get_kendra_query_results_async_uses_executor():
+    kendra = AWSKendra.get_instance()
+
+    with patch.object(AWSKendra, 'get_kendra_query_results', return_value=('qid-async', [])) as mock_query:
+        qid, items = asyncio.run(kendra.get_kendra_query_results_async("async query"))
+
+    assert qid == 'qid-async'
+    assert items == []
+    mock_query.assert_called_once()
+    query, permit = mock_query.call_args.args
+    assert query == "async query"
+    # The slot is acquired before the executor and handed to the sync call, which releases it
+    assert kendra_limiter.get_stats()["in_flight"] == 1
+    permit.release()
+    assert kendra_limiter.get_stats()["in_flight"] == 0
+
+def test_get_answers_from_query_results_normalizes_and_skips_unscored():
+    kendra = AWSKendra.get_instance()
+    result_items = [
+        {'Type': 'DOCUMENT', 'DocumentURI': 'http://doc0', 'DocumentExcerpt': {'Text': 'No score.'}},
+        {
+            'Type': 'DOCUMENT',
+            'DocumentURI': 'http://doc1',
+            'ScoreAttributes': {'ScoreConfidence': 'HIGH'},
+            'DocumentExcerpt': {'Text': '  .Step one.\n\n  step\xa0two  \n'},
+        },
+        {'Type': 'QUESTION_ANSWER', 'DocumentURI': 'http://doc2'},
+    ]
+
+    answers = kendra.get_answers_from_query_results(result_items)
+
+    assert answers == [KendraAnswer("Step one step two", "http://doc1", 8)]
+    assert answers[0].confidence == 8
+
+def test_iter_answers_from_query_results_is_lazy():
+    kendra = AWSKendra.get_instance()
+    seen = []
+
+    def items():
+        for i in range(3):
+            seen.append(i)
+            yield {
+                'Type': 'ANSWER',
+                'DocumentURI': f'http://doc{i}',
+                'ScoreAttributes': {'ScoreConfidence': 'LOW'},
+                'DocumentExcerpt': {'Text': f'Answer {i}'},
+            }
+
+    answers = kendra.iter_answers_from_query_results(items())
+    assert next(answers) == KendraAnswer("Answer 0", "http://doc0", 1)
+    assert seen == [0]
+
+def _page(page_number, doc_ids, confidence='MEDIUM'):
+    return {
+        'QueryId': f'qid-{page_number}',
+        'ResultItems': [
+            {
+                'Id': f'p{page_number}-{doc_id}',
+                'Type': 'DOCUMENT',
+                'DocumentId': doc_id,
+                'ScoreAttributes': {'ScoreConfidence': confidence},
+            }
+            for doc_id in doc_ids
+        ],
+    }
+
+@patch('src.configs.settings.settings.get_kendra_high_confidence_target', return_value=0)
+@patch('src.configs.settings.settings.get_kendra_page_size', return_value=2)
+@patch('src.configs.settings.settings.get_kendra_page_count', return_value=3)
+def test_get_kendra_query_results_merges_pages(mock_count, mock_size, mock_target):
+    pages = {1: _page(1, ['a', 'b']), 2: _page(2, ['b', 'c']), 3: _page(3, ['d'])}
+    in_flight = {}
+
+    def query(**kwargs):
+        in_flight[kwargs['PageNumber']] = kendra_limiter.get_stats()['in_flight']
+        return pages[kwargs['PageNumber']]
+
+    client = MagicMock()
+    client.query.side_effect = query
+
+    kendra = AWSKendra.get_instance()
+    with patch.object(kendra, 'get_kendra_client', return_value=client):
+        qid, items = kendra.get_kendra_query_results("broad query")
+
+    assert qid == 'qid-1'
+    assert [item['DocumentId'] for item in items] == ['a', 'b', 'c', 'd']
+    assert client.query.call_count == 3
+    # Later pages hold a limiter slot of their own next to the query's
+    assert in_flight[1] == 1 and in_flight[2] >= 2 and in_flight[3] >= 2
+
+@patch('src.configs.settings.settings.get_kendra_high_confidence_target', return_value=2)
+@patch('src.configs.settings.settings.get_kendra_page_size', return_value=2)
+@patch('src.configs.settings.settings.get_kendra_page_count', return_value=3)
+def test_get_kendra_query_results_stops_on_high_confidence(mock_count, mock_size, mock_target):
+    pages = {1: _page(1, ['a', 'b'], 'VERY HIGH'), 2: _page(2, ['c', 'd']), 3: _page(3, ['e'])}
+    client = MagicMock()
+    client.query.side_effect = lambda **kwargs: pages[kwargs['PageNumber']]
+
+    kendra = AWSKendra.get_instance()
+    with patch.object(kendra, 'get_kendra_client', return_value=client):
+        _, items = kendra.get_kendra_query_results("broad query")
+
+    assert [item['DocumentId'] for item in items] == ['a', 'b']
+    assert client.query.call_count == 1  # later pages are never requested
+
+@patch('src.configs.settings.settings.get_kendra_high_confidence_target', return_value=0)
+@patch('src.configs.settings.settings.get_kendra_page_size', return_value=1)
+@patch('src.configs.settings.settings.get_kendra_page_count', return_value=2)
+def test_get_kendra_query_results_page_failures(mock_count, mock_size, mock_target):
+    def query(**kwargs):
+        if kwargs['PageNumber'] == failing_page:
+            raise RuntimeError("throttled")
+        return _page(kwargs['PageNumber'], [f"doc{kwargs['PageNumber']}"])
+
+    client = MagicMock()
+    client.query.side_effect = query
+    kendra = AWSKendra.get_instance()
+
+    failing_page = 2
+    with patch.object(kendra, 'get_kendra_client', return_value=client):
+        qid, items = kendra.get_kendra_query_results("broad query")
+    assert qid == 'qid-1'
+    assert [item['DocumentId'] for item in items] == ['doc1']
+
+    failing_page = 1
+    with patch.object(kendra, 'get_kendra_client', return_value=client):
+        assert kendra.get_kendra_query_results("broad query") == (None, None)
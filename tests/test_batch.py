@@ -0,0 +1,97 @@
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.api import app
+from src.main import get_responses_from_bot
+from src.models.chatbot_response import ChatbotResponse
+from src.models.chatbot_batch_response import ChatbotBatchResponse
+from src.models.kendra_answer import KendraAnswer
+
+client = TestClient(app)
+
+
+def _mock_upstreams(mock_openai, mock_aws_kendra, in_flight):
+    async def kendra(query):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        if query == "explode":
+            raise RuntimeError("kendra down")
+        return f"qid-{query}", []
+
+    async def consensus(statements, weights, query):
+        return {} if query == "nothing" else {f"Answer to {query}": 10}
+
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results_async = AsyncMock(side_effect=kendra)
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus_async = AsyncMock(side_effect=consensus)
+    return mock_kendra_instance
+
+
+@patch('src.configs.settings.settings.get_batch_kendra_concurrency', return_value=2)
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_responses_from_bot_dedupes_and_keeps_order(mock_openai, mock_aws_kendra, mock_limit):
+    in_flight = {"now": 0, "max": 0}
+    mock_kendra_instance = _mock_upstreams(mock_openai, mock_aws_kendra, in_flight)
+    queries = [f"q{i}" for i in range(6)] + ["Q0?", "explode", "nothing", ""]
+
+    results = get_responses_from_bot(queries)
+
+    assert [r.index for r in results] == list(range(len(queries)))
+    assert results[0].responses[0].answer == "Answer to q0"
+    assert results[6].responses == results[0].responses  # deduped with "q0"
+    assert results[7].error == "Internal Server Error"
+    assert results[8].error == "No answer found for your query."
+    assert results[9].error == "Empty query."
+    assert mock_kendra_instance.get_kendra_query_results_async.await_count == 8
+    assert in_flight["max"] <= 2
+
+
+@patch('src.api.get_responses_from_bot_async')
+@patch('src.api.csv_logger')
+def test_chatbot_batch_endpoint(mock_logger, mock_get_responses):
+    mock_get_responses.return_value = [
+        ChatbotBatchResponse(index=0, query="a", responses=[ChatbotResponse(queryId="1", answer="A", score=1, urls=[])]),
+        ChatbotBatchResponse(index=1, query="b", error="No answer found for your query."),
+    ]
+
+    response = client.post("/chatbot/batch", json={"queries": ["a", "b"]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]["responses"][0]["answer"] == "A"
+    assert data[1]["error"] == "No answer found for your query."
+
+
+@patch('src.api.get_responses_from_bot_stream')
+@patch('src.api.csv_logger')
+def test_chatbot_batch_endpoint_streams_ndjson(mock_logger, mock_stream):
+    async def stream(queries):
+        for index in reversed(range(len(queries))):
+            yield ChatbotBatchResponse(index=index, query=queries[index], error="x")
+
+    mock_stream.side_effect = stream
+
+    response = client.post("/chatbot/batch", json={"queries": ["a", "b"], "stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [1, 0]
+
+
+@patch('src.configs.settings.settings.get_batch_max_queries', return_value=2)
+@patch('src.api.csv_logger')
+def test_chatbot_batch_endpoint_rejects_oversized_batch(mock_logger, mock_max):
+    response = client.post("/chatbot/batch", json={"queries": ["a", "b", "c"]})
+
+    assert response.status_code == 400
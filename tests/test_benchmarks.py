@@ -0,0 +1,84 @@
+import json
+import pytest
+from benchmarks.stubs import LatencyModel, StubKendraClient, make_result_items
+from benchmarks.micro import run_micro
+from benchmarks.load import run_load
+from benchmarks.run import compare, main
+from benchmarks.startup import direct_imports, parse_importtime, run_startup
+
+
+def test_latency_model_matches_median():
+    model = LatencyModel(100, 300, seed=1)
+    samples = sorted(model.sample() for _ in range(2000))
+    assert samples[1000] == pytest.approx(0.1, rel=0.15)
+    assert LatencyModel().sample() == 0.0
+
+
+def test_stub_kendra_returns_payload():
+    client = StubKendraClient(result_items=make_result_items(answers=1, documents=1))
+    response = client.query(QueryText="q", IndexId="idx")
+    assert len(response["ResultItems"]) == 2
+    assert client.calls == 1
+
+
+def test_run_micro_reports_every_benchmark():
+    results = run_micro(iterations=5)
+    assert set(results) == {
+        "extract", "consensus_parse", "select", "logger", "logger_filtered", "logger_sampled", "logger_json",
+        "rate_limit",
+    }
+    assert all(r["median_us"] > 0 for r in results.values())
+
+
+def test_run_load_drives_api_with_stubs():
+    result = run_load(requests=20, concurrency=4, kendra_ms=0, openai_ms=0)
+    assert result["statuses"] == {"200": 20}
+    assert result["upstream_calls"]["kendra"] == 20
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"micro": {"extract": {"median_us": 10.0}}, "load": {"p99_ms": 100.0, "rps": 50.0}}
+    current = {"micro": {"extract": {"median_us": 13.0}}, "load": {"p99_ms": 105.0, "rps": 30.0}}
+    regressions = compare(current, baseline, max_regression=0.15)
+    assert any(r.startswith("micro.extract.median_us") for r in regressions)
+    assert any(r.startswith("load.rps") for r in regressions)
+    assert not any(r.startswith("load.p99_ms") for r in regressions)
+
+
+def test_main_exits_nonzero_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"micro": {"extract": {"median_us": 1e-6}}}))
+    assert main(["--iterations", "5", "--skip-load", "--skip-startup", "--baseline", str(baseline)]) == 1
+
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   json.decoder
+import time:       200 |        300 | json
+import time:        50 |         50 |     fastapi.routing
+import time:       400 |        450 |   fastapi
+import time:        20 |         20 |   src.main
+import time:        30 |        500 | src.api
+"""
+
+
+def test_parse_importtime_keeps_nesting():
+    imports = parse_importtime(IMPORTTIME)
+    assert imports[0] == (1, "json.decoder", 100)
+    assert imports[2] == (2, "fastapi.routing", 50)
+    assert direct_imports(imports, "src.api") == {"fastapi": 450, "src.main": 20}
+
+
+def test_run_startup_defers_sdks():
+    result = run_startup(repeat=1)
+    assert result["import_ms"] > 0
+    assert result["deferred_loaded"] == []
+    assert "src.main" in result["top_imports_ms"]
+
+
+def test_compare_flags_startup_regressions():
+    baseline = {"startup": {"import_ms": 500.0, "deferred_loaded": []}}
+    current = {"startup": {"import_ms": 600.0, "deferred_loaded": ["openai"]}}
+    regressions = compare(current, baseline, max_regression=0.15, max_startup_regression=0.25)
+    assert not any(r.startswith("startup.import_ms") for r in regressions)
+    assert any(r.startswith("startup.deferred_loaded") for r in regressions)
@@ -0,0 +1,155 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.main import get_response_from_bot
+from src.models.chatbot_response import ChatbotResponse
+from src.models.kendra_answer import KendraAnswer
+from src.utils.cache import (
+    ConsensusCache,
+    LRUCache,
+    RedisCacheBackend,
+    ResponseCache,
+    SQLiteCacheBackend,
+    consensus_cache,
+    normalize_query,
+    response_cache,
+)
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for a Redis client."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        entry = self.store.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0].encode("utf-8")
+
+    def set(self, key, value, ex=None):
+        self.store[key] = (value, time.time() + (ex or 1e9))
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+def _responses():
+    return [ChatbotResponse(queryId="qid", answer="Reset it in settings.", score=10, urls=["http://doc"])]
+
+
+def test_normalize_query():
+    assert normalize_query("  How do I RESET my password?! ") == "how do i reset my password"
+    assert ResponseCache.make_key("Reset password") == ResponseCache.make_key("reset,   PASSWORD.")
+
+
+def test_lru_cache_evicts_and_expires():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None  # least recently used
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
+
+
+@pytest.mark.parametrize("backend_factory", [
+    lambda tmp_path: SQLiteCacheBackend(str(tmp_path / "cache.sqlite3")),
+    lambda tmp_path: RedisCacheBackend(FakeRedis()),
+])
+def test_shared_tier_is_used_after_local_miss(tmp_path, backend_factory):
+    backend = backend_factory(tmp_path)
+    writer = ResponseCache(backend=backend)
+    writer.set("Reset password?", _responses())
+
+    # A second process has an empty local tier but shares the backend
+    reader = ResponseCache(backend=backend)
+    cached = reader.get("reset password")
+
+    assert cached[0].answer == "Reset it in settings."
+    assert reader.get_stats()["shared_hits"] == 1
+    reader.get("reset password")
+    assert reader.get_stats()["local_hits"] == 1
+    assert reader.get("other question") is None
+    assert reader.get_stats()["misses"] == 1
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_response_from_bot_cache_hit_skips_upstreams(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results.return_value = ("qid", [])
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {"Final Answer": 10}
+
+    first = get_response_from_bot("What is DocuChat?")
+    second = get_response_from_bot("what is docuchat")
+
+    assert second == first
+    assert mock_kendra_instance.get_kendra_query_results.call_count == 1
+    assert mock_openai_instance.get_consensus.call_count == 1
+    assert response_cache.get_stats()["hits"] == 1
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_response_from_bot_does_not_cache_empty(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results.return_value = ("qid", [])
+    mock_kendra_instance.get_answers_from_query_results.return_value = []
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {}
+
+    get_response_from_bot("unknown")
+    get_response_from_bot("unknown")
+
+    assert mock_openai_instance.get_consensus.call_count == 2
+
+
+def test_consensus_cache_key_is_order_sensitive():
+    key = ConsensusCache.make_key("gpt", 1000, ["a", "b"], [10, 5], "q")
+    assert key == ConsensusCache.make_key("gpt", 1000, ["a", "b"], [10, 5], "q")
+    assert key != ConsensusCache.make_key("gpt", 1000, ["b", "a"], [10, 5], "q")
+    assert key != ConsensusCache.make_key("gpt", 500, ["a", "b"], [10, 5], "q")
+
+
+def test_consensus_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "consensus.sqlite3")
+    key = ConsensusCache.make_key("gpt", 1000, ["a"], [10], "q")
+
+    ConsensusCache(backend=SQLiteCacheBackend(path)).set(key, {"Answer": 10})
+    restarted = ConsensusCache(backend=SQLiteCacheBackend(path))
+
+    assert restarted.get(key) == {"Answer": 10}
+    assert restarted.get_stats()["hits"] == 1
+
+
+@patch('src.services.openai.OpenAI.get_chatgpt_response')
+def test_get_consensus_memoizes_parsed_result(mock_get_response):
+    from src.services.openai import OpenAI
+
+    mock_get_response.return_value = '{"type": "statement", "text": "Same answer."}'
+    openai_service = OpenAI.get_instance()
+
+    first = openai_service.get_consensus(["s1", "s2"], [10, 5], "reworded query")
+    second = openai_service.get_consensus(["s1", "s2"], [10, 5], "reworded query")
+
+    assert first == second == {"Same answer.": 15}
+    mock_get_response.assert_called_once()
+    assert consensus_cache.get_stats()["hits"] == 1
@@ -1,9 +1,10 @@
 import json
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from src.services.openai import OpenAI
 
-@patch('src.services.openai.OpenAIClient')
+@patch('src.services.clients.OpenAIClient')
 def test_get_chatgpt_response_success(mock_openai_client_class):
     # Mock the OpenAI client instance
     mock_client = MagicMock()
@@ -85,3 +86,23 @@ def test_get_consensus_statement_logic(mock_get_response):
     # "This is the unified answer.": sum(weights) = 15
     
     assert result['This is the unified answer.'] == 15
+
+@patch('src.services.clients.AsyncOpenAIClient')
+def test_get_consensus_async_statement_logic(mock_async_client_class):
+    mock_client = MagicMock()
+    mock_async_client_class.return_value = mock_client
+
+    mock_message = MagicMock()
+    mock_message.content = json.dumps({'type': 'statement', 'text': 'Async answer.'})
+    mock_choice = MagicMock()
+    mock_choice.message = mock_message
+    mock_response = MagicMock()
+    mock_response.choices = [mock_choice]
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    openai_service = OpenAI.get_instance()
+
+    result = asyncio.run(openai_service.get_consensus_async(["s1", "s2"], [10, 5], "query"))
+
+    assert result == {'Async answer.': 15}
+    mock_client.chat.completions.create.assert_awaited_once()
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from benchmarks.stubs import FaultModel, StubKendraClient, StubOpenAIClient, UpstreamFault, install_stubs
+from src.api import app
+from src.main import get_response_from_bot, get_response_from_bot_async
+from src.services.openai import OpenAI
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpen, kendra_breaker, openai_breaker
+from src.utils.concurrency_limit import Overloaded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock, **overrides) -> CircuitBreaker:
+    options = dict(window=10, min_calls=4, failure_rate=0.5, open_seconds=5, half_open_calls=2, enabled=True)
+    options.update(overrides)
+    return CircuitBreaker("test", clock=clock, **options)
+
+
+def call(breaker: CircuitBreaker, fail: bool = False) -> None:
+    with breaker.attempt():
+        if fail:
+            raise UpstreamFault("down")
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    call(breaker)
+    call(breaker)
+    with pytest.raises(UpstreamFault):
+        call(breaker, fail=True)
+    assert breaker.state == breaker.CLOSED  # 3 calls, below min_calls
+    with pytest.raises(UpstreamFault):
+        call(breaker, fail=True)
+    assert breaker.state == breaker.OPEN
+
+    with pytest.raises(CircuitOpen) as exc_info:
+        call(breaker)
+    assert exc_info.value.retry_after == 5
+
+    clock.now += 5
+    first = breaker.attempt()
+    second = breaker.attempt()
+    assert breaker.state == breaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.check()  # both probe slots are taken
+    with first, second:
+        pass
+    assert breaker.state == breaker.CLOSED
+    assert breaker.get_stats() == {"state": 0, "calls": 0, "failures": 0}
+
+
+def test_failed_probe_reopens_and_old_failures_expire():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        with pytest.raises(UpstreamFault):
+            call(breaker, fail=True)
+    clock.now += 5
+    with pytest.raises(UpstreamFault):
+        call(breaker, fail=True)
+    assert breaker.state == breaker.OPEN
+
+    breaker.reset()
+    for _ in range(3):
+        with pytest.raises(UpstreamFault):
+            call(breaker, fail=True)
+    clock.now += 11  # the failures leave the window
+    call(breaker)
+    with pytest.raises(UpstreamFault):
+        call(breaker, fail=True)
+    assert breaker.state == breaker.CLOSED
+
+
+def test_shed_calls_do_not_count_as_failures():
+    breaker = make_breaker(FakeClock(), min_calls=1)
+    with pytest.raises(Overloaded):
+        with breaker.attempt():
+            raise Overloaded("test", 1)
+    assert breaker.state == breaker.CLOSED
+    assert breaker.get_stats()["calls"] == 0
+
+
+@pytest.fixture
+def failing_openai():
+    faults = FaultModel()
+    faults.down = True
+    install_stubs(
+        StubKendraClient(),
+        StubOpenAIClient(faults=faults),
+        StubOpenAIClient(faults=faults, is_async=True),
+    )
+    with patch.object(openai_breaker, "enabled", True), patch.object(openai_breaker, "min_calls", 1):
+        yield faults
+
+
+def test_open_openai_breaker_answers_with_kendra_excerpts(failing_openai):
+    assert get_response_from_bot("first query") == []  # the failure that opens the breaker
+    assert openai_breaker.state == openai_breaker.OPEN
+
+    responses = get_response_from_bot("second query")
+    assert 0 < len(responses) <= 3
+    assert all(response.degraded for response in responses)
+    assert [response.score for response in responses] == sorted((r.score for r in responses), reverse=True)
+    assert failing_openai.failures == 1  # OpenAI was not called again
+
+    responses = asyncio.run(get_response_from_bot_async("third query"))
+    assert responses and responses[0].degraded
+
+
+@patch('src.api.csv_logger')
+def test_open_kendra_breaker_returns_503(mock_logger):
+    with patch.object(kendra_breaker, "enabled", True), patch.object(kendra_breaker, "state", kendra_breaker.OPEN), \
+            patch.object(kendra_breaker, "_opened_at", kendra_breaker.clock()):
+        response = TestClient(app).post("/chatbot", json={"query": "kendra is down"})
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"] == "Service temporarily unavailable, retry later."
+
+
+def test_embeddings_skip_openai_while_its_breaker_is_open():
+    openai, async_openai = MagicMock(), MagicMock()
+    async_openai.embeddings.create = AsyncMock()
+    install_stubs(StubKendraClient(), openai, async_openai)
+    with patch.object(openai_breaker, "enabled", True), patch.object(openai_breaker, "state", openai_breaker.OPEN), \
+            patch.object(openai_breaker, "_opened_at", openai_breaker.clock()):
+        assert OpenAI.get_instance().get_embeddings(["query"]) is None
+        assert asyncio.run(OpenAI.get_instance().get_embeddings_async(["query"])) is None
+
+    openai.embeddings.create.assert_not_called()
+    async_openai.embeddings.create.assert_not_called()
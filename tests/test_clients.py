@@ -0,0 +1,72 @@
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.clients import ClientFactory
+
+
+@patch('src.configs.settings.settings.get_kendra_max_pool_connections', return_value=64)
+@patch('boto3.client')
+def test_kendra_client_is_built_once_across_threads(mock_boto_client, mock_pool):
+    factory = ClientFactory.get_instance()
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def worker():
+        barrier.wait()
+        clients.append(factory.get_kendra_client())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert mock_boto_client.call_count == 1
+    assert all(c is clients[0] for c in clients)
+    config = mock_boto_client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 64
+    assert config.retries["mode"] == "adaptive"
+
+
+@patch('src.configs.settings.settings.get_openai_max_connections', return_value=7)
+@patch('src.configs.settings.settings.get_openai_read_timeout', return_value=12.5)
+def test_openai_client_uses_tuned_transport(mock_read_timeout, mock_max_connections):
+    factory = ClientFactory.get_instance()
+    limits = factory.get_httpx_limits()
+    timeout = factory.get_httpx_timeout()
+
+    assert limits.max_connections == 7
+    assert timeout.read == 12.5
+
+    with patch('src.services.clients.OpenAIClient') as mock_client_class:
+        first = factory.get_openai_client()
+        second = factory.get_openai_client()
+
+    assert first is second
+    mock_client_class.assert_called_once()
+    assert mock_client_class.call_args.kwargs["http_client"] is not None
+
+
+@patch('src.services.clients.csv_logger')
+def test_warm_up_never_raises(mock_logger):
+    factory = ClientFactory.get_instance()
+    failing = MagicMock()
+    failing.describe_index.side_effect = Exception("no network")
+    failing.models.list.side_effect = Exception("no network")
+
+    with patch.object(factory, "get_kendra_client", return_value=failing), \
+            patch.object(factory, "get_openai_client", return_value=failing):
+        factory.warm_up()
+
+    assert mock_logger.log.call_count == 2
+
+
+def test_sdks_are_imported_on_first_use():
+    from src.services import clients
+
+    with pytest.raises(AttributeError):
+        clients.not_an_sdk
+    clients.preload_sdks()
+    assert clients.OpenAIClient.__name__ == "OpenAI"
+    assert clients.Config.__module__ == "botocore.config"
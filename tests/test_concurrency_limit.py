@@ -0,0 +1,107 @@
+import time
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from src.api import app
+from src.utils.concurrency_limit import AdaptiveLimiter, Overloaded
+from src.utils.metrics import LOAD_SHED
+
+
+def make_limiter(**overrides) -> AdaptiveLimiter:
+    options = dict(initial_limit=2, min_limit=1, max_limit=50, tolerance=1.5,
+                   queue_size=1, queue_timeout=0.05, enabled=True)
+    options.update(overrides)
+    return AdaptiveLimiter("test", **options)
+
+
+def complete(permit, latency: float) -> None:
+    permit.start = time.monotonic() - latency
+    permit.release()
+
+
+def test_limiter_sheds_when_queue_is_full():
+    limiter = make_limiter()
+    first, second = limiter.acquire(), limiter.acquire()
+    shed_before = LOAD_SHED.get("test", "timeout")
+
+    # One caller may wait; it times out because nothing is released
+    with pytest.raises(Overloaded) as exc_info:
+        limiter.acquire()
+    assert exc_info.value.retry_after >= 1
+    assert LOAD_SHED.get("test", "timeout") == shed_before + 1
+
+    limiter.queue_timeout = 1.0
+    granted = []
+    waiter = threading.Thread(target=lambda: granted.append(limiter.acquire()))
+    waiter.start()
+    while not limiter.get_stats()["queued"]:
+        pass
+    with pytest.raises(Overloaded):
+        limiter.acquire()  # queue of one is taken
+
+    first.release()
+    waiter.join()
+    assert len(granted) == 1
+    assert limiter.get_stats()["in_flight"] == 2
+    second.release()
+    granted[0].release()
+    assert limiter.get_stats()["in_flight"] == 0
+    assert limiter.shed == 2
+
+
+def test_limiter_hands_slot_to_async_waiter():
+    limiter = make_limiter(initial_limit=1, queue_timeout=1.0)
+
+    async def scenario():
+        holder = await limiter.acquire_async()
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        assert limiter.get_stats()["queued"] == 1
+        # Released from another thread, like the Kendra pool does
+        threading.Thread(target=holder.release).start()
+        permit = await waiter
+        permit.release()
+
+    asyncio.run(scenario())
+    assert limiter.get_stats()["in_flight"] == 0
+
+
+def test_limit_grows_with_flat_latency_and_shrinks_when_it_rises():
+    limiter = make_limiter(initial_limit=10)
+    for _ in range(20):
+        for permit in [limiter.acquire() for _ in range(limiter.limit)]:
+            complete(permit, 0.1)
+    grown = limiter.limit
+    assert grown > 10
+
+    for _ in range(20):
+        for permit in [limiter.acquire() for _ in range(limiter.limit)]:
+            complete(permit, 1.0)
+    assert limiter.limit < grown
+
+
+def test_failures_back_off_and_disabled_limiter_admits_everything():
+    limiter = make_limiter(initial_limit=10)
+    with pytest.raises(RuntimeError):
+        with limiter.acquire():
+            raise RuntimeError("upstream timeout")
+    assert limiter.limit == 9
+
+    disabled = make_limiter(initial_limit=1, enabled=False)
+    permits = [disabled.acquire() for _ in range(5)]
+    assert disabled.get_stats()["in_flight"] == 5
+    for permit in permits:
+        permit.release()
+
+
+@patch('src.api.get_response_from_bot_async', side_effect=Overloaded("openai", 3))
+@patch('src.api.csv_logger')
+def test_chatbot_endpoint_returns_503_when_shed(mock_logger, mock_get_response):
+    response = TestClient(app).post("/chatbot", json={"query": "busy"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["detail"] == "Service overloaded, retry later."
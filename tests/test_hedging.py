@@ -0,0 +1,104 @@
+import time
+import asyncio
+import threading
+import pytest
+
+from src.utils.hedging import HedgeBudget, Hedger, LatencySketch
+from src.utils.metrics import HEDGES
+
+
+def warmed_hedger(latency: float = 0.01, **overrides) -> Hedger:
+    options = dict(enabled=True, quantile=0.95, budget_percent=100, min_delay=0.0)
+    options.update(overrides)
+    hedger = Hedger("test", **options)
+    for _ in range(Hedger.MIN_SAMPLES):
+        hedger.sketch.observe(latency)
+    return hedger
+
+
+def test_latency_sketch_rolls_over_its_window():
+    sketch = LatencySketch(window=100, refresh=1)
+    assert sketch.quantile(0.95) is None
+    for value in range(200):
+        sketch.observe(value / 1000)
+    assert len(sketch) == 100
+    assert sketch.quantile(0.5) == pytest.approx(0.150)
+    assert sketch.quantile(0.95) == pytest.approx(0.195)
+
+
+def test_hedge_budget_caps_share_of_calls():
+    budget = HedgeBudget(percent=10)
+    allowed = 0
+    for _ in range(100):
+        budget.deposit()
+        allowed += budget.withdraw()
+    assert allowed == 10
+
+
+def test_slow_first_attempt_is_hedged_and_hedge_wins():
+    hedger = warmed_hedger()
+    calls = []
+    won_before = HEDGES.get("test", "hedge_won")
+
+    def call():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.3 if len(calls) == 1 else 0.0)
+        return len(calls)
+
+    start = time.perf_counter()
+    assert hedger.run(call) == 2
+    assert time.perf_counter() - start < 0.25
+    assert len(calls) == 2
+    assert HEDGES.get("test", "hedge_won") == won_before + 1
+
+
+def test_failed_attempt_falls_back_to_the_other_one():
+    hedger = warmed_hedger()
+    attempts = iter([("slow", 0.05), ("fail", 0.0)])
+
+    def call():
+        kind, delay = next(attempts)
+        time.sleep(delay)
+        if kind == "fail":
+            raise ConnectionError("hedge failed")
+        return kind
+
+    assert hedger.run(call) == "slow"
+
+
+def test_async_hedge_cancels_the_slow_attempt():
+    hedger = warmed_hedger()
+    cancelled = []
+
+    async def scenario():
+        attempt = 0
+
+        async def call():
+            nonlocal attempt
+            attempt += 1
+            number = attempt
+            try:
+                await asyncio.sleep(1.0 if number == 1 else 0.0)
+                return number
+            except asyncio.CancelledError:
+                cancelled.append(number)
+                raise
+
+        result = await hedger.run_async(call)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == 2
+    assert cancelled == [1]
+
+
+def test_no_hedge_without_budget_or_when_disabled():
+    hedger = warmed_hedger(budget_percent=0)
+    denied_before = HEDGES.get("test", "budget_denied")
+    assert hedger.run(lambda: time.sleep(0.05) or "only") == "only"
+    assert HEDGES.get("test", "budget_denied") == denied_before + 1
+
+    disabled = Hedger("test", enabled=False)
+    calls_before = HEDGES.get("test", "calls")
+    assert disabled.run(lambda: "direct") == "direct"
+    assert HEDGES.get("test", "calls") == calls_before
@@ -0,0 +1,119 @@
+import json
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from benchmarks.stubs import StubKendraClient, StubOpenAIClient, install_stubs
+from src import analytics
+from src.main import get_response_from_bot, get_responses_from_bot_async, stream_response_from_bot
+from src.utils.interaction_store import Interaction, InteractionStore, current_interaction
+from src.utils.metrics import start_request_timings, timed, use_request_timings
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InteractionStore(path=str(tmp_path / "interactions.sqlite3"), enabled=True)
+    install_stubs(StubKendraClient(), StubOpenAIClient(), StubOpenAIClient(is_async=True))
+    with patch("src.main.interaction_store", store):
+        yield store
+    store.close()
+
+
+def fetch(store: InteractionStore, columns: str):
+    assert store.flush(5)
+    conn = store.connect()
+    try:
+        return conn.execute(f"SELECT {columns} FROM interactions ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_each_answered_query_is_one_row(store):
+    first = get_response_from_bot("How do I configure the index?")
+    get_response_from_bot("how do I configure the index")
+
+    rows = fetch(store, "source, query_hash, query_id, kendra_results, answer_count, top_score, cache_hit, "
+                        "prompt_tokens, completion_tokens, kendra_ms, consensus_ms, urls")
+    assert len(rows) == 2
+    (source, query_hash, query_id, kendra_results, answer_count, top_score, cache_hit, prompt_tokens,
+     completion_tokens, kendra_ms, consensus_ms, urls) = rows[0]
+    assert source == "chatbot" and query_id == first[0].queryId
+    assert kendra_results > 0 and answer_count == len(first) and top_score == max(r.score for r in first)
+    assert cache_hit == 0 and prompt_tokens > 0 and completion_tokens > 0
+    assert kendra_ms > 0 and consensus_ms > 0
+    assert json.loads(urls) == first[0].urls
+
+    # The normalized repeat is a cache hit of the same query
+    assert rows[1][1] == query_hash and rows[1][6] == 1 and rows[1][7] == 0
+
+
+def test_batch_and_stream_are_recorded_per_query(store):
+    asyncio.run(get_responses_from_bot_async(["first question", "second question", "First question!"]))
+
+    async def consume():
+        return [event async for event, _ in stream_response_from_bot("streamed question")]
+
+    assert asyncio.run(consume())[-1] == "result"
+    rows = fetch(store, "source, query, error")
+    assert sorted(rows) == [
+        ("batch", "first question", None), ("batch", "second question", None), ("stream", "streamed question", None),
+    ]
+
+
+def test_tracking_scopes_timings_and_records_errors(store):
+    request_timings = start_request_timings()
+    with pytest.raises(RuntimeError):
+        with store.track("failing", "chatbot") as interaction:
+            assert current_interaction() is interaction
+            with timed("kendra"):
+                pass
+            raise RuntimeError("boom")
+    assert current_interaction() is None
+    assert "kendra" in request_timings  # still reported in Server-Timing
+    use_request_timings(None)
+
+    assert fetch(store, "error, answer_count, kendra_ms IS NOT NULL") == [("RuntimeError", 0, 1)]
+
+
+def insert(store: InteractionStore, query: str, timestamp: float, total_ms: float, answers: int = 1,
+           cache_hit: bool = False) -> None:
+    interaction = Interaction(query, "chatbot")
+    interaction.timestamp, interaction.total_ms, interaction.cache_hit = timestamp, total_ms, cache_hit
+    interaction.scores = [80] * answers
+    interaction.timings = {"kendra": total_ms / 4}
+    store.record(interaction)
+
+
+def test_analytics_reports_over_a_date_range(store, capsys):
+    day, next_day = analytics.day_range("2026-10-01", "2026-10-01")[0], analytics.day_range("2026-10-02", None)[0]
+    for i in range(10):
+        insert(store, "Fast question", day + i, 100 + i, cache_hit=i > 0)
+    insert(store, "slow question", day + 20, 900)
+    insert(store, "unanswered question", day + 30, 300, answers=0)
+    insert(store, "unanswered question", next_day + 30, 300, answers=0)
+    assert store.flush(5)
+
+    conn = store.connect()
+    start, end = analytics.day_range("2026-10-01", "2026-10-01")
+    top = analytics.top_queries(conn, start, end, limit=2)
+    assert [(row["query"], row["count"], row["cache_hits"]) for row in top] == [
+        ("Fast question", 10, 9), ("slow question", 1, 0),
+    ]
+    assert analytics.top_queries(conn, start, end, unanswered=True)[0]["query"] == "unanswered question"
+    assert analytics.slowest_queries(conn, start, end, limit=1)[0]["query"] == "slow question"
+
+    latency = analytics.latency_percentiles(conn, start, end)
+    assert latency["total_ms"]["count"] == 12 and latency["total_ms"]["p50"] == 105
+    assert latency["total_ms"]["p99"] == 900 and latency["kendra_ms"]["p99"] == 225
+    assert latency["consensus_ms"] == {"count": 0}
+
+    rates = analytics.no_answer_rates(conn, *analytics.day_range("2026-10-01", "2026-10-02"))
+    assert [(row["day"], row["total"], row["unanswered"]) for row in rates] == [
+        ("2026-10-01", 12, 1), ("2026-10-02", 1, 1),
+    ]
+    conn.close()
+
+    assert analytics.main(["top", "--db", store.path, "--since", "2026-10-02", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)[0]["query"] == "unanswered question"
+    assert analytics.main(["latency", "--db", store.path, "--until", "2026-09-30"]) == 0
+    assert "total_ms" in capsys.readouterr().out
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.main import get_response_from_bot
+from src.services.local_retriever import LocalRetriever, chunk_text, tokenize
+
+DOCS = {
+    "keys.md": "# Access keys\n\nTo rotate an access key, create a new key, update your applications, "
+               "then deactivate the old key.\n\nKeys older than 90 days are flagged.",
+    "billing.txt": "Invoices are emailed monthly.\n\nRefunds take five business days to process.",
+    "guides/index.md": "Kendra indexes sync data sources on a schedule.",
+}
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    corpus = tmp_path / "corpus"
+    for name, text in DOCS.items():
+        path = corpus / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    retriever = LocalRetriever.get_instance()
+    saved = dict(retriever.__dict__)
+    retriever.corpus_dir = str(corpus)
+    retriever.index_dir = str(tmp_path / "index")
+    retriever.chunk_words = 20
+    retriever.dense_weight = 0.0
+    retriever.base_url = "https://docs.example.com"
+    retriever.index = None
+    yield retriever
+    retriever.__dict__.update(saved)
+
+
+def test_tokenize_and_chunk():
+    assert tokenize("How do I rotate THE keys?") == ["rotate", "keys"]
+    chunks = chunk_text("one two three\n\nfour five\n\n" + " ".join(["w"] * 7), chunk_words=5)
+    assert chunks == ["one two three\nfour five", "w w w w w", "w w"]
+
+
+def test_search_returns_kendra_shaped_results(retriever):
+    query_id, items = retriever.get_kendra_query_results("How do I rotate an access key?")
+
+    assert query_id
+    assert items[0]["DocumentId"] == "keys.md"
+    assert items[0]["DocumentURI"] == "https://docs.example.com/keys.md"
+    assert items[0]["Type"] == "DOCUMENT"
+    assert items[0]["ScoreAttributes"]["ScoreConfidence"] == "VERY HIGH"
+
+    answers = retriever.get_answers_from_query_results(items)
+    assert "rotate an access key" in answers[0].text
+    assert answers[0].confidence == 10
+
+
+def test_index_is_memory_mapped_and_reloaded(retriever):
+    retriever.get_index()
+    retriever.index = None
+
+    index = retriever.get_index()
+    assert isinstance(index.arrays["postings_chunks"], np.memmap)
+    assert retriever.search("refunds")[0][0] == index.chunk_files.index("billing.txt")
+
+
+def test_incremental_build_only_reads_changed_files(retriever, tmp_path):
+    first = retriever.build()
+    assert retriever.build() is first  # unchanged corpus is not rebuilt
+
+    (tmp_path / "corpus" / "billing.txt").write_text("Invoices now arrive weekly by post.")
+    (tmp_path / "corpus" / "guides" / "index.md").unlink()
+    with patch("src.services.local_retriever.chunk_text", wraps=chunk_text) as chunker:
+        index = retriever.build()
+
+    assert chunker.call_count == 1
+    assert set(index.files) == {"keys.md", "billing.txt"}
+    assert retriever.search("weekly post")[0][0] in range(
+        index.files["billing.txt"]["first"], index.files["billing.txt"]["first"] + index.files["billing.txt"]["count"]
+    )
+    assert not retriever.search("schedule")
+
+
+def test_hybrid_scoring_uses_dense_vectors(retriever):
+    retriever.dense_weight = 0.5
+    index = retriever.build()
+    assert index.arrays["vectors"].shape[0] == len(index)
+    assert retriever.search("refund process")[0][1] <= 1.0
+
+
+@patch('src.main.OpenAI')
+@patch('src.configs.settings.settings.get_retriever_backend', return_value="local")
+def test_pipeline_runs_on_local_backend(mock_backend, mock_openai, retriever):
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {"Create a new key": 10}
+
+    response = get_response_from_bot("rotate access key")
+
+    assert response[0].answer == "Create a new key"
+    assert response[0].urls[0] == "https://docs.example.com/keys.md"
@@ -1,12 +1,11 @@
 import os
 import pytest
 import threading
-import pandas as pd
 
 from unittest.mock import patch
 from datetime import datetime
 
-from src.utils.logger import csv_logger
+from src.utils.logger import csv_logger, read_records
 
 
 def test_concurrency_logging_safety(tmp_path) -> None:
@@ -40,6 +39,9 @@ def test_concurrency_logging_safety(tmp_path) -> None:
     for t in threads:
         t.join()
 
+    ## writes happen on a background thread, wait for them to hit the disk
+    csv_logger.flush()
+
     # 5. Verification
     ## construct the expected filename
     now = datetime.now()
@@ -49,12 +51,124 @@ def test_concurrency_logging_safety(tmp_path) -> None:
 
     ## Read csv file and verify the count
     try:
-        df = pd.read_csv(log_filename)
+        records = list(read_records(log_filename))
 
-        assert len(df) == total_expected_logs, (
-            f"Expected {total_expected_logs} logs, but found {len(df)}"
+        assert len(records) == total_expected_logs, (
+            f"Expected {total_expected_logs} logs, but found {len(records)}"
         )
-        print(f"Success! {len(df)} logs written safely.")
+        print(f"Success! {len(records)} logs written safely.")
 
     except Exception as e:
         pytest.fail(f"Failed to read CSV file (file might be corrupted): {e}")
+
+
+def test_batched_writes_keep_single_header(tmp_path) -> None:
+    """
+    Verifies that reopening a day file after close() does not repeat the CSV header.
+    """
+    from src.utils.logger import CsvLogger
+
+    logger = CsvLogger()
+    logger.log_dir = str(tmp_path)
+    logger.batch_size = 3
+
+    for i in range(7):
+        logger.log("INFO", f"first run {i}")
+    logger.close()
+
+    logger.log("ERROR", "second run", exception=ValueError("boom, with comma"))
+    logger.close()
+
+    records = list(read_records(logger._get_log_filename(datetime.now())))
+    assert list(records[0]) == ["timestamp", "level", "message", "exception"]
+    assert len(records) == 8
+    assert records[-1]["exception"] == "boom, with comma"
+
+
+def make_logger(tmp_path, **attributes):
+    from src.utils.logger import CsvLogger
+
+    logger = CsvLogger()
+    logger.log_dir = str(tmp_path)
+    for name, value in attributes.items():
+        setattr(logger, name, value)
+    return logger
+
+
+def logger_level(name: str) -> int:
+    from src.utils.logger import CsvLogger
+    return CsvLogger.LEVELS[name]
+
+
+def test_filtered_and_sampled_records_are_never_formatted(tmp_path) -> None:
+    formatted = []
+
+    class Expensive:
+        def __str__(self):
+            formatted.append(1)
+            return "expensive"
+
+    logger = make_logger(tmp_path, min_level=logger_level("WARNING"))
+    logger.log("INFO", "Processing query: %s", Expensive())
+    assert not logger.is_enabled("DEBUG") and logger.is_enabled("ERROR")
+    assert logger._thread is None and formatted == []
+
+    logger.min_level, logger.sample_rate = logger_level("DEBUG"), 0.0
+    logger.log("INFO", "Processing query: %s", Expensive())
+    logger.log("WARNING", "Shed query: %s", Expensive())  # WARNING and above are never sampled
+    logger.close()
+    records = read_records(logger._get_log_filename(datetime.now()))
+    assert [record["message"] for record in records] == ["Shed query: expensive"] and formatted == [1]
+
+
+def test_json_lines_carry_the_request_id(tmp_path) -> None:
+    from src.utils.logger import set_request_id
+
+    logger = make_logger(tmp_path, format="json")
+    set_request_id("req-1")
+    logger.log("INFO", "Kendra returned %d answers for query: %s", 2, "q")
+    set_request_id(None)
+    logger.log("ERROR", "failed", exception=ValueError("boom"))
+    logger.close()
+
+    records = list(read_records(logger._get_log_filename(datetime.now())))
+    assert records[0]["message"] == "Kendra returned 2 answers for query: q" and records[0]["request_id"] == "req-1"
+    assert records[1]["exception"] == "boom" and "request_id" not in records[1]
+    assert datetime.fromisoformat(records[0]["timestamp"]).date() == datetime.now().date()
+
+
+def test_day_files_rotate_by_size_and_resume_the_last_part(tmp_path) -> None:
+    logger = make_logger(tmp_path, max_bytes=300)
+    for i in range(12):
+        logger.log("INFO", "record number %d with some padding text", i)
+    logger.close()
+
+    now = datetime.now()
+    parts = os.listdir(tmp_path)
+    assert len(parts) > 2 and os.path.basename(logger._get_log_filename(now)) in parts
+    assert all(os.path.getsize(tmp_path / name) <= 300 for name in parts)
+    assert sum(len(list(read_records(str(tmp_path / name)))) for name in parts) == 12
+
+    # A restarted logger appends to the last part instead of the first
+    last = logger._get_log_filename(now, len(parts) - 1)
+    size = os.path.getsize(last)
+    restarted = make_logger(tmp_path, max_bytes=600)  # every part has room again
+    restarted.log("INFO", "x")
+    restarted.close()
+    assert os.path.getsize(last) > size and len(os.listdir(tmp_path)) == len(parts)
+
+
+def test_write_failures_go_to_stderr_and_the_error_counter(tmp_path, capsys) -> None:
+    from src.utils.metrics import ERRORS
+
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    logger = make_logger(tmp_path)
+    logger.log_dir = str(blocker / "logs")
+    before = ERRORS.get("log")
+    logger.log("ERROR", "lost")
+    logger.close()
+
+    captured = capsys.readouterr()
+    assert "Failed to write log record" in captured.err and captured.out == ""
+    assert ERRORS.get("log") == before + 1
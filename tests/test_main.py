@@ -1,6 +1,8 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
-from src.main import get_response_from_bot
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.main import _collect_answers, get_response_from_bot, get_response_from_bot_async
+from src.models.kendra_answer import KendraAnswer
 
 @patch('src.main.AWSKendra')
 @patch('src.main.OpenAI')
@@ -15,10 +17,10 @@ def test_get_response_from_bot_success(mock_openai, mock_aws_kendra):
     mock_kendra_instance.get_kendra_query_results.return_value = (query_id, result_items)
     
     # Mock answers from Kendra
-    # Each item is [answer_text, url, confidence_score]
+    # Each item is KendraAnswer(text, url, confidence)
     answers_with_urls = [
-        ["Answer 1", "http://url1.com", 10],
-        ["Answer 2", "http://url2.com", 8]
+        KendraAnswer("Answer 1", "http://url1.com", 10),
+        KendraAnswer("Answer 2", "http://url2.com", 8)
     ]
     mock_kendra_instance.get_answers_from_query_results.return_value = answers_with_urls
     
@@ -88,3 +90,37 @@ def test_get_response_from_bot_no_consensus(mock_openai, mock_aws_kendra):
     
     # Assertions
     assert response == []
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_response_from_bot_async_success(mock_openai, mock_aws_kendra) -> None:
+    """The async pipeline awaits both upstream calls and builds the same responses."""
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results_async = AsyncMock(return_value=("qid", [{"some": "item"}]))
+    mock_kendra_instance.get_answers_from_query_results.return_value = [
+        KendraAnswer("Answer 1", "http://url1.com", 10),
+        KendraAnswer("Answer 2", "http://url1.com", 5),
+    ]
+
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus_async = AsyncMock(return_value={"Final Answer": 15})
+
+    response = asyncio.run(get_response_from_bot_async("test query"))
+
+    assert response[0].queryId == "qid"
+    assert response[0].score == 15
+    assert response[0].urls == ["http://url1.com"]
+    mock_openai_instance.get_consensus_async.assert_awaited_once_with(["Answer 1", "Answer 2"], [10, 5], "test query")
+
+def test_collect_answers_dedupes_urls_in_order():
+    statements, weights, urls = _collect_answers([
+        KendraAnswer("a", "http://u2", 1),
+        KendraAnswer("b", "http://u1", 5),
+        KendraAnswer("c", "http://u2", 8),
+    ])
+    assert statements == ["a", "b", "c"]
+    assert weights == [1, 5, 8]
+    assert urls == ["http://u2", "http://u1"]
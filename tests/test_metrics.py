@@ -0,0 +1,121 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+
+from benchmarks.stubs import LatencyModel, StubKendraClient, StubOpenAIClient, install_stubs
+from src.api import app
+from src.main import get_response_from_bot
+from src.models.chatbot_response import ChatbotResponse
+from src.models.kendra_answer import KendraAnswer
+from src.utils.metrics import (
+    Histogram,
+    MetricsRegistry,
+    format_server_timing,
+    start_request_timings,
+    timed,
+)
+
+client = TestClient(app)
+
+
+def test_histogram_quantiles_and_render():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0))
+    for value in range(1, 101):
+        histogram.observe(value / 100, "kendra")
+
+    quantiles = histogram.quantiles("kendra")
+    assert quantiles[0.5] == pytest.approx(0.51)
+    assert quantiles[0.99] == pytest.approx(1.0)
+
+    text = registry.render()
+    assert 'test_seconds_bucket{stage="kendra",le="0.1"} 10' in text
+    assert 'test_seconds_bucket{stage="kendra",le="+Inf"} 100' in text
+    assert 'test_seconds_count{stage="kendra"} 100' in text
+    assert 'test_seconds_quantile{stage="kendra",quantile="0.95"}' in text
+
+
+def test_counter_labels_and_callback_metrics():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test counter", ("kind",))
+    counter.inc("prompt", amount=5)
+    counter.inc("prompt")
+    registry.register_callback("test_cache_total", "Cache", "counter", ("outcome",), lambda: {("hits",): 3})
+
+    text = registry.render()
+    assert 'test_total{kind="prompt"} 6' in text
+    assert 'test_cache_total{outcome="hits"} 3' in text
+
+
+def test_timed_records_request_breakdown():
+    histogram = Histogram("span_seconds", "Spans", ("stage",))
+    timings = start_request_timings()
+    with timed("kendra", histogram):
+        time.sleep(0.002)
+
+    assert timings["kendra"] >= 2.0
+    assert histogram.count("kendra") == 1
+    assert format_server_timing({"kendra": 1.25}, 2.0) == "kendra;dur=1.2, total;dur=2.0"
+
+
+def test_timed_overhead_is_microseconds():
+    histogram = Histogram("overhead_seconds", "Spans", ("stage",))
+    iterations = 20000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with timed("noop", histogram):
+            pass
+    per_span = (time.perf_counter() - start) / iterations
+
+    assert per_span < 20e-6
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_pipeline_stages_are_recorded(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results.return_value = ("qid", [])
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {"Answer": 10}
+
+    timings = start_request_timings()
+    get_response_from_bot("stage timings")
+
+    assert {"cache", "retrieve", "extract", "consensus", "build"} <= set(timings)
+
+
+@patch('src.api.csv_logger')
+def test_server_timing_stages_stay_within_total(mock_logger):
+    # A slow Kendra dominates the request, so counting it twice would exceed the total
+    install_stubs(StubKendraClient(latency=LatencyModel(30)), StubOpenAIClient(), StubOpenAIClient(is_async=True))
+    response = client.post("/chatbot", json={"query": "server timing within total"})
+
+    durations = {}
+    for entry in response.headers["Server-Timing"].split(", "):
+        name, duration = entry.split(";dur=")
+        durations[name] = float(duration)
+    total = durations.pop("total")
+    assert durations["kendra"] >= 30
+    assert all(duration <= total for duration in durations.values())
+    assert durations["kendra"] <= durations["retrieve"]
+    pipeline = ("cache", "retrieve", "extract", "select", "consensus", "build")
+    assert sum(durations.get(stage, 0.0) for stage in pipeline) <= total
+
+
+@patch('src.api.get_response_from_bot_async')
+@patch('src.api.csv_logger')
+def test_metrics_endpoint_and_server_timing_header(mock_logger, mock_get_response):
+    mock_get_response.return_value = [ChatbotResponse(queryId="1", answer="A", score=1, urls=[])]
+
+    response = client.post("/chatbot", json={"query": "metrics"})
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+    scrape = client.get("/metrics")
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'docuchat_http_requests_total{path="/chatbot",status="200"}' in scrape.text
+    assert "docuchat_cache_lookups_total" in scrape.text
@@ -0,0 +1,131 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+from limits.storage import MemoryStorage as StockMemoryStorage
+from limits.storage import storage_from_string
+from starlette.requests import Request
+from unittest.mock import patch
+
+from src.api import app
+from src.models.chatbot_response import ChatbotResponse
+from src.utils.rate_limit import GCRARateLimiter, RateLimitPolicy, rate_limit_policy
+from src.utils.rate_limit_storage import MemoryStorage, RedisStorage, SQLiteStorage, gcra_step
+
+
+def make_request(headers: dict, peer: str = "10.0.0.9") -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": (peer, 1234),
+    })
+
+
+def test_gcra_allows_the_burst_then_refills_one_token_per_interval():
+    limiter = GCRARateLimiter(storage_from_string("memory://"))
+    item = RateLimitItemPerSecond(10)
+
+    assert all(limiter.hit(item, "client") for _ in range(10))
+    assert not limiter.hit(item, "client")
+    assert limiter.get_window_stats(item, "client").remaining == 0
+    assert limiter.hit(item, "other-client")
+
+    time.sleep(0.11)
+    assert limiter.test(item, "client")
+    assert limiter.hit(item, "client")
+    assert not limiter.hit(item, "client")
+
+
+def test_gcra_step_rejects_costs_over_the_bucket_size():
+    assert gcra_step(-5.0, interval=1.0, capacity=3, cost=3) == (True, 3.0)
+    assert gcra_step(1.0, interval=1.0, capacity=3, cost=3) == (False, 1.0)
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    uri = f"sqlite:///{tmp_path}/limits.sqlite3"
+    first, second = GCRARateLimiter(storage_from_string(uri)), GCRARateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerMinute(2)
+
+    assert first.hit(item, "client")
+    assert second.hit(item, "client")
+    assert not first.hit(item, "client")
+    second.clear(item, "client")
+    assert first.hit(item, "client")
+
+
+class FakeRedis:
+    """In-process stand-in for a Redis connection: runs the GCRA script in Python."""
+
+    def __init__(self):
+        self.values = {}
+        self.calls = 0
+
+    def register_script(self, script: str):
+        def run(keys, args=()):
+            self.calls += 1
+            now = time.time()
+            backlog = self.values.get(keys[0], now) - now
+            if script != RedisStorage.SCRIPT_GCRA:
+                return str(max(0.0, backlog))
+            allowed, backlog = gcra_step(backlog, *args)
+            if allowed:
+                self.values[keys[0]] = now + backlog
+            return [int(allowed), str(backlog)]
+        return run
+
+
+def test_redis_storage_decides_in_one_script_call():
+    storage = RedisStorage.__new__(RedisStorage)
+    storage.storage, storage.key_prefix = FakeRedis(), "LIMITS"
+    storage.initialize_storage("redis://fake")
+    limiter = GCRARateLimiter(storage)
+    item = RateLimitItemPerMinute(2)
+
+    calls = storage.storage.calls
+    assert limiter.hit(item, "tenant")
+    assert storage.storage.calls == calls + 1
+    assert limiter.hit(item, "tenant")
+    assert not limiter.hit(item, "tenant")
+    assert all(key.startswith("LIMITS:") for key in storage.storage.values)
+
+
+def test_strategy_needs_gcra_storage():
+    assert isinstance(storage_from_string("memory://"), MemoryStorage)
+    assert isinstance(storage_from_string("sqlite://"), SQLiteStorage)
+    with pytest.raises(NotImplementedError):
+        GCRARateLimiter(StockMemoryStorage())
+
+
+def test_policy_identifies_tenants_and_forwarded_clients():
+    policy = RateLimitPolicy(
+        tenants={"secret": {"chatbot": "100/minute"}, "flat": "7/minute"}, api_key_header="X-API-Key",
+        trusted_proxy_hops=1,
+    )
+    tenant = policy.identify(make_request({"X-API-Key": "secret"}))
+    assert tenant == RateLimitPolicy.tenant_identity("secret") and "secret" not in tenant
+    assert policy.limit_for("chatbot", "10/minute")(tenant) == "100/minute"
+    assert policy.limit_for("batch", "5/minute")(tenant) == "5/minute"
+    assert policy.limit_for("stream", "10/minute")(RateLimitPolicy.tenant_identity("flat")) == "7/minute"
+
+    # Unknown keys and spoofed X-Forwarded-For prefixes count against the address the proxy saw
+    headers = {"X-API-Key": "made-up", "X-Forwarded-For": "1.2.3.4, 203.0.113.7"}
+    assert policy.identify(make_request(headers)) == "ip:203.0.113.7"
+    assert RateLimitPolicy(tenants={}, trusted_proxy_hops=0).identify(make_request(headers)) == "ip:10.0.0.9"
+
+    with pytest.raises(ValueError):
+        RateLimitPolicy(tenants={"key": {"search": "1/second"}})
+
+
+@patch('src.api.get_response_from_bot_async')
+@patch('src.api.csv_logger')
+def test_tenant_quota_is_enforced_per_endpoint(mock_logger, mock_get_response):
+    mock_get_response.return_value = [ChatbotResponse(queryId="q", answer="a", score=1, urls=[])]
+    quotas = {RateLimitPolicy.tenant_identity("team-key"): {"chatbot": "2/minute"}}
+    client = TestClient(app)
+    with patch.object(rate_limit_policy, "quotas", quotas), patch.object(rate_limit_policy, "trusted_proxy_hops", 1):
+        tenant = [client.post("/chatbot", json={"query": "q"}, headers={"X-API-Key": "team-key"}) for _ in range(3)]
+        anonymous = client.post("/chatbot", json={"query": "q"}, headers={"X-Forwarded-For": "198.51.100.23"})
+    app.state.limiter.reset()
+
+    assert [response.status_code for response in tenant] == [200, 200, 429]
+    assert anonymous.status_code == 200
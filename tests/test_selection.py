@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.main import get_response_from_bot
+from src.models.kendra_answer import KendraAnswer
+from src.utils.selection import AnswerSelector, MinHasher, _approximate_token_count, _words, answer_selector
+
+BASE = "To rotate the access key open the console, choose security credentials and create a new key"
+
+
+@pytest.fixture
+def selector():
+    selector = AnswerSelector(count_tokens=lambda text: len(text.split()))
+    selector.enabled = True
+    selector.token_budget = 1000
+    selector.top_k = 10
+    return selector
+
+
+def test_minhash_similarity_tracks_overlap():
+    hasher = MinHasher()
+    first = hasher.signature(_words(BASE))
+    assert hasher.similarity(first, hasher.signature(_words(BASE + " today"))) > 0.8
+    other = hasher.signature(_words("Billing invoices are emailed monthly to the account owner"))
+    assert hasher.similarity(first, other) < 0.2
+
+
+def test_approximate_token_count():
+    assert _approximate_token_count("Hello, world!") == 4
+    assert _approximate_token_count("internationalization") == 5
+
+
+def test_select_drops_near_duplicates(selector):
+    answers = [
+        KendraAnswer(BASE, "http://a", 8),
+        KendraAnswer(BASE + " today", "http://b", 5),
+        KendraAnswer("Billing invoices are emailed monthly", "http://c", 5),
+    ]
+    selection = selector.select("rotate access key", answers)
+    assert [a.url for a in selection.answers] == ["http://a", "http://c"]
+    assert selection.duplicates == 1
+    assert selection.tokens_saved == len(BASE.split()) + 1
+
+
+def test_select_packs_budget_by_rank_and_keeps_kendra_order(selector):
+    selector.token_budget = 6
+    answers = [
+        KendraAnswer("one two three four five", "http://low", 1),
+        KendraAnswer("rotate key now", "http://high", 10),
+        KendraAnswer("rotate the key", "http://mid", 8),
+    ]
+    selection = selector.select("rotate key", answers)
+    assert [a.url for a in selection.answers] == ["http://high", "http://mid"]
+    assert selection.selected_tokens == 6
+    assert selection.candidate_tokens == 11
+
+
+def test_select_keeps_an_over_budget_top_answer_truncated(selector):
+    selector.token_budget = 5
+    answers = [KendraAnswer("rotate the access key from the security credentials page", "http://only", 9)]
+    selection = selector.select("rotate key", answers)
+    assert selection.answers == [KendraAnswer("rotate the access key from", "http://only", 9)]
+    assert selection.selected_tokens == 5 and selection.candidate_tokens == 9
+
+    answers.append(KendraAnswer("short", "http://short", 1))
+    assert [a.url for a in selector.select("rotate key", answers).answers] == ["http://only"]
+
+    # One excerpt over the default budget, counted like the pipeline does
+    approximate = AnswerSelector(count_tokens=_approximate_token_count)
+    approximate.enabled, approximate.token_budget = True, 2000
+    selection = approximate.select("rotate key", [KendraAnswer("rotate the key. " * 700, "http://long", 9)])
+    assert len(selection.answers) == 1 and 1995 <= selection.selected_tokens <= 2000
+
+
+def test_select_top_k_and_disabled(selector):
+    answers = [KendraAnswer(f"distinct answer number {i} {'x' * i}", f"http://{i}", 5) for i in range(5)]
+    selector.top_k = 2
+    assert len(selector.select("answer", answers).answers) == 2
+
+    selector.enabled = False
+    selection = selector.select("answer", answers)
+    assert selection.answers == answers
+    assert selection.tokens_saved == 0
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_pipeline_sends_selected_statements(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results.return_value = ("qid", [{"some": "item"}])
+    mock_kendra_instance.get_answers_from_query_results.return_value = [
+        KendraAnswer(BASE, "http://a", 8),
+        KendraAnswer(BASE, "http://b", 5),
+    ]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {"Rotate the key": 8}
+
+    with patch.object(answer_selector, "enabled", True):
+        response = get_response_from_bot("How do I rotate an access key?")
+
+    statements, weights, _ = mock_openai_instance.get_consensus.call_args[0]
+    assert statements == [BASE]
+    assert weights == [8]
+    assert response[0].urls == ["http://a"]
@@ -0,0 +1,131 @@
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.main import get_response_from_bot
+from src.models.chatbot_response import ChatbotResponse
+from src.utils.semantic_cache import HashingEmbedder, SemanticCache, VectorIndex, semantic_cache
+from src.models.kendra_answer import KendraAnswer
+
+
+def _responses(answer="Open settings and choose reset."):
+    return [ChatbotResponse(queryId="qid", answer=answer, score=10, urls=["http://doc"])]
+
+
+def _cache(threshold=0.5, max_entries=100):
+    index = VectorIndex(dim=256, max_entries=max_entries)
+    cache = SemanticCache(embedder=HashingEmbedder(dim=256), index=index)
+    cache.enabled = True
+    cache.threshold = threshold
+    return cache
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    first = embedder.embed(["reset my password"])
+    second = embedder.embed(["Reset my password!"])
+
+    assert np.allclose(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+
+def test_semantic_hit_for_similar_query_and_miss_for_unrelated():
+    cache = _cache()
+    cache.set("how do I reset my password", _responses())
+
+    hit = cache.get("password reset steps")
+    miss = cache.get("what regions does kendra support")
+
+    assert hit[0].answer == "Open settings and choose reset."
+    assert miss is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["avg_lookup_ms"] > 0
+
+
+def test_vector_index_evicts_least_recently_used():
+    embedder = HashingEmbedder(dim=64)
+    index = VectorIndex(dim=64, max_entries=2)
+    vectors = embedder.embed(["alpha", "beta", "gamma"])
+    index.add(vectors[0], "alpha", 1)
+    index.add(vectors[1], "beta", 2)
+    index.search(vectors[0])
+    index.add(vectors[2], "gamma", 3)
+
+    assert len(index) == 2
+    assert index.search(vectors[1])[2] != "beta"
+    assert index.search(vectors[0])[2] == "alpha"
+
+
+def test_vector_index_skips_expired_entries_for_a_fresh_neighbour():
+    embedder = HashingEmbedder(dim=64)
+    index = VectorIndex(dim=64, max_entries=10)
+    exact, neighbour = embedder.embed(["reset my password", "reset my password please"])
+    stale = index.add(exact, "reset my password", "old")
+    index.add(neighbour, "reset my password please", "fresh")
+    index._created[stale] -= 120
+
+    slot, score, key, payload = index.search(exact, ttl=60)
+    assert payload == "fresh" and 0 < score < 1
+    assert len(index) == 1 and index.search(exact)[3] == "fresh"  # the expired entry was removed
+
+    assert index.add(exact, "reset my password", "new") == stale  # its slot is reused
+    assert index.search(exact, ttl=60)[3] == "new"
+
+
+def test_vector_index_ivf_finds_exact_match():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(400, 32)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    index = VectorIndex(dim=32, max_entries=1000, ivf_threshold=100, nprobe=4)
+    for i, vector in enumerate(data):
+        index.add(vector, f"q{i}", i)
+
+    assert index._centroids is not None
+    slot, score, key, payload = index.search(data[123])
+    assert key == "q123" and payload == 123
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_snapshot_and_restore(tmp_path):
+    path = str(tmp_path / "semantic.npy")
+    cache = _cache()
+    cache.set("how do I reset my password", _responses())
+    cache.snapshot(path)
+
+    restored = SemanticCache(embedder=HashingEmbedder(dim=256))
+    restored.enabled = True
+    restored.threshold = 0.5
+    restored.restore(path)
+
+    assert restored.get("reset my password")[0].answer == "Open settings and choose reset."
+
+
+def test_async_lookup():
+    cache = _cache()
+    asyncio.run(cache.set_async("how do I reset my password", _responses()))
+
+    assert asyncio.run(cache.get_async("password reset"))[0].score == 10
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_response_from_bot_serves_semantic_hit(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results.return_value = ("qid", [])
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus.return_value = {"Open settings and choose reset.": 10}
+
+    with patch.object(semantic_cache, "embedder", HashingEmbedder(dim=256)), \
+            patch.object(semantic_cache, "enabled", True), \
+            patch.object(semantic_cache, "threshold", 0.5):
+        get_response_from_bot("how do I reset my password")
+        response = get_response_from_bot("password reset steps")
+
+    assert response[0].answer == "Open settings and choose reset."
+    assert mock_openai_instance.get_consensus.call_count == 1
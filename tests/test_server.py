@@ -0,0 +1,119 @@
+import os
+import json
+import time
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from src.server import configure_shared_state
+from src.utils.cache import SQLiteCacheBackend
+from src.utils.metrics import MetricsRegistry
+from src.utils import rate_limit_storage  # noqa: F401
+
+
+def test_configure_shared_state_keeps_explicit_values(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_STORAGE_URI", "redis://cache:6379")
+    for name in ("RESPONSE_CACHE_BACKEND", "RESPONSE_CACHE_SQLITE_PATH", "METRICS_MULTIPROC_DIR"):
+        monkeypatch.delenv(name, raising=False)
+
+    applied = configure_shared_state(str(tmp_path))
+
+    assert "RATE_LIMIT_STORAGE_URI" not in applied
+    assert os.environ["RATE_LIMIT_STORAGE_URI"] == "redis://cache:6379"
+    assert os.environ["RESPONSE_CACHE_BACKEND"] == "sqlite"
+    assert os.environ["METRICS_MULTIPROC_DIR"] == f"{tmp_path}/metrics"
+
+
+def test_sqlite_rate_limit_storage_is_shared(tmp_path):
+    uri = f"sqlite:///{tmp_path}/limits.sqlite3"
+    item = RateLimitItemPerMinute(2)
+    first = FixedWindowRateLimiter(storage_from_string(uri))
+    second = FixedWindowRateLimiter(storage_from_string(uri))
+
+    assert first.hit(item, "client")
+    assert second.hit(item, "client")
+    assert not first.hit(item, "client")
+    assert second.get_window_stats(item, "client").remaining == 0
+    assert first.hit(item, "other-client")
+
+
+def test_sqlite_storage_window_expires(tmp_path):
+    storage = storage_from_string(f"sqlite:///{tmp_path}/limits.sqlite3")
+    assert storage.incr("key", expiry=1) == 1
+    assert storage.incr("key", expiry=1) == 2
+    time.sleep(1.05)
+    assert storage.get("key") == 0
+    assert storage.incr("key", expiry=1) == 1
+
+
+def test_sqlite_cache_backend_reconnects_after_fork(tmp_path, monkeypatch):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set("k", "v", 60)
+    connection = backend._conn
+
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    assert backend.get("k") == "v"
+    assert backend._conn is not connection
+
+
+def test_metrics_render_merges_worker_snapshots(tmp_path):
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("path",))
+    latency = registry.histogram("latency_seconds", "Latency", (), buckets=(0.1, 1.0))
+    requests.inc("/chatbot", amount=2)
+    latency.observe(0.05)
+
+    other = {"requests_total": [[["/chatbot"], 3], [["/metrics"], 1]], "latency_seconds": [[[], [[0, 1, 0], 0.5, 1, [0.5]]]]}
+    (tmp_path / "metrics-999999.json").write_text(json.dumps(other))
+    registry.write_snapshot(str(tmp_path))  # this process' own file is ignored in favour of live values
+
+    body = registry.render(str(tmp_path))
+
+    assert 'requests_total{path="/chatbot"} 5' in body
+    assert 'requests_total{path="/metrics"} 1' in body
+    assert 'latency_seconds_bucket{le="1"} 2' in body
+    assert "latency_seconds_count 2" in body
+
+
+def test_metrics_gauges_are_labelled_by_live_worker(tmp_path):
+    registry = MetricsRegistry()
+    registry.register_callback("circuit_state", "State", "gauge", ("upstream",), lambda: {("kendra",): 2})
+    registry.register_callback("lookups_total", "Lookups", "counter", ("outcome",), lambda: {("hits",): 1})
+
+    live, dead = os.getppid(), 999999
+    for pid in (live, dead):
+        snapshot = {"circuit_state": [[["kendra"], 0]], "lookups_total": [[["hits"], 4]]}
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps(snapshot))
+
+    body = registry.render(str(tmp_path))
+
+    assert f'circuit_state{{upstream="kendra",pid="{os.getpid()}"}} 2' in body
+    assert f'circuit_state{{upstream="kendra",pid="{live}"}} 0' in body
+    assert f'pid="{dead}"' not in body
+    assert 'lookups_total{outcome="hits"} 9' in body
+
+    MetricsRegistry.clear_snapshots(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_forked_worker_rebuilds_pools_and_metrics_after_a_warm_up():
+    from src.server import reset_after_fork
+    from src.services.aws_kendra import AWSKendra
+    from src.utils.metrics import ERRORS
+
+    kendra = AWSKendra.get_instance()
+    assert kendra.get_executor().submit(lambda: "warm").result(timeout=3) == "warm"
+    ERRORS.inc("warmup")
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            reset_after_fork()
+            if kendra.get_executor().submit(lambda: "served").result(timeout=3) == "served" \
+                    and ERRORS.get("warmup") == 0:
+                code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
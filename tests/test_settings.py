@@ -0,0 +1,29 @@
+import pytest
+
+from src.configs.settings import Settings
+
+
+def test_settings_read_a_snapshot_of_the_environment(monkeypatch):
+    monkeypatch.setenv("KENDRA_PAGE_SIZE", "25")
+    settings = Settings()
+    monkeypatch.setenv("KENDRA_PAGE_SIZE", "50")
+
+    assert settings.get_kendra_page_size() == 25
+    settings.reload()
+    assert settings.get_kendra_page_size() == 50
+
+
+def test_settings_parse_each_value_once():
+    settings = Settings({"KENDRA_PAGE_SIZE": "500", "RESPONSE_CACHE_ENABLED": "No"})
+
+    assert settings.get_kendra_page_size() == 100
+    assert settings.get_response_cache_enabled() is False
+    assert settings._values == {"get_kendra_page_size": 100, "get_response_cache_enabled": False}
+    assert settings.get_aws_region() == "us-east-2"
+
+
+def test_settings_snapshot_is_read_only():
+    settings = Settings({"AWS_REGION": "eu-west-1"})
+    with pytest.raises(TypeError):
+        settings._env["AWS_REGION"] = "us-east-1"
+    assert settings.get_aws_region() == "eu-west-1"
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.main import get_response_from_bot_async
+from src.utils.single_flight import SingleFlight
+from src.models.kendra_answer import KendraAnswer
+
+
+def test_concurrent_threads_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert results == ["result"] * 6
+    assert len(calls) == 1
+    assert flight.get_stats() == {"executions": 1, "coalesced": 5, "in_flight": 0}
+
+
+def test_errors_are_shared_with_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except ValueError as ex:
+            errors.append(str(ex))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert errors == ["upstream down", "upstream down"]
+
+
+def test_async_tasks_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*[flight.do_async("k", slow) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["result"] * 10
+    assert len(calls) == 1
+    assert flight.get_stats()["coalesced"] == 9
+
+
+def test_async_error_is_shared():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(*[flight.do_async("k", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_async_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(flight.do_async("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "result"
+    assert len(calls) == 1
+
+
+def test_async_computation_is_cancelled_once_every_caller_is():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        callers = [asyncio.create_task(flight.do_async("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == []
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert flight.get_stats()["in_flight"] == 0
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_get_response_from_bot_async_coalesces_identical_queries(mock_openai, mock_aws_kendra):
+    async def slow_kendra(query):
+        await asyncio.sleep(0.05)
+        return "qid", []
+
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results_async = AsyncMock(side_effect=slow_kendra)
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.get_consensus_async = AsyncMock(return_value={"Shared": 10})
+
+    async def run():
+        return await asyncio.gather(*[
+            get_response_from_bot_async(q) for q in ["What is X?", "what is x", "WHAT IS X"]
+        ])
+
+    results = asyncio.run(run())
+
+    assert [r[0].answer for r in results] == ["Shared"] * 3
+    assert mock_kendra_instance.get_kendra_query_results_async.await_count == 1
+    assert mock_openai_instance.get_consensus_async.await_count == 1
@@ -0,0 +1,113 @@
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.api import app
+from src.main import stream_response_from_bot
+from src.models.chatbot_response import ChatbotResponse
+from src.services.openai import OpenAI
+from src.utils.partial_json import PartialJSONParser
+from src.models.kendra_answer import KendraAnswer
+
+client = TestClient(app)
+
+ITEMS_JSON = json.dumps({
+    "type": "items",
+    "data": [
+        {"id": 0, "items": ["Item A", "Item B"]},
+        {"id": 1, "items": ["Item A"]},
+    ],
+})
+
+
+def _chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _collect(agen):
+    async def run():
+        return [event async for event in agen]
+    return asyncio.run(run())
+
+
+def test_partial_json_parser_completes_prefixes():
+    parser = PartialJSONParser()
+    parser.feed('{"type": "statement", "text": "The unif')
+    assert parser.snapshot() == {"type": "statement", "text": "The unif"}
+    assert not parser.complete
+
+    parser.feed('ied answer."}')
+    assert parser.snapshot() == {"type": "statement", "text": "The unified answer."}
+    assert parser.complete
+
+
+def test_partial_json_parser_handles_escapes_and_dangling_tokens():
+    parser = PartialJSONParser()
+    parser.feed('{"text": "say \\"hi\\"", ')
+    assert parser.snapshot() == {"text": 'say "hi"'}
+    parser.feed('"ty')
+    assert parser.snapshot() is None
+
+
+def test_stream_consensus_scores_like_get_consensus():
+    async def fake_stream(prompt, temp, **kwargs):
+        for chunk in _chunks(ITEMS_JSON):
+            yield chunk
+
+    openai_service = OpenAI.get_instance()
+    with patch.object(OpenAI, "stream_chatgpt_response_async", side_effect=fake_stream):
+        events = _collect(openai_service.stream_consensus_async(["s1", "s2"], [10, 5], "query"))
+
+    kinds = [kind for kind, _ in events]
+    assert kinds.count("token") == len(_chunks(ITEMS_JSON))
+    partials = [data for kind, data in events if kind == "partial"]
+    # The first entry is scored before the second one has been received
+    assert partials[0] == {"Item A": 10, "Item B": 10}
+    assert events[-1] == ("consensus", {"Item A": 15, "Item B": 10})
+    assert events[-1][1] == openai_service.parse_consensus(ITEMS_JSON, [10, 5])
+
+
+@patch('src.main.AWSKendra')
+@patch('src.main.OpenAI')
+def test_stream_response_from_bot_sends_sources_first(mock_openai, mock_aws_kendra):
+    mock_kendra_instance = MagicMock()
+    mock_aws_kendra.get_instance.return_value = mock_kendra_instance
+    mock_kendra_instance.get_kendra_query_results_async = AsyncMock(return_value=("qid", []))
+    mock_kendra_instance.get_answers_from_query_results.return_value = [KendraAnswer("Answer", "http://url", 10)]
+
+    async def fake_consensus(statements, weights, query):
+        yield "token", '{"type": "statement", "text": "Hi"}'
+        yield "consensus", {"Hi": 10}
+
+    mock_openai_instance = MagicMock()
+    mock_openai.get_instance.return_value = mock_openai_instance
+    mock_openai_instance.stream_consensus_async = fake_consensus
+
+    events = _collect(stream_response_from_bot("hello"))
+
+    assert events[0] == ("sources", {"queryId": "qid", "urls": ["http://url"]})
+    assert events[1][0] == "token"
+    assert events[-1][0] == "result"
+    assert events[-1][1][0].answer == "Hi"
+
+
+@patch('src.api.stream_response_from_bot')
+@patch('src.api.csv_logger')
+def test_chatbot_stream_endpoint_emits_sse(mock_logger, mock_stream):
+    async def stream(query):
+        yield "sources", {"queryId": "qid", "urls": ["http://url"]}
+        yield "token", "Hel"
+        yield "result", [ChatbotResponse(queryId="qid", answer="Hello", score=10, urls=["http://url"])]
+
+    mock_stream.side_effect = stream
+
+    response = client.post("/chatbot/stream", json={"query": "hello"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in response.text.split("\n\n") if b]
+    assert blocks[0].startswith("event: sources")
+    assert blocks[-1].startswith("event: result")
+    assert json.loads(blocks[-1].split("data: ", 1)[1])[0]["answer"] == "Hello"
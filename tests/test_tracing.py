@@ -0,0 +1,118 @@
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from benchmarks.stubs import StubKendraClient, StubOpenAIClient, install_stubs
+from src.api import app
+from src.main import get_response_from_bot
+from src.utils.metrics import timed
+from src.utils.tracing import InMemoryExporter, OTLPFileExporter, Span, current_span, parse_traceparent, tracer
+
+CALLER = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    install_stubs(StubKendraClient(), StubOpenAIClient(), StubOpenAIClient(is_async=True))
+    return exporter
+
+
+def by_name(spans, name, kind=None):
+    return next(span for span in spans if span.name == name and (kind is None or span.kind == kind))
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(CALLER) == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", True)
+    assert parse_traceparent(CALLER[:-2] + "00")[2] is False
+    for invalid in (None, "", "00-xyz-b7ad6b7169203331-01", "00-" + "0" * 32 + "-b7ad6b7169203331-01",
+                    "ff-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"):
+        assert parse_traceparent(invalid) is None
+
+
+@patch('src.api.csv_logger')
+def test_chatbot_request_is_one_trace_across_the_pipeline(mock_logger, exporter):
+    response = TestClient(app).post("/chatbot", json={"query": "How do I configure the index?"})
+    assert response.status_code == 200
+
+    spans = exporter.get_finished_spans()
+    assert len({span.trace_id for span in spans}) == 1
+    root = by_name(spans, "POST /chatbot")
+    assert root.kind == Span.SERVER and root.parent_id is None
+    assert root.attributes["http.response.status_code"] == 200
+    assert root.attributes["request.id"] == response.headers["X-Request-ID"]
+    assert response.headers["traceparent"] == root.traceparent
+
+    query = by_name(spans, "query")
+    assert query.parent_id == root.span_id
+    assert query.attributes["docuchat.query_id"] == response.json()[0]["queryId"]
+    assert query.attributes["docuchat.source"] == "chatbot" and query.attributes["openai.prompt_tokens"] > 0
+
+    # The Kendra call runs on an executor thread and still joins the trace
+    kendra = by_name(spans, "kendra", Span.CLIENT)
+    assert by_name(spans, "retrieve").parent_id == query.span_id
+    assert kendra.parent_id == by_name(spans, "retrieve").span_id
+    assert [span.name for span in spans].count("kendra") == 1
+    assert kendra.attributes["kendra.result_items"] > 0 and kendra.attributes["kendra.query_bytes"] == 29
+
+    openai = by_name(spans, "openai")
+    assert openai.kind == Span.CLIENT and openai.parent_id == by_name(spans, "consensus").span_id
+    assert openai.attributes["openai.completion_tokens"] > 0 and openai.attributes["openai.response_bytes"] > 0
+    assert {"cache", "extract", "select", "build"} <= {span.name for span in spans}
+    assert "log" not in {span.name for span in spans}
+
+
+@patch('src.api.csv_logger')
+def test_sampling_follows_the_caller_and_the_sample_rate(mock_logger, exporter, monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    response = client.post("/chatbot", json={"query": "unsampled"})
+    assert exporter.get_finished_spans() == [] and "traceparent" not in response.headers
+
+    response = client.post("/chatbot", json={"query": "continued"}, headers={"traceparent": CALLER})
+    root = by_name(exporter.get_finished_spans(), "POST /chatbot")
+    assert root.trace_id == CALLER.split("-")[1] and root.parent_id == CALLER.split("-")[2]
+
+    exporter.clear()
+    client.post("/chatbot", json={"query": "declined"}, headers={"traceparent": CALLER[:-2] + "00"})
+    assert exporter.get_finished_spans() == []
+
+
+def test_untraced_code_creates_no_spans(exporter):
+    get_response_from_bot("no request around it")
+    assert exporter.get_finished_spans() == []
+
+    with tracer.start_trace("job", kind=Span.INTERNAL) as root:
+        with pytest.raises(ValueError):
+            with timed("failing"):
+                assert current_span().name == "failing"
+                raise ValueError("boom")
+        assert current_span() is root
+    failing = by_name(exporter.get_finished_spans(), "failing")
+    assert failing.status == Span.STATUS_ERROR and failing.status_message == "ValueError"
+
+
+def test_otlp_file_exporter_writes_otlp_json_lines(tmp_path, exporter):
+    with tracer.start_trace("job", kind=Span.INTERNAL, attributes={"ratio": 0.5, "ok": True}):
+        with timed("stage"):
+            current_span().set_attributes({"items": 3, "names": ["a", "b"]})
+
+    path = tmp_path / "traces.jsonl"
+    otlp = OTLPFileExporter(str(path), service_name="test-service")
+    otlp.export(exporter.get_finished_spans())
+    otlp.shutdown()
+
+    line = json.loads(path.read_text().splitlines()[0])
+    resource = line["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "test-service"}
+    stage, job = resource["scopeSpans"][0]["spans"]
+    assert stage["parentSpanId"] == job["spanId"] and "parentSpanId" not in job
+    assert int(stage["endTimeUnixNano"]) >= int(stage["startTimeUnixNano"])
+    assert {"key": "items", "value": {"intValue": "3"}} in stage["attributes"]
+    assert {"key": "names", "value": {"arrayValue": {"values": [{"stringValue": "a"}, {"stringValue": "b"}]}}} \
+        in stage["attributes"]
+    assert {"key": "ok", "value": {"boolValue": True}} in job["attributes"]
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from benchmarks.stubs import StubKendraClient, StubOpenAIClient, install_stubs
+from src.api import app
+from src.utils.cache import response_cache
+from src.utils.interaction_store import Interaction, InteractionStore
+from src.warmup import CacheWarmer, history_from_logs, history_from_store, rank_queries
+
+NOW = datetime(2026, 10, 10, 12).timestamp()
+HOUR = 3600
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InteractionStore(path=str(tmp_path / "interactions.sqlite3"), enabled=True)
+    with patch("src.main.interaction_store", store), patch("src.warmup.interaction_store", store):
+        yield store
+    store.close()
+
+
+def record(store: InteractionStore, query: str, timestamp: float, answers: int = 1, source: str = "chatbot") -> None:
+    interaction = Interaction(query, source)
+    interaction.timestamp, interaction.scores = timestamp, [80] * answers
+    store.record(interaction)
+
+
+def test_rank_queries_weighs_frequency_by_recency():
+    history = [
+        ("Old favourite", NOW - 72 * HOUR, 6),  # 6 * 0.125 = 0.75
+        ("trending now", NOW - 1, 2),
+        ("Trending now?", NOW - HOUR, 1),
+        ("once", NOW, 1),
+    ]
+    assert rank_queries(history, NOW, 24 * HOUR, top_n=10) == ["trending now", "once", "Old favourite"]
+    assert rank_queries(history, NOW, 24 * HOUR, top_n=1) == ["trending now"]
+
+
+def test_history_from_logs_reads_processing_query_lines(tmp_path):
+    (tmp_path / "2026-10-01_app_log.csv").write_text(
+        "timestamp,level,message,exception\n2026-10-01 09:00:00,INFO,Processing query: too old,\n"
+    )
+    (tmp_path / "2026-10-09_app_log.csv").write_text(
+        "timestamp,level,message,exception\n"
+        "2026-10-09 09:00:00,INFO,\"Processing query: What is DocuChat, exactly?\",\n"
+        "2026-10-09 09:00:01,INFO,Kendra returned 1 answers for query: What is DocuChat,\n"
+        "2026-10-09 09:00:02,INFO,Processing query: pricing,\n"
+    )
+    history = history_from_logs(str(tmp_path), NOW - 3 * 24 * HOUR, suffix="app_log.csv")
+    assert [(query, count) for query, _, count in history] == [("What is DocuChat, exactly?", 1), ("pricing", 1)]
+
+
+def test_warm_up_replays_top_queries_and_refreshes_them(store):
+    kendra = StubKendraClient()
+    install_stubs(kendra, StubOpenAIClient(), StubOpenAIClient(is_async=True))
+    for minute in range(3):
+        record(store, "How do I configure the index?", NOW - minute * 60)
+    record(store, "What is DocuChat?", NOW - HOUR)
+    record(store, "unanswered question", NOW, answers=0)
+    record(store, "rare question", NOW - 48 * HOUR)
+    assert store.flush(5)
+
+    warmer = CacheWarmer(enabled=True, top_n=2, concurrency=2, timeout=10, refresh_interval=0, source="auto")
+    assert warmer.load_queries(NOW) == ["How do I configure the index?", "What is DocuChat?"]
+    assert not warmer.is_ready()
+
+    with patch("src.warmup.time.time", return_value=NOW):
+        asyncio.run(warmer.warm_up())
+    assert warmer.is_ready() and warmer.get_status()["warmed"] == 2 and warmer.total == 2
+    assert response_cache.get("how do I configure the index") is not None
+    assert kendra.calls == 2
+
+    # A refresh recomputes instead of reading the cache; replays never feed the ranking
+    asyncio.run(warmer.replay(["What is DocuChat?"], refresh=True))
+    assert kendra.calls == 3 and warmer.warmed == 2
+    assert store.flush(5)
+    queries = [query for query, _, _ in history_from_store(store.path, NOW - 24 * HOUR)]
+    assert set(queries) == {"How do I configure the index?", "What is DocuChat?"}
+
+
+def test_warm_up_becomes_ready_after_timeout_or_without_history(store):
+    warmer = CacheWarmer(enabled=True, timeout=0.05, refresh_interval=0, source="store")
+
+    async def slow(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    with patch.object(warmer, "load_queries", return_value=["slow question"]), \
+            patch("src.warmup.get_response_from_bot_async", slow):
+        asyncio.run(warmer.warm_up())
+    assert warmer.is_ready() and warmer.warmed == 0 and warmer.total == 1
+
+    empty = CacheWarmer(enabled=True, refresh_interval=0, source="store")
+    asyncio.run(empty.warm_up())
+    assert empty.is_ready() and empty.total == 0
+    assert CacheWarmer(enabled=False).is_ready()
+
+
+def test_ready_endpoint_reflects_warm_up_progress():
+    warmer = CacheWarmer(enabled=True)
+    warmer.state, warmer.total, warmer.warmed = CacheWarmer.WARMING, 10, 4
+    with patch("src.api.cache_warmer", warmer):
+        response = TestClient(app).get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming" and response.json()["warmed"] == 4
+
+        warmer.state = CacheWarmer.READY
+        assert TestClient(app).get("/ready").status_code == 200
+
+
+def test_only_cached_answers_count_as_warmed():
+    warmer = CacheWarmer(enabled=True, timeout=5, refresh_interval=0)
+
+    async def answer(query, **kwargs):
+        return [] if query == "no answer" else ["cached"]
+
+    with patch.object(warmer, "load_queries", return_value=["no answer", "answered"]), \
+            patch("src.warmup.get_response_from_bot_async", answer):
+        asyncio.run(warmer.warm_up())
+    assert warmer.get_status()["warmed"] == 1 and warmer.failed == 0 and warmer.total == 2
+
+
+def test_run_skips_a_warm_up_that_already_ran():
+    # e.g. a worker forked after the pre-fork master warmed the cache
+    warmer = CacheWarmer(enabled=True, refresh_interval=0)
+    warmer.state = CacheWarmer.READY
+    with patch.object(warmer, "warm_up") as warm_up:
+        asyncio.run(warmer.run())
+    warm_up.assert_not_called()